@@ -1,55 +1,99 @@
+import asyncio
+import io
+import json
+import math
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, date
-from typing import List, Optional
-
-from app.core.database import get_db
-from app.models.sql_models import WeatherTable, ConsensusTable
-from app.core.utils import run_etl_pipeline, resolve_location
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, literal, null, select
+from datetime import datetime, date, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db
+from app.models.sql_models import (
+    WeatherTable, ConsensusTable, DailyWeatherTable, DailyConsensusTable, ForecastRunTable, SchemaStateTable,
+    HOURLY_RETAINED_FROM_KEY
+)
+from app.core.locations import resolve_location_async
 from app.core.limiter import limiter
+from app.core.grid import cell_key
+from app.core.cache import CachedResponse, forecast_cache, response_cache
+from app.core.nearby import Neighbour, nearby_index
+from app.core.scheduler import refresh_scheduler
+from app.models.schemas import BatchWeatherRequest, WeatherSource
 from fastapi import Request
 
 router = APIRouter()
 
 @router.get("/weather/current")
 @limiter.limit("100/hour")
-def get_current_weather(
+async def get_current_weather(
     lat: float, 
     lon: float, 
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get current weather for specific coordinates.
-    Triggers ETL if data is missing for the current hour.
+
+    Serves stored data straight away whenever possible (stale-while-revalidate): if the
+    forecast has expired, or the current hour is missing but an earlier hour from the
+    previous fetch is stored, that data is returned with `freshness.stale` set and a
+    background refresh is queued (at most one per location).
+    Only locations with no usable data wait for ETL; concurrent requests share that run.
     """
     now = datetime.utcnow()
     # Simple check: do we have data for this hour?
     # Rounding down to hour for simplicity in this demo logic
     current_hour_start = now.replace(minute=0, second=0, microsecond=0)
-    
-    from datetime import timedelta
     next_hour = current_hour_start + timedelta(hours=1)
-
-    records = db.query(WeatherTable).filter(
-        WeatherTable.lat.between(lat - 0.0001, lat + 0.0001),
-        WeatherTable.lon.between(lon - 0.0001, lon + 0.0001),
+    cell = cell_key(lat, lon)
+    current_hour = select(WeatherTable).where(
+        WeatherTable.grid_cell == cell,
         WeatherTable.timestamp >= current_hour_start,
         WeatherTable.timestamp < next_hour
-    ).all()
+    )
+
+    async def refresh():
+        # The ETL stack (httpx, numpy, the loader) is imported on first use, not at cold start
+        from app.core.utils import run_etl_pipeline_async
+
+        return (await run_etl_pipeline_async(lat, lon)).expires_at
+
+    records = (await db.execute(current_hour)).scalars().all()
+
+    if not records:
+        # A location fetched nearby may have a fresh forecast to reuse
+        neighbours = nearby_index.nearest(lat, lon, settings.NEARBY_NEIGHBOURS if settings.NEARBY_INTERPOLATE else 1)
+        if neighbours:
+            nearby = await _nearby_weather(db, lat, lon, neighbours, current_hour_start)
+            if nearby is not None:
+                refresh_scheduler.record(neighbours[0].cell, neighbours[0].lat, neighbours[0].lon)
+                return nearby
+
+    refresh_scheduler.record(cell, lat, lon)
+
+    if not records and settings.SERVE_STALE_FORECASTS:
+        # Latest stored hour before this one (all sources at that hour)
+        latest = select(func.max(WeatherTable.timestamp)).where(
+            WeatherTable.grid_cell == cell,
+            WeatherTable.timestamp < current_hour_start,
+            WeatherTable.timestamp >= current_hour_start - timedelta(hours=settings.STALE_FORECAST_MAX_AGE_HOURS)
+        ).scalar_subquery()
+        records = (await db.execute(select(WeatherTable).where(
+            WeatherTable.grid_cell == cell,
+            WeatherTable.timestamp == latest
+        ))).scalars().all()
     
     if not records:
-        # Trigger ETL
+        # Trigger ETL (or wait for the one already running for this location)
         try:
-            run_etl_pipeline(lat, lon, db)
-            # Query again with fuzzy match
-            records = db.query(WeatherTable).filter(
-                WeatherTable.lat.between(lat - 0.0001, lat + 0.0001),
-                WeatherTable.lon.between(lon - 0.0001, lon + 0.0001),
-                WeatherTable.timestamp >= current_hour_start,
-                WeatherTable.timestamp < next_hour
-            ).all()
+            await forecast_cache.get_or_refresh_async(cell, refresh)
+            # Query again (another request may have done the load, so refresh loaded identities)
+            records = (await db.execute(current_hour.execution_options(populate_existing=True))).scalars().all()
         except Exception as e:
             # Log the specific error for debugging
             print(f"ETL Failure Detail: {e}")
@@ -58,23 +102,62 @@ def get_current_weather(
     if not records:
          raise HTTPException(status_code=404, detail="No weather data available even after ETL attempt.")
 
+    # Unchanged hours are not rewritten, so a source's latest run says when it was last fetched
+    loaded = dict((await db.execute(
+        select(ForecastRunTable.source, func.max(ForecastRunTable.loaded_at))
+        .where(ForecastRunTable.grid_cell == cell)
+        .group_by(ForecastRunTable.source)
+    )).all())
+    fetched_at = min((
+        max(t for t in (r.fetched_at, loaded.get(r.source)) if t is not None)
+        for r in records if r.fetched_at is not None or r.source in loaded
+    ), default=None)
+    age_seconds = (datetime.utcnow() - fetched_at).total_seconds() if fetched_at else None
+    stale = (
+        records[0].timestamp < current_hour_start
+        or forecast_cache.is_expired(cell)
+        # Not refreshed since this process started: fall back to the age of the rows
+        or (forecast_cache.expires_at(cell) is None and age_seconds is not None
+            and age_seconds > settings.FORECAST_DEFAULT_TTL_SECONDS)
+    )
+    if stale:
+        forecast_cache.refresh_in_background(cell, refresh)
+    elif fetched_at is not None:
+        # Let nearby coordinates reuse this forecast (rows may have been loaded by another process)
+        nearby_index.add(lat, lon, forecast_cache.expires_at(cell) or (
+            fetched_at + timedelta(seconds=settings.FORECAST_DEFAULT_TTL_SECONDS)
+        ).replace(tzinfo=timezone.utc))
+
     # Aggregate
     temps = [r.temperature for r in records if r.temperature is not None]
     avg_temp = sum(temps) / len(temps) if temps else None
     
     # Fetch Consensus
-    consensus_record = db.query(ConsensusTable).filter(
-        ConsensusTable.lat.between(lat - 0.0001, lat + 0.0001),
-        ConsensusTable.lon.between(lon - 0.0001, lon + 0.0001),
+    consensus_record = (await db.execute(select(ConsensusTable).where(
+        ConsensusTable.grid_cell == cell,
         ConsensusTable.timestamp == records[0].timestamp
-    ).first()
+    ))).scalars().first()
     
     consensus_temp = consensus_record.weighted_temperature if consensus_record else None
+    confidence_interval = None
+    if consensus_record and consensus_record.temperature_lower is not None:
+        confidence_interval = {
+            "lower": consensus_record.temperature_lower,
+            "upper": consensus_record.temperature_upper
+        }
 
     return {
         "location": {"lat": lat, "lon": lon},
         "average_temperature": avg_temp,
         "weighted_temperature": consensus_temp,
+        "confidence_interval": confidence_interval,
+        "freshness": {
+            "forecast_hour": records[0].timestamp,
+            "fetched_at": fetched_at,
+            "age_seconds": age_seconds,
+            "stale": stale,
+            "refreshing": forecast_cache.is_refreshing(cell)
+        },
         "sources": [
             {
                 "source": r.source,
@@ -84,20 +167,145 @@ def get_current_weather(
         ]
     }
 
+def _blend(weighted: List[Tuple[float, Optional[float]]]) -> Optional[float]:
+    """Weighted mean of the values that are not None."""
+    pairs = [(w, v) for w, v in weighted if v is not None]
+    total = sum(w for w, _ in pairs)
+    return sum(w * v for w, v in pairs) / total if total else None
+
+async def _nearby_weather(db: AsyncSession, lat: float, lon: float, neighbours: List[Neighbour],
+                          current_hour_start: datetime) -> Optional[dict]:
+    """
+    Current weather for (lat, lon) from the fresh forecasts of nearby locations: the
+    nearest one, or with NEARBY_INTERPOLATE an inverse-distance weighted blend of all
+    `neighbours` (weights 1 / distance ** NEARBY_IDW_POWER). Same shape as
+    get_current_weather, plus `served_from`. Returns None if the neighbours have no
+    rows for the current hour.
+    """
+    cells = [n.cell for n in neighbours]
+    next_hour = current_hour_start + timedelta(hours=1)
+    records = (await db.execute(select(WeatherTable).where(
+        WeatherTable.grid_cell.in_(cells),
+        WeatherTable.timestamp >= current_hour_start,
+        WeatherTable.timestamp < next_hour
+    ))).scalars().all()
+    by_cell: Dict[int, List[WeatherTable]] = {}
+    for r in records:
+        by_cell.setdefault(r.grid_cell, []).append(r)
+    neighbours = [n for n in neighbours if n.cell in by_cell]
+    if not neighbours:
+        return None
+
+    if any(n.distance_km == 0 for n in neighbours):
+        weights = [1.0 if n.distance_km == 0 else 0.0 for n in neighbours]
+    else:
+        weights = [n.distance_km ** -settings.NEARBY_IDW_POWER for n in neighbours]
+    total = sum(weights)
+    weights = [w / total for w in weights]
+
+    consensus = {c.grid_cell: c for c in (await db.execute(select(ConsensusTable).where(
+        ConsensusTable.grid_cell.in_(cells),
+        ConsensusTable.timestamp >= current_hour_start,
+        ConsensusTable.timestamp < next_hour
+    ))).scalars()}
+    loaded = {(c, source): t for c, source, t in (await db.execute(
+        select(ForecastRunTable.grid_cell, ForecastRunTable.source, func.max(ForecastRunTable.loaded_at))
+        .where(ForecastRunTable.grid_cell.in_(cells))
+        .group_by(ForecastRunTable.grid_cell, ForecastRunTable.source)
+    )).all()}
+    fetched_at = min((
+        max(t for t in (r.fetched_at, loaded.get((r.grid_cell, r.source))) if t is not None)
+        for n in neighbours for r in by_cell[n.cell]
+        if r.fetched_at is not None or (r.grid_cell, r.source) in loaded
+    ), default=None)
+
+    def average(cell_records):
+        temps = [r.temperature for r in cell_records if r.temperature is not None]
+        return sum(temps) / len(temps) if temps else None
+
+    def blend(value) -> Optional[float]:
+        return _blend([(w, value(n)) for w, n in zip(weights, neighbours)])
+
+    def source_temperature(source):
+        return lambda n: next((r.temperature for r in by_cell[n.cell] if r.source == source), None)
+
+    def consensus_field(name):
+        return lambda n: getattr(consensus[n.cell], name) if n.cell in consensus else None
+
+    lower, upper = blend(consensus_field("temperature_lower")), blend(consensus_field("temperature_upper"))
+    forecast_hour = by_cell[neighbours[0].cell][0].timestamp
+    return {
+        "location": {"lat": lat, "lon": lon},
+        "average_temperature": blend(lambda n: average(by_cell[n.cell])),
+        "weighted_temperature": blend(consensus_field("weighted_temperature")),
+        "confidence_interval": {"lower": lower, "upper": upper} if lower is not None else None,
+        "freshness": {
+            "forecast_hour": forecast_hour,
+            "fetched_at": fetched_at,
+            "age_seconds": (datetime.utcnow() - fetched_at).total_seconds() if fetched_at else None,
+            "stale": False,  # nearby_index only holds unexpired forecasts
+            "refreshing": False
+        },
+        "sources": [
+            {
+                "source": source,
+                "temperature": blend(source_temperature(source)),
+                "timestamp": forecast_hour
+            } for source in sorted({r.source for n in neighbours for r in by_cell[n.cell]})
+        ],
+        "served_from": [
+            {"lat": n.lat, "lon": n.lon, "distance_km": round(n.distance_km, 3), "weight": w}
+            for n, w in zip(neighbours, weights)
+        ]
+    }
+
+def _not_modified(request: Request, entry: CachedResponse) -> bool:
+    """Conditional GET: If-None-Match wins over If-Modified-Since, as in RFC 9110."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or entry.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return entry.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+async def _cached_json(request: Request, key: Tuple, cell: int, compute: Callable[[], Awaitable[Any]]) -> Response:
+    """
+    Serves `key` from the response cache, or renders compute() and caches it for the
+    grid cell `cell`. Responses carry ETag and Last-Modified, and matching conditional
+    requests get a 304 without a body.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        token = response_cache.token()
+        entry = response_cache.set(key, cell, JSONResponse(jsonable_encoder(await compute())).body, token)
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": format_datetime(entry.last_modified, usegmt=True),
+        "Cache-Control": "no-cache"  # may be stored, but revalidated on every use
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
 @router.get("/weather/daily-average")
 @limiter.limit("100/hour")
-def get_daily_average(
+async def get_daily_average(
     request: Request,
     location: Optional[str] = None,
     lat: Optional[float] = None,
     lon: Optional[float] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get daily average temperature for a location.
     """
     if location:
-        coords = resolve_location(location)
+        coords = await resolve_location_async(location)
         if not coords:
             raise HTTPException(status_code=400, detail=f"Unknown location: {location}")
         lat, lon = coords
@@ -105,45 +313,48 @@ def get_daily_average(
     if lat is None or lon is None:
         raise HTTPException(status_code=400, detail="Must provide location name or lat/lon")
         
-    # Aggregate by date
-    # SQLite has limited date functions, using strftime
-    results = db.query(
-        func.strftime("%Y-%m-%d", WeatherTable.timestamp).label("date"),
-        func.avg(WeatherTable.temperature).label("avg_temp"),
-        func.avg(WeatherTable.precipitation).label("avg_precip")
-    ).filter(
-        WeatherTable.lat.between(lat - 0.0001, lat + 0.0001),
-        WeatherTable.lon.between(lon - 0.0001, lon + 0.0001)
-    ).group_by(
-        func.strftime("%Y-%m-%d", WeatherTable.timestamp)
-    ).order_by(
-        func.strftime("%Y-%m-%d", WeatherTable.timestamp).asc()
-    ).all()
-    
-    return [
-        {
-            "date": r.date,
-            "average_temperature": r.avg_temp,
-            "average_precipitation": r.avg_precip
-        }
-        for r in results
-    ]
+    cell = cell_key(lat, lon)
+
+    async def compute():
+        # Aggregate the per-source daily rollups; one row per (source, day)
+        results = (await db.execute(select(
+            DailyWeatherTable.date.label("date"),
+            (func.sum(DailyWeatherTable.temperature_sum) / func.nullif(func.sum(DailyWeatherTable.temperature_count), 0)).label("avg_temp"),
+            (func.sum(DailyWeatherTable.precipitation_sum) / func.nullif(func.sum(DailyWeatherTable.precipitation_count), 0)).label("avg_precip")
+        ).where(
+            DailyWeatherTable.grid_cell == cell
+        ).group_by(
+            DailyWeatherTable.date
+        ).order_by(
+            DailyWeatherTable.date.asc()
+        ))).all()
+
+        return [
+            {
+                "date": r.date,
+                "average_temperature": r.avg_temp,
+                "average_precipitation": r.avg_precip
+            }
+            for r in results
+        ]
+
+    return await _cached_json(request, ("daily-average", cell), cell, compute)
 
 @router.get("/weather/source-deviation")
 @limiter.limit("100/hour")
-def get_source_deviation(
+async def get_source_deviation(
     request: Request,
     date: date,
     location: Optional[str] = None,
     lat: Optional[float] = None,
     lon: Optional[float] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Compare sources for a specific date.
     """
     if location:
-        coords = resolve_location(location)
+        coords = await resolve_location_async(location)
         if not coords:
             raise HTTPException(status_code=400, detail=f"Unknown location: {location}")
         lat, lon = coords
@@ -151,51 +362,55 @@ def get_source_deviation(
     if lat is None or lon is None:
          raise HTTPException(status_code=400, detail="Must provide location name or lat/lon")
 
-    # Filter by date string matching
-    date_str = date.strftime("%Y-%m-%d")
-    
-    records = db.query(WeatherTable).filter(
-        WeatherTable.lat.between(lat - 0.0001, lat + 0.0001),
-        WeatherTable.lon.between(lon - 0.0001, lon + 0.0001),
-        func.strftime("%Y-%m-%d", WeatherTable.timestamp) == date_str
-    ).all()
-    
-    # Group by source
-    by_source = {}
-    for r in records:
-        if r.source not in by_source:
-            by_source[r.source] = []
-        if r.temperature is not None:
-            by_source[r.source].append(r.temperature)
-            
-    avgs = {s: sum(v)/len(v) for s, v in by_source.items() if v}
-    
-    deviation = None
-    if "yr" in avgs and "open-meteo" in avgs:
-        deviation = abs(avgs["yr"] - avgs["open-meteo"])
-        
-    return {
-        "date": date_str,
-        "location": {"lat": lat, "lon": lon},
-        "source_averages": avgs,
-        "deviation_yr_vs_openmeteo": deviation
-    }
+    cell = cell_key(lat, lon)
+
+    async def compute():
+        rollups = (await db.execute(select(DailyWeatherTable).where(
+            DailyWeatherTable.grid_cell == cell,
+            DailyWeatherTable.date == date
+        ))).scalars().all()
+
+        avgs = {
+            r.source: r.temperature_sum / r.temperature_count
+            for r in rollups if r.temperature_count
+        }
+
+        deviation = None
+        if "yr" in avgs and "open-meteo" in avgs:
+            deviation = abs(avgs["yr"] - avgs["open-meteo"])
+
+        return {
+            "date": date.strftime("%Y-%m-%d"),
+            "location": {"lat": lat, "lon": lon},
+            "source_averages": avgs,
+            "deviation_yr_vs_openmeteo": deviation
+        }
+
+    # The response echoes lat/lon, so they are part of the key
+    return await _cached_json(request, ("source-deviation", cell, date, lat, lon), cell, compute)
 
 @router.get("/weather/search")
 @limiter.limit("100/hour")
-def search_location(
+async def search_location(
     request: Request,
     name: str = Query(..., min_length=2, description="Name of the location to search for")
 ):
     """
     Search for a location by name.
+    Served from the local geocoding cache when possible; otherwise the result is fetched and cached.
     """
+    from app.core.geocoding import geocoding_cache
     from app.etl.extract import GeocodingFetcher
     from app.models.schemas import LocationSearchResult
+
+    await geocoding_cache.load_async()
+    cached = geocoding_cache.lookup(name)
+    if cached is not None:
+        return [LocationSearchResult(**place) for place in cached]
     
     fetcher = GeocodingFetcher()
     try:
-        data = fetcher.search(name)
+        data = await fetcher.search_async(name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Geocoding service failed: {str(e)}")
         
@@ -209,5 +424,346 @@ def search_location(
                 country=item.get("country", "Unknown"),
                 region=item.get("admin1")
             ))
-            
+
+    await asyncio.to_thread(geocoding_cache.store, name, [r.model_dump() for r in results])
     return results
+
+def _batch_body(request: Request, body: BatchWeatherRequest) -> BatchWeatherRequest:
+    """
+    Validated batch request. Oversized batches are rejected before they are charged,
+    and the location count is kept on the request for _batch_cost: dependencies are
+    solved before the limiter runs.
+    """
+    if len(body.locations) > settings.BATCH_QUERY_MAX_LOCATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_QUERY_MAX_LOCATIONS} locations per batch")
+    request.state.batch_locations = len(body.locations)
+    return body
+
+def _batch_cost(request: Request) -> int:
+    """Rate-limit cost of a batch call: one hit per BATCH_QUERY_LOCATIONS_PER_HIT locations."""
+    return math.ceil(request.state.batch_locations / max(1, settings.BATCH_QUERY_LOCATIONS_PER_HIT))
+
+def _chunks(values: List[int], size: int = 500):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+@router.post("/weather/batch")
+@limiter.limit("100/hour", cost=_batch_cost)
+async def get_weather_batch(
+    request: Request,
+    body: BatchWeatherRequest = Depends(_batch_body),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Current, daily and source-deviation data for many locations in one call.
+    Runs a fixed number of set-based queries regardless of how many locations are
+    requested. Reads stored data only: locations without data are not fetched.
+    """
+    # Resolve every location to its grid cell
+    resolved: List[Tuple[Optional[str], Optional[float], Optional[float], Optional[int]]] = []
+    for loc in body.locations:
+        lat, lon = loc.lat, loc.lon
+        if loc.name:
+            coords = await resolve_location_async(loc.name)
+            if coords:
+                lat, lon = coords
+        cell = cell_key(lat, lon) if lat is not None and lon is not None else None
+        resolved.append((loc.name, lat, lon, cell))
+    cells = sorted({cell for *_, cell in resolved if cell is not None})
+
+    now = datetime.utcnow()
+    current_hour_start = now.replace(minute=0, second=0, microsecond=0)
+    next_hour = current_hour_start + timedelta(hours=1)
+    deviation_date = body.date or now.date()
+
+    current: Dict[int, list] = {}
+    consensus: Dict[int, ConsensusTable] = {}
+    rollups: Dict[int, list] = {}
+    for chunk in _chunks(cells):
+        # 1. Current hour, all sources
+        for r in (await db.execute(select(WeatherTable).where(
+            WeatherTable.grid_cell.in_(chunk),
+            WeatherTable.timestamp >= current_hour_start,
+            WeatherTable.timestamp < next_hour
+        ))).scalars():
+            current.setdefault(r.grid_cell, []).append(r)
+        # 2. Consensus for the current hour
+        for r in (await db.execute(select(ConsensusTable).where(
+            ConsensusTable.grid_cell.in_(chunk),
+            ConsensusTable.timestamp >= current_hour_start,
+            ConsensusTable.timestamp < next_hour
+        ))).scalars():
+            consensus[r.grid_cell] = r
+        # 3. Daily rollups (per source; serve both the daily averages and the deviation)
+        for r in (await db.execute(select(DailyWeatherTable).where(
+            DailyWeatherTable.grid_cell.in_(chunk)
+        ).order_by(DailyWeatherTable.date.asc()))).scalars():
+            rollups.setdefault(r.grid_cell, []).append(r)
+
+    results = []
+    for name, lat, lon, cell in resolved:
+        if cell is None:
+            results.append({
+                "location": {"name": name, "lat": lat, "lon": lon},
+                "error": f"Unknown location: {name}" if name else "Must provide location name or lat/lon"
+            })
+            continue
+
+        records = current.get(cell, [])
+        temps = [r.temperature for r in records if r.temperature is not None]
+        consensus_record = consensus.get(cell)
+
+        days: Dict[date, list] = {}
+        for r in rollups.get(cell, []):
+            day = days.setdefault(r.date, [0.0, 0, 0.0, 0])
+            day[0] += r.temperature_sum or 0.0
+            day[1] += r.temperature_count or 0
+            day[2] += r.precipitation_sum or 0.0
+            day[3] += r.precipitation_count or 0
+
+        avgs = {
+            r.source: r.temperature_sum / r.temperature_count
+            for r in rollups.get(cell, []) if r.date == deviation_date and r.temperature_count
+        }
+
+        results.append({
+            "location": {"name": name, "lat": lat, "lon": lon},
+            "current": {
+                "average_temperature": sum(temps) / len(temps) if temps else None,
+                "weighted_temperature": consensus_record.weighted_temperature if consensus_record else None,
+                "sources": [
+                    {"source": r.source, "temperature": r.temperature, "timestamp": r.timestamp}
+                    for r in records
+                ]
+            },
+            "daily": [
+                {
+                    "date": day,
+                    "average_temperature": t_sum / t_count if t_count else None,
+                    "average_precipitation": p_sum / p_count if p_count else None
+                }
+                for day, (t_sum, t_count, p_sum, p_count) in days.items()
+            ],
+            "deviation": {
+                "date": deviation_date.strftime("%Y-%m-%d"),
+                "source_averages": avgs,
+                "deviation_yr_vs_openmeteo": abs(avgs["yr"] - avgs["open-meteo"]) if "yr" in avgs and "open-meteo" in avgs else None
+            }
+        })
+
+    return results
+
+# Columns per export kind, with their Arrow types (see _arrow_schema). Days before the
+# compaction watermark only exist as daily rollups: those rows have resolution "day",
+# the day's means and its range in the *_min / *_max columns (null on hourly rows).
+EXPORT_COLUMNS = {
+    "weather": (
+        ("timestamp", "timestamp"), ("source", "string"), ("resolution", "string"), ("temperature", "float64"),
+        ("precipitation", "float64"), ("temperature_min", "float64"), ("temperature_max", "float64")
+    ),
+    "consensus": (
+        ("timestamp", "timestamp"), ("resolution", "string"), ("weighted_temperature", "float64"),
+        ("temperature_lower", "float64"), ("temperature_upper", "float64"), ("source_count", "int64"),
+        ("weighted_temperature_min", "float64"), ("weighted_temperature_max", "float64")
+    ),
+}
+
+def _export_statements(kind: str, cell: int, sources: Sequence[str], start: datetime, end: datetime,
+                       retained_from: Optional[datetime]) -> List[Tuple[Any, bool]]:
+    """
+    (statement, daily) pairs whose rows, in order, make up the export. Hours before
+    `retained_from` are read from the daily rollups (every day overlapping the window),
+    later ones from the hourly tables.
+    """
+    statements = []
+    hourly_start = max(start, retained_from) if retained_from else start
+    if retained_from is not None and start < retained_from:
+        daily_end = min(end, retained_from)
+        first_day = start.date()
+        # Days starting before daily_end
+        end_day = daily_end.date() + timedelta(days=1) if daily_end.time() != datetime.min.time() else daily_end.date()
+    else:
+        first_day = end_day = None
+
+    if kind == "consensus":
+        if first_day is not None:
+            statements.append((select(
+                DailyConsensusTable.date,
+                literal("day"),
+                DailyConsensusTable.weighted_temperature_sum / func.nullif(DailyConsensusTable.weighted_temperature_count, 0),
+                DailyConsensusTable.temperature_lower,
+                DailyConsensusTable.temperature_upper,
+                DailyConsensusTable.source_count,
+                DailyConsensusTable.weighted_temperature_min,
+                DailyConsensusTable.weighted_temperature_max
+            ).where(
+                DailyConsensusTable.grid_cell == cell,
+                DailyConsensusTable.date >= first_day,
+                DailyConsensusTable.date < end_day
+            ).order_by(DailyConsensusTable.date.asc()), True))
+        if hourly_start < end:
+            statements.append((select(
+                ConsensusTable.timestamp,
+                literal("hour"),
+                ConsensusTable.weighted_temperature,
+                ConsensusTable.temperature_lower,
+                ConsensusTable.temperature_upper,
+                ConsensusTable.source_count,
+                null(),
+                null()
+            ).where(
+                ConsensusTable.grid_cell == cell,
+                ConsensusTable.timestamp >= hourly_start,
+                ConsensusTable.timestamp < end
+            ).order_by(ConsensusTable.timestamp.asc()), False))
+        return statements
+
+    for source in sources:
+        if first_day is not None:
+            statements.append((select(
+                DailyWeatherTable.date,
+                DailyWeatherTable.source,
+                literal("day"),
+                DailyWeatherTable.temperature_sum / func.nullif(DailyWeatherTable.temperature_count, 0),
+                DailyWeatherTable.precipitation_sum / func.nullif(DailyWeatherTable.precipitation_count, 0),
+                DailyWeatherTable.temperature_min,
+                DailyWeatherTable.temperature_max
+            ).where(
+                DailyWeatherTable.grid_cell == cell,
+                DailyWeatherTable.source == source,
+                DailyWeatherTable.date >= first_day,
+                DailyWeatherTable.date < end_day
+            ).order_by(DailyWeatherTable.date.asc()), True))
+        if hourly_start < end:
+            statements.append((select(
+                WeatherTable.timestamp,
+                WeatherTable.source,
+                literal("hour"),
+                WeatherTable.temperature,
+                WeatherTable.precipitation,
+                null(),
+                null()
+            ).where(
+                WeatherTable.grid_cell == cell,
+                WeatherTable.source == source,
+                WeatherTable.timestamp >= hourly_start,
+                WeatherTable.timestamp < end
+            ).order_by(WeatherTable.timestamp.asc()), False))
+    return statements
+
+async def _export_batches(kind: str, cell: int, sources: Sequence[str], start: datetime,
+                          end: datetime) -> AsyncIterator[Sequence[Any]]:
+    """
+    Export rows (see _export_statements) in batches of EXPORT_BATCH_ROWS, read through
+    a server-side cursor. Opens its own session: the response body is produced after
+    the endpoint has returned.
+    """
+    async with AsyncSessionLocal() as db:
+        value = (await db.execute(
+            select(SchemaStateTable.value).where(SchemaStateTable.key == HOURLY_RETAINED_FROM_KEY)
+        )).scalar()
+        retained_from = datetime.fromisoformat(value) if value else None
+        for stmt, daily in _export_statements(kind, cell, sources, start, end, retained_from):
+            result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_ROWS))
+            async for rows in result.partitions():
+                if daily:
+                    rows = [(datetime.combine(row[0], datetime.min.time()), *row[1:]) for row in rows]
+                yield rows
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+async def _ndjson(batches: AsyncIterator[Sequence[Any]], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+        ).encode()
+
+def _arrow_schema(kind: str):
+    import pyarrow as pa
+
+    types = {"timestamp": pa.timestamp("s", tz="UTC"), "string": pa.string(), "float64": pa.float64(), "int64": pa.int64()}
+    return pa.schema([(name, types[type_]) for name, type_ in EXPORT_COLUMNS[kind]])
+
+async def _arrow_stream(batches: AsyncIterator[Sequence[Any]], kind: str) -> AsyncIterator[bytes]:
+    """Arrow IPC stream: the schema, one record batch per cursor batch, then the end-of-stream marker."""
+    import pyarrow as pa
+
+    schema = _arrow_schema(kind)
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        async for rows in batches:
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)], schema=schema
+            ))
+            yield drain()
+    yield drain()
+
+@router.get("/weather/export")
+@limiter.limit("100/hour")
+async def export_weather(
+    request: Request,
+    start: datetime,
+    end: datetime,
+    location: Optional[str] = None,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    source: str = Query("all", description="yr, open-meteo, all (both, hourly rows) or consensus"),
+    format: str = Query("ndjson", pattern="^(ndjson|arrow)$", description="ndjson or arrow (Arrow IPC stream)")
+):
+    """
+    Export stored hourly data for a location over [start, end) (UTC).
+
+    Streams NDJSON (one JSON object per line) or an Arrow IPC stream (format=arrow,
+    requires pyarrow). Rows are read through a server-side cursor and written out a
+    batch at a time, so memory stays flat and the first rows are sent right away,
+    however long the window. Hourly rows are ordered by source, then time (the index
+    order, so no sort is needed before the first row); consensus rows by time.
+    Days whose hourly rows were compacted away (app.etl.compact) come from the daily
+    rollups, one row per day with resolution "day".
+    """
+    if location:
+        coords = await resolve_location_async(location)
+        if not coords:
+            raise HTTPException(status_code=400, detail=f"Unknown location: {location}")
+        lat, lon = coords
+
+    if lat is None or lon is None:
+        raise HTTPException(status_code=400, detail="Must provide location name or lat/lon")
+
+    sources = {s.value for s in WeatherSource}
+    if source not in sources | {"all", "consensus"}:
+        raise HTTPException(status_code=400, detail=f"Unknown source: {source}")
+
+    # Stored timestamps are naive UTC
+    start, end = (
+        ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts for ts in (start, end)
+    )
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Arrow export requires pyarrow (pip install pyarrow)")
+
+    kind = "consensus" if source == "consensus" else "weather"
+    # One query per source, so each is read in (grid_cell, source, timestamp) index order
+    sources = sorted(sources) if source == "all" else [source]
+    batches = _export_batches(kind, cell_key(lat, lon), sources, start, end)
+    filename = f"{kind}-{lat}-{lon}-{start:%Y%m%dT%H}-{end:%Y%m%dT%H}"
+    if format == "arrow":
+        body, media_type, filename = _arrow_stream(batches, kind), "application/vnd.apache.arrow.stream", filename + ".arrows"
+    else:
+        body, media_type, filename = _ndjson(batches, [name for name, _ in EXPORT_COLUMNS[kind]]), "application/x-ndjson", filename + ".ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
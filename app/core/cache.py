@@ -0,0 +1,293 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set
+from app.core.config import settings
+
+class ForecastCache:
+    """
+    Tracks how long the stored forecast for each location stays fresh.
+
+    Entries map a location key (grid cell) to the time upstream is expected to
+    publish new data. Concurrent misses for the same key share one refresh:
+    the first caller runs it, the others block on its result. Size is bounded
+    with LRU eviction.
+
+    Async callers use get_or_refresh_async / refresh_in_background, which share
+    one asyncio task per key instead of blocking threads.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.FORECAST_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[Hashable, datetime]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._retry_after: Dict[Hashable, datetime] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.background = 0
+
+    def expires_at(self, key: Hashable) -> Optional[datetime]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def is_expired(self, key: Hashable) -> bool:
+        """True only for keys we have refreshed before whose forecast has since expired."""
+        expires_at = self.expires_at(key)
+        return expires_at is not None and expires_at <= datetime.now(timezone.utc)
+
+    def get_or_refresh(self, key: Hashable, refresh: Callable[[], datetime]) -> str:
+        """
+        Runs `refresh` unless the forecast for `key` is still fresh.
+        `refresh` loads the forecast and returns when it expires.
+
+        Returns "hit", "miss" (this caller refreshed) or "coalesced" (waited on another caller's refresh).
+        Exceptions from the refresh propagate to every caller waiting on it.
+        """
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and expires_at > datetime.now(timezone.utc):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return "hit"
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                self.misses += 1
+                inflight = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            inflight.result()
+            return "coalesced"
+
+        try:
+            expires_at = refresh()
+            self.set(key, expires_at)
+            inflight.set_result(expires_at)
+        except BaseException as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return "miss"
+
+    async def get_or_refresh_async(self, key: Hashable, refresh: Callable[[], Awaitable[datetime]],
+                                   force: bool = False) -> str:
+        """
+        Async variant of get_or_refresh: callers await one shared refresh task per key.
+        With `force`, refreshes even while the forecast is fresh (scheduled early refreshes).
+        """
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if not force and expires_at is not None and expires_at > datetime.now(timezone.utc):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return "hit"
+            task = self._tasks.get(key)
+            leader = task is None
+            if leader:
+                self.misses += 1
+                task = self._tasks[key] = asyncio.ensure_future(self._run(key, refresh))
+            else:
+                self.coalesced += 1
+
+        # Shielded so a cancelled (disconnected) caller does not cancel the refresh for everyone else
+        await asyncio.shield(task)
+        return "miss" if leader else "coalesced"
+
+    def is_refreshing(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._tasks or key in self._inflight
+
+    def refresh_in_background(self, key: Hashable, refresh: Callable[[], Awaitable[datetime]]) -> bool:
+        """
+        Starts `refresh` for `key` without waiting for it, unless one is already running
+        or the last one failed less than REFRESH_RETRY_SECONDS ago (so a failing upstream
+        is not retried on every request). Returns whether a refresh was started.
+        Must be called from a running event loop.
+        """
+        with self._lock:
+            if key in self._tasks:
+                return False
+            retry_after = self._retry_after.get(key)
+            if retry_after is not None and retry_after > datetime.now(timezone.utc):
+                return False
+            self.background += 1
+            task = self._tasks[key] = asyncio.ensure_future(self._run(key, refresh))
+        task.add_done_callback(self._report_failure)
+        return True
+
+    async def _run(self, key: Hashable, refresh: Callable[[], Awaitable[datetime]]) -> datetime:
+        try:
+            expires_at = await refresh()
+            self.set(key, expires_at)
+            return expires_at
+        except Exception:
+            with self._lock:
+                self._retry_after[key] = datetime.now(timezone.utc) + timedelta(seconds=settings.REFRESH_RETRY_SECONDS)
+            raise
+        finally:
+            with self._lock:
+                self._tasks.pop(key, None)
+
+    @staticmethod
+    def _report_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Background refresh failed: {task.exception()}")
+
+    def set(self, key: Hashable, expires_at: datetime):
+        with self._lock:
+            self._retry_after.pop(key, None)
+            self._entries[key] = expires_at
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._retry_after.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight) + len(self._tasks),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "background": self.background
+            }
+
+forecast_cache = ForecastCache()
+
+@dataclass
+class CachedResponse:
+    body: bytes  # rendered JSON
+    etag: str
+    last_modified: datetime  # UTC, whole seconds (HTTP dates have no finer resolution)
+    stored: float  # time.monotonic() when rendered
+
+class ResponseCache:
+    """
+    Rendered responses of the aggregate endpoints (/weather/daily-average,
+    /weather/source-deviation), keyed by endpoint and normalized parameters.
+
+    Every entry belongs to the grid cell it was computed from. WeatherLoader calls
+    invalidate() with the cells it wrote after each commit, so entries are dropped
+    exactly when their data changes. Size is bounded with LRU eviction. Writes made
+    by other processes (batch ETL, other workers) are not seen here; entries older
+    than RESPONSE_CACHE_TTL_SECONDS are recomputed to bound that staleness.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = settings.RESPONSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl_seconds = settings.RESPONSE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._cell_of: Dict[Hashable, int] = {}
+        self._keys: Dict[int, Set[Hashable]] = {}  # grid cell -> cached keys
+        # Invalidation counter, and its value at each cell's last invalidation, so a response
+        # computed while a write was committing is not stored (see token / set)
+        self._writes = 0
+        self._written: Dict[int, int] = {}
+        self._floor = 0  # tokens older than this are refused (_written was pruned)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry.stored > self.ttl_seconds:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def token(self) -> int:
+        """Taken before reading the database; pass it to set() with the result."""
+        with self._lock:
+            return self._writes
+
+    def set(self, key: Hashable, cell: int, body: bytes, token: int) -> CachedResponse:
+        """
+        Wraps a rendered response in a CachedResponse (with its ETag) and stores it,
+        unless `cell` was invalidated after `token` was taken: the response may then
+        predate that write. The entry is returned either way.
+        """
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        entry = CachedResponse(
+            body=body,
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            last_modified=now,
+            stored=time.monotonic()
+        )
+        with self._lock:
+            if self.max_entries <= 0 or token < self._floor or self._written.get(cell, 0) > token:
+                return entry
+            self._drop(key)
+            self._entries[key] = entry
+            self._cell_of[key] = cell
+            self._keys.setdefault(cell, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, cells: Optional[Iterable[int]] = None):
+        """Drops the entries of `cells`, or every entry when `cells` is None."""
+        with self._lock:
+            self._writes += 1
+            if cells is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._cell_of.clear()
+                self._keys.clear()
+                self._written.clear()
+                self._floor = self._writes
+                return
+            for cell in cells:
+                self._written[cell] = self._writes
+                for key in self._keys.pop(cell, ()):
+                    self._entries.pop(key, None)
+                    self._cell_of.pop(key, None)
+                    self.invalidations += 1
+            if len(self._written) > max(self.max_entries, 1024):
+                # Forget old write marks; responses computed before now are then refused
+                self._written.clear()
+                self._floor = self._writes
+
+    def _drop(self, key: Hashable):
+        self._entries.pop(key, None)
+        cell = self._cell_of.pop(key, None)
+        if cell is not None:
+            keys = self._keys.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys[cell]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations
+            }
+
+response_cache = ResponseCache()
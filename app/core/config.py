@@ -1,3 +1,4 @@
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,6 +12,122 @@ class Settings(BaseSettings):
     # Identification
     USER_AGENT: str = "WeatherETL/1.0 (https://github.com/yourusername/weather-etl)"
 
+    # HTTP client (shared keep-alive pool used by all fetchers)
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+
+    # API-triggered ETL runs allowed at once (reads are not limited by this)
+    ETL_MAX_CONCURRENCY: int = 4
+
+    # Stale-while-revalidate for /weather/current: when the current hour is missing, serve the
+    # latest stored hour (no older than STALE_FORECAST_MAX_AGE_HOURS) and refresh in the background
+    SERVE_STALE_FORECASTS: bool = True
+    STALE_FORECAST_MAX_AGE_HOURS: int = 6
+    REFRESH_RETRY_SECONDS: int = 60  # after a failed background refresh, wait this long before queueing another
+
+    # Background refresh of popular locations (app/core/scheduler.py)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_CONCURRENCY: int = 2  # scheduled refreshes running at once (they also take ETL_MAX_CONCURRENCY slots)
+    SCHEDULER_UPSTREAM_REQUESTS_PER_MINUTE: int = 60  # two per refresh
+    SCHEDULER_HOT_REQUESTS: float = 3.0  # decayed request count from which a location is kept fresh
+    SCHEDULER_POPULARITY_HALF_LIFE_SECONDS: int = 3600
+    SCHEDULER_JITTER_SECONDS: int = 300  # refreshes start within this window before expiry, spread out
+    SCHEDULER_TICK_SECONDS: float = 5.0
+    SCHEDULER_MAX_LOCATIONS: int = 10000
+
+    # Nearby forecast reuse for /weather/current (app/core/nearby.py): a location without data for the
+    # current hour is served from fresh forecasts fetched within NEARBY_RADIUS_KM (0 disables)
+    NEARBY_RADIUS_KM: float = 2.0
+    NEARBY_INTERPOLATE: bool = False  # blend up to NEARBY_NEIGHBOURS by inverse distance instead of using the nearest
+    NEARBY_NEIGHBOURS: int = 4
+    NEARBY_IDW_POWER: float = 2.0
+    NEARBY_INDEX_MAX_LOCATIONS: int = 10000
+
+    # Geocoding (/weather/search) and its local cache
+    GEOCODING_RESULT_COUNT: int = 10  # results requested per search
+    GEOCODING_CACHE_MAX_QUERIES: int = 5000
+
+    # Forecast freshness
+    FORECAST_DEFAULT_TTL_SECONDS: int = 1800  # used when Yr.no sends no usable Expires header
+    OPEN_METEO_UPDATE_MINUTES: int = 60
+    OPEN_METEO_FORECAST_DAYS: int = 7  # forecast horizon requested from Open-Meteo (at most 16)
+    FORECAST_CACHE_MAX_ENTRIES: int = 10000
+    YR_CONDITIONAL_CACHE_MAX_ENTRIES: int = 256  # locations whose last Yr.no payload is kept for 304s
+
+    # Consensus: relative weight per source (JSON in the environment, e.g. CONSENSUS_WEIGHTS='{"yr": 0.7, "open-meteo": 0.3}')
+    CONSENSUS_WEIGHTS: Dict[str, float] = {"yr": 0.6, "open-meteo": 0.4}
+    CONSENSUS_DEFAULT_WEIGHT: float = 0.5  # for sources missing from CONSENSUS_WEIGHTS
+    CONSENSUS_CONFIDENCE_Z: float = 1.96  # source-spread band half-width in weighted standard deviations
+
+    # Batch ETL runner (python -m app.etl.batch)
+    BATCH_WORKERS: int = 8
+    BATCH_DB_LOCATIONS: int = 25  # locations per database write
+    BATCH_MAX_RETRIES: int = 3
+    BATCH_BACKOFF_SECONDS: float = 0.5
+    BATCH_RATE_LIMITS: Dict[str, float] = {"yr": 10.0, "open-meteo": 10.0}  # requests/second per source
+
+    # Batch query endpoint (POST /weather/batch)
+    BATCH_QUERY_MAX_LOCATIONS: int = 500
+    BATCH_QUERY_LOCATIONS_PER_HIT: int = 50  # a batch costs ceil(locations / this) hits of the 100/hour limit
+
+    # Response cache for /weather/daily-average and /weather/source-deviation (0 entries disables storing).
+    # Dropped per location on loader writes in this process; the TTL bounds staleness from other processes.
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+
+    # Range export (GET /weather/export): rows fetched from the cursor and written per chunk
+    EXPORT_BATCH_ROWS: int = 5000
+
+    # Retention (python -m app.etl.compact): hourly rows are kept RETENTION_HOURLY_DAYS days (at least 2),
+    # older days only as daily rollups (daily_weather, daily_consensus), which are deleted after
+    # RETENTION_DAILY_DAYS (0 keeps them)
+    RETENTION_HOURLY_DAYS: int = 90
+    RETENTION_DAILY_DAYS: int = 0
+    COMPACTION_BATCH_ROWS: int = 5000  # rows per delete transaction
+    COMPACTION_BATCH_CELLS: int = 200  # locations per daily_consensus aggregation
+    COMPACTION_PAUSE_SECONDS: float = 0.05  # between transactions, so live reads and loads get the database
+
+    # Metrics (/metrics, Prometheus text format)
+    METRICS_ENABLED: bool = True
+
+    # Spatial grid used to key locations (degrees per cell)
+    GRID_CELL_DEGREES: float = 0.0001
+
+    # Forecast-run snapshots: every loaded run also stored as one compressed columnar blob
+    FORECAST_SNAPSHOTS: bool = False
+    FORECAST_SNAPSHOT_COMPRESSION_LEVEL: int = 6  # zlib level
+
+    # Streaming ETL: parse upstream responses incrementally as they arrive and load them in
+    # batches of ETL_STREAM_BATCH_ROWS rows, so a run never holds a whole payload in memory
+    # (for very long horizons). Open-Meteo's hours are only complete at the end of a response,
+    # so it is requested ETL_STREAM_OPEN_METEO_DAYS days at a time and a run holds one such
+    # range. Streamed runs write no FORECAST_SNAPSHOTS.
+    ETL_STREAMING: bool = False
+    ETL_STREAM_BATCH_ROWS: int = 5000
+    ETL_STREAM_OPEN_METEO_DAYS: int = 2
+
+    # Loader
+    LOADER_BULK_UPSERT: bool = True
+    LOADER_BATCH_SIZE: int = 500
+    # Write only the hours whose values differ from the stored forecast, and record each
+    # run in forecast_runs plus the changed values in forecast_changes
+    LOADER_DIFF_RUNS: bool = True
+
+    # Database engine profile. SQLite: pragmas applied to every new connection (WAL lets
+    # readers run alongside a writer). PostgreSQL: connection pool sizing and health checks.
+    # DATABASE_TUNING=false keeps the driver defaults.
+    DATABASE_TUNING: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # durable in WAL mode except for the last commits on power loss
+    SQLITE_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024  # page cache per connection
+    SQLITE_BUSY_TIMEOUT_SECONDS: float = 30.0  # wait this long for a lock before "database is locked"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+
     class Config:
         env_file = ".env"
 
@@ -1,7 +1,12 @@
+import hashlib
 import os
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy import create_engine, event, inspect, select, func, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
 
 # Get database URL from environment, default to SQLite for local development
 # In serverless environments (Vercel), use /tmp directory which is writable
@@ -16,17 +21,57 @@ if not DATABASE_URL:
         # Local development
         DATABASE_URL = "sqlite:///./weather.db"
 
-# SQLite requires special connect_args, PostgreSQL does not
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
-    # For PostgreSQL or other databases
-    engine = create_engine(DATABASE_URL)
+def _engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """create_engine keyword arguments for the database in `url` (see DATABASE_TUNING)."""
+    if url.startswith("sqlite"):
+        # SQLite requires special connect_args, PostgreSQL does not
+        connect_args = {} if is_async else {"check_same_thread": False}
+        if settings.DATABASE_TUNING:
+            connect_args["timeout"] = settings.SQLITE_BUSY_TIMEOUT_SECONDS
+        return {"connect_args": connect_args}
+    if not settings.DATABASE_TUNING:
+        return {}
+    # For PostgreSQL or other pooled databases
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS
+    }
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_BYTES}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")  # negative: KiB, not pages
+    cursor.close()
+
+def _tune(engine_):
+    """Registers the SQLite pragmas on a sync engine (or an async engine's sync_engine)."""
+    if settings.DATABASE_TUNING and engine_.dialect.name == "sqlite":
+        event.listen(engine_, "connect", _apply_sqlite_pragmas)
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+_tune(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _async_url(url: str) -> str:
+    """The same database through its asyncio driver (aiosqlite for SQLite, asyncpg for PostgreSQL)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+# Async engine for the API's read path, so queries never hold a threadpool worker.
+# The ETL loader keeps using the sync engine above (from a worker thread).
+async_engine = create_async_engine(_async_url(DATABASE_URL), **_engine_options(DATABASE_URL, is_async=True))
+_tune(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -36,6 +81,99 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Set once init_db has created or verified the schema in this process
+_schema_ready = False
+
+def _schema_fingerprint() -> str:
+    """Hash of every table, column and index declared by the models."""
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name} {column.type}" for column in table.columns)
+        parts.extend(sorted(f"{index.name} {index.unique}" for index in table.indexes))
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
 def init_db():
-    """Initialize database tables. Call this on app startup."""
+    """
+    Initialize database tables. Call this on app startup.
+
+    Runs once per process. The fingerprint of the applied schema is stored in the
+    schema_state table, so when the database is already up to date this is a single
+    query instead of create_all plus a per-table inspection (which every serverless
+    cold start would otherwise pay).
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    from app.models.sql_models import SchemaStateTable
+
+    fingerprint = _schema_fingerprint()
+    try:
+        with engine.connect() as conn:
+            applied = conn.execute(
+                select(SchemaStateTable.value).where(SchemaStateTable.key == "fingerprint")
+            ).scalar()
+    except SQLAlchemyError:
+        applied = None  # new database, or one created before schema_state existed
+    if applied != fingerprint:
+        _migrate()
+        with engine.begin() as conn:
+            conn.execute(SchemaStateTable.__table__.delete().where(SchemaStateTable.key == "fingerprint"))
+            conn.execute(SchemaStateTable.__table__.insert().values(key="fingerprint", value=fingerprint))
+    _schema_ready = True
+
+def _migrate():
+    """Creates missing tables, columns and indexes."""
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so columns and indexes added
+    # later (e.g. grid_cell and the unique upsert keys) are applied separately.
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in columns:
+                    _add_column(conn, table, column)
+            for index in table.indexes:
+                if index.name in indexes:
+                    continue
+                if index.unique:
+                    _drop_duplicates(conn, table, index.columns)
+                index.create(bind=conn)
+
+    # Build rollups for hourly history stored before the daily table existed
+    from app.models.sql_models import WeatherTable, DailyWeatherTable
+    from app.etl.load import WeatherLoader
+    db = SessionLocal()
+    try:
+        if db.query(DailyWeatherTable.id).first() is None and db.query(WeatherTable.id).first() is not None:
+            WeatherLoader(db).refresh_daily()
+            db.commit()
+    finally:
+        db.close()
+
+def _add_column(conn, table, column):
+    """Adds a nullable column to an existing table, backfilling derived values."""
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    if column.name == "grid_cell":
+        from app.core.grid import cell_key
+        pairs = conn.execute(select(table.c.lat, table.c.lon).distinct()).all()
+        for lat, lon in pairs:
+            conn.execute(
+                table.update()
+                .where(table.c.lat == lat, table.c.lon == lon)
+                .values(grid_cell=cell_key(lat, lon))
+            )
+
+def _drop_duplicates(conn, table, columns):
+    """Keeps only the most recently inserted row for each key, so a unique index can be built."""
+    latest = select(func.max(table.c.id)).group_by(*columns)
+    conn.execute(table.delete().where(table.c.id.not_in(latest)))
@@ -0,0 +1,273 @@
+"""
+Local geocoding cache used by /weather/search and resolve_location.
+
+Search results from the Open-Meteo geocoding API are kept per query (LRU-bounded)
+and every place they contain is indexed in a trie over its normalized name, next
+to the built-in LOCATIONS. A query is answered locally when:
+
+- the same query was searched before, or
+- the trie alone has a full page of names starting with the query.
+
+Results of a shorter query are never reused for a longer one: the upstream matches
+short queries exactly and longer ones fuzzily, so an empty or short page for "be"
+says nothing about the matches for "bergen".
+
+Cached queries are persisted in the geocoding_cache table so they survive restarts.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+Place = Dict[str, Any]  # name, lat, lon, country, region (the LocationSearchResult fields)
+PlaceKey = Tuple[str, float, float]
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive form of a name or query."""
+    return " ".join(text.casefold().split())
+
+def _place_key(place: Place) -> PlaceKey:
+    return (normalize(place["name"]), round(place["lat"], 4), round(place["lon"], 4))
+
+class _TrieNode:
+    __slots__ = ("children", "places")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.places: Set[PlaceKey] = set()  # places whose normalized name ends at this node
+
+class PrefixIndex:
+    """Trie over normalized place names."""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, name: str, key: PlaceKey):
+        node = self.root
+        for char in name:
+            node = node.children.setdefault(char, _TrieNode())
+        node.places.add(key)
+
+    def remove(self, name: str, key: PlaceKey):
+        path = [self.root]
+        for char in name:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].places.discard(key)
+        # Prune branches that no longer lead to any place
+        for char, node in zip(reversed(name), reversed(path)):
+            if node.places or node.children:
+                break
+            parent = path[len(path) - 2]
+            del parent.children[char]
+            path.pop()
+
+    def _node(self, prefix: str) -> Optional[_TrieNode]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def exact(self, name: str) -> Set[PlaceKey]:
+        node = self._node(name)
+        return set(node.places) if node else set()
+
+    def search(self, prefix: str, limit: int) -> List[PlaceKey]:
+        """Up to `limit` places whose name starts with `prefix`, shortest names first."""
+        node = self._node(prefix)
+        if node is None:
+            return []
+        found: List[PlaceKey] = []
+        level = [node]
+        while level and len(found) < limit:
+            for n in level:
+                found.extend(sorted(n.places))
+            level = [child for n in level for _, child in sorted(n.children.items())]
+        return found[:limit]
+
+class GeocodingCache:
+    """Query results and a prefix index over every known place; see the module docstring."""
+
+    def __init__(self, max_queries: Optional[int] = None, page_size: Optional[int] = None):
+        self.max_queries = max_queries or settings.GEOCODING_CACHE_MAX_QUERIES
+        self.page_size = page_size or settings.GEOCODING_RESULT_COUNT
+        self._queries: "OrderedDict[str, List[PlaceKey]]" = OrderedDict()
+        self._places: Dict[PlaceKey, Place] = {}
+        self._refs: Dict[PlaceKey, int] = {}  # cached queries referencing each place
+        self._rank: Dict[PlaceKey, int] = {}  # best position the place had in any result page
+        self._pinned: Set[PlaceKey] = set()  # built-in LOCATIONS, never evicted
+        self._index = PrefixIndex()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def load(self):
+        """Indexes the built-in LOCATIONS and the persisted queries. Called on first use."""
+        from app.core.locations import LOCATIONS
+
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            for name, (lat, lon) in LOCATIONS.items():
+                place = {"name": name.title(), "lat": lat, "lon": lon, "country": "Norway", "region": None}
+                key = self._add_place(place, rank=0)
+                self._pinned.add(key)
+
+        try:
+            from app.core.database import SessionLocal
+            from app.models.sql_models import GeocodingTable
+
+            db = SessionLocal()
+            try:
+                rows = db.query(GeocodingTable).order_by(
+                    GeocodingTable.cached_at.asc(), GeocodingTable.query.asc(), GeocodingTable.rank.asc()
+                ).all()
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"Could not load the geocoding cache: {e}")
+            return
+
+        pages: "OrderedDict[str, List[Place]]" = OrderedDict()
+        for row in rows:
+            pages.setdefault(row.query, []).append({
+                "name": row.name, "lat": row.lat, "lon": row.lon, "country": row.country, "region": row.region
+            })
+        evicted = []
+        with self._lock:
+            for query, places in pages.items():
+                evicted.extend(self._set_query(query, places))
+        if evicted:
+            self._persist(None, [], evicted)
+
+    async def load_async(self):
+        """Runs load() in a worker thread so async handlers keep its query off the event loop."""
+        if not self._loaded:
+            await asyncio.to_thread(self.load)
+
+    def lookup(self, query: str) -> Optional[List[Place]]:
+        """Results for `query` if they can be answered locally, else None (caller should fetch and store)."""
+        q = normalize(query)
+        with self._lock:
+            self._ensure_loaded()
+            keys = self._queries.get(q)
+            if keys is not None:
+                self._queries.move_to_end(q)
+                self.hits += 1
+                return [dict(self._places[k]) for k in keys]
+
+            matches = self._index.search(q, self.page_size)
+            if len(matches) >= self.page_size:
+                self.prefix_hits += 1
+                return [dict(self._places[k]) for k in sorted(matches, key=lambda k: self._rank[k])]
+
+            self.misses += 1
+            return None
+
+    def store(self, query: str, places: List[Place]):
+        """Caches the result page for `query` and persists it (blocking; call off the event loop)."""
+        q = normalize(query)
+        with self._lock:
+            self._ensure_loaded()
+            evicted = self._set_query(q, places)
+        self._persist(q, places, evicted)
+
+    def resolve(self, name: str) -> Optional[Place]:
+        """Best known place whose name is exactly `name` (no network call)."""
+        with self._lock:
+            self._ensure_loaded()
+            keys = self._index.exact(normalize(name))
+            if not keys:
+                return None
+            return dict(self._places[min(keys, key=lambda k: (self._rank[k], k))])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queries": len(self._queries),
+                "places": len(self._places),
+                "hits": self.hits,
+                "prefix_hits": self.prefix_hits,
+                "misses": self.misses
+            }
+
+    def _add_place(self, place: Place, rank: int) -> PlaceKey:
+        key = _place_key(place)
+        if key not in self._places:
+            self._places[key] = dict(place)
+            self._refs[key] = 0
+            self._rank[key] = rank
+            self._index.add(key[0], key)
+        else:
+            self._rank[key] = min(self._rank[key], rank)
+        return key
+
+    def _release(self, keys: List[PlaceKey]):
+        for key in keys:
+            self._refs[key] -= 1
+            if self._refs[key] == 0 and key not in self._pinned:
+                self._index.remove(key[0], key)
+                del self._places[key], self._refs[key], self._rank[key]
+
+    def _set_query(self, q: str, places: List[Place]) -> List[str]:
+        """Replaces the cached page for `q`; returns the queries evicted to stay within max_queries."""
+        old = self._queries.pop(q, None)
+        keys = [self._add_place(place, rank) for rank, place in enumerate(places)]
+        for key in keys:
+            self._refs[key] += 1
+        if old is not None:
+            self._release(old)
+        self._queries[q] = keys
+
+        evicted = []
+        while len(self._queries) > self.max_queries:
+            query, old = self._queries.popitem(last=False)
+            self._release(old)
+            evicted.append(query)
+        return evicted
+
+    def _persist(self, q: Optional[str], places: List[Place], evicted: List[str]):
+        """Mirrors a cache update into the geocoding_cache table. Failures are logged, never raised."""
+        from app.core.database import SessionLocal
+        from app.models.sql_models import GeocodingTable
+
+        stale = evicted + ([q] if q is not None else [])
+        db = SessionLocal()
+        try:
+            if stale:
+                db.query(GeocodingTable).filter(GeocodingTable.query.in_(stale)).delete(synchronize_session=False)
+            now = datetime.utcnow()
+            db.add_all([
+                GeocodingTable(
+                    query=q,
+                    rank=rank,
+                    name=place["name"],
+                    lat=place["lat"],
+                    lon=place["lon"],
+                    country=place.get("country"),
+                    region=place.get("region"),
+                    cached_at=now
+                ) for rank, place in enumerate(places)
+            ])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Could not persist the geocoding cache: {e}")
+        finally:
+            db.close()
+
+geocoding_cache = GeocodingCache()
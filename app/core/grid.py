@@ -0,0 +1,23 @@
+from typing import Optional, Tuple
+from app.core.config import settings
+
+def _resolution(cell_degrees: Optional[float]) -> float:
+    return cell_degrees or settings.GRID_CELL_DEGREES
+
+def cell_key(lat: float, lon: float, cell_degrees: Optional[float] = None) -> int:
+    """
+    Snaps a coordinate to its grid cell and returns the cell as a single integer key.
+    Cells are numbered row-major from (-90, -180), so nearby keys share a row prefix.
+    """
+    res = _resolution(cell_degrees)
+    columns = int(round(360 / res)) + 1
+    row = int(round((lat + 90) / res))
+    col = int(round((lon + 180) / res))
+    return row * columns + col
+
+def cell_center(key: int, cell_degrees: Optional[float] = None) -> Tuple[float, float]:
+    """Inverse of cell_key: returns the (lat, lon) of the cell's centre point."""
+    res = _resolution(cell_degrees)
+    columns = int(round(360 / res)) + 1
+    row, col = divmod(key, columns)
+    return row * res - 90, col * res - 180
@@ -0,0 +1,33 @@
+from typing import Optional, Tuple
+
+# Simple hardcoded location mapping
+LOCATIONS = {
+    "oslo": (59.91, 10.75),
+    "bergen": (60.39, 5.32),
+    "trondheim": (63.43, 10.39),
+    "stavanger": (58.97, 5.73),
+    "kristiansand": (58.15, 8.02),
+    "tromsø": (69.65, 18.96)
+}
+
+def resolve_location(name: str) -> Optional[Tuple[float, float]]:
+    """
+    Resolves a location name to (lat, lon): the built-in LOCATIONS first,
+    then places previously returned by /weather/search (no network call).
+    """
+    coords = LOCATIONS.get(name.lower())
+    if coords is None:
+        from app.core.geocoding import geocoding_cache
+
+        place = geocoding_cache.resolve(name)
+        if place is not None:
+            coords = (place["lat"], place["lon"])
+    return coords
+
+async def resolve_location_async(name: str) -> Optional[Tuple[float, float]]:
+    """resolve_location for async handlers: the geocoding cache is loaded in a worker thread on first use."""
+    if name.lower() not in LOCATIONS:
+        from app.core.geocoding import geocoding_cache
+
+        await geocoding_cache.load_async()
+    return resolve_location(name)
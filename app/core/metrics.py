@@ -0,0 +1,205 @@
+"""
+In-process metrics in the Prometheus text exposition format, served at /metrics.
+
+Counters and histograms are plain dicts keyed by label values behind a per-metric
+lock, so recording costs a few dictionary operations. Set METRICS_ENABLED=false to
+turn collection (and the endpoint) off; every recording call then returns at once.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+from app.core.config import settings
+
+# Seconds; covers in-memory cache hits through slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return super().render() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values
+        ]
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NOOP_TIMER = _NoopTimer()
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the elapsed time of its block."""
+        return _Timer(self, labels) if self.registry.enabled else _NOOP_TIMER
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        lines = super().render()
+        for key, state in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(self, name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(self, name, help, labelnames, buckets=buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect: Callable[[], List[str]]):
+        """Registers a callback producing exposition lines at scrape time (e.g. cache stats)."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+# ETL stages
+EXTRACT_SECONDS = metrics.histogram("weather_etl_extract_seconds", "Upstream request latency.", ["source"])
+EXTRACT_BYTES = metrics.counter("weather_etl_extract_bytes_total", "Upstream response payload bytes.", ["source"])
+EXTRACT_ERRORS = metrics.counter("weather_etl_extract_errors_total", "Failed upstream requests.", ["source"])
+TRANSFORM_SECONDS = metrics.histogram("weather_etl_transform_seconds", "Payload to columns transform time.", ["source"])
+ROWS_PARSED = metrics.counter("weather_etl_rows_parsed_total", "Forecast rows produced by transform.", ["source"])
+LOAD_SECONDS = metrics.histogram("weather_etl_load_seconds", "Database load time per call, including commit.", ["table"])
+ROWS_WRITTEN = metrics.counter(
+    "weather_etl_rows_total", "Rows handled by the loader (inserted, updated, unchanged, or upserted when not diffing).",
+    ["table", "result"]
+)
+CONSENSUS_SECONDS = metrics.histogram("weather_etl_consensus_seconds", "Consensus reduction time.")
+
+# API
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "Request latency by route.", ["method", "route", "status"]
+)
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template (not per raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                endpoint = scope.get("endpoint")
+                route = getattr(endpoint, "__name__", "unmatched")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=scope["method"], route=route, status=status["code"]
+            )
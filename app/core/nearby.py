@@ -0,0 +1,126 @@
+"""
+In-memory index of locations with a fresh forecast, for serving nearby coordinates.
+
+Both upstream models have kilometre-scale resolution, so a /weather/current request
+within NEARBY_RADIUS_KM of a location fetched recently can be answered from that
+location's forecast instead of running ETL for (and storing) a near-duplicate.
+
+Locations are bucketed on a lat/lon grid whose cells are one radius tall, so a
+lookup only scans the bucket of the query point and its neighbours (more of them
+in longitude towards the poles, where degrees of longitude get shorter).
+Entries drop out once their forecast expires; size is bounded with LRU eviction.
+"""
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.grid import cell_key
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance."""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+@dataclass
+class Neighbour:
+    cell: int
+    lat: float
+    lon: float
+    distance_km: float
+    expires_at: datetime
+
+class NearbyIndex:
+    def __init__(self, radius_km: Optional[float] = None, max_locations: Optional[int] = None):
+        self.radius_km = settings.NEARBY_RADIUS_KM if radius_km is None else radius_km
+        self.max_locations = max_locations or settings.NEARBY_INDEX_MAX_LOCATIONS
+        self._bucket_degrees = max(self.radius_km, 0.001) / KM_PER_DEGREE
+        self._entries: "OrderedDict[int, Tuple[float, float, datetime]]" = OrderedDict()  # cell -> lat, lon, expires_at
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _bucket(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self._bucket_degrees), math.floor(lon / self._bucket_degrees)
+
+    def add(self, lat: float, lon: float, expires_at: datetime):
+        """Registers a location whose stored forecast is fresh until `expires_at` (UTC)."""
+        if self.radius_km <= 0:
+            return
+        cell = cell_key(lat, lon)
+        with self._lock:
+            self._remove(cell)
+            self._entries[cell] = (lat, lon, expires_at)
+            self._buckets.setdefault(self._bucket(lat, lon), set()).add(cell)
+            while len(self._entries) > self.max_locations:
+                self._remove(next(iter(self._entries)))
+
+    def remove(self, lat: float, lon: float):
+        with self._lock:
+            self._remove(cell_key(lat, lon))
+
+    def _remove(self, cell: int):
+        entry = self._entries.pop(cell, None)
+        if entry is None:
+            return
+        bucket = self._bucket(entry[0], entry[1])
+        cells = self._buckets.get(bucket)
+        if cells is not None:
+            cells.discard(cell)
+            if not cells:
+                del self._buckets[bucket]
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Neighbour]:
+        """
+        Up to `k` locations with an unexpired forecast within radius_km of (lat, lon),
+        nearest first. The query point's own grid cell is not included.
+        """
+        if self.radius_km <= 0:
+            return []
+        now = datetime.now(timezone.utc)
+        own = cell_key(lat, lon)
+        row, col = self._bucket(lat, lon)
+        # Buckets are one radius tall; in longitude, one radius spans more degrees away from the equator
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + self._bucket_degrees, 90.0))), 1e-6)
+        span = min(math.ceil(1 / cos_lat), math.ceil(180 / self._bucket_degrees))
+        found = []
+        with self._lock:
+            for r in range(row - 1, row + 2):
+                for c in range(col - span, col + span + 1):
+                    for cell in list(self._buckets.get((r, c), ())):
+                        entry_lat, entry_lon, expires_at = self._entries[cell]
+                        if expires_at <= now:
+                            self._remove(cell)
+                            continue
+                        if cell == own:
+                            continue
+                        distance = distance_km(lat, lon, entry_lat, entry_lon)
+                        if distance <= self.radius_km:
+                            found.append(Neighbour(cell, entry_lat, entry_lon, distance, expires_at))
+            found.sort(key=lambda n: n.distance_km)
+            found = found[:k]
+            for neighbour in found:
+                self._entries.move_to_end(neighbour.cell)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "locations": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+nearby_index = NearbyIndex()
@@ -0,0 +1,195 @@
+"""
+Popularity-driven background refresh of forecasts.
+
+/weather/current records every request here. Locations requested often enough
+(a decayed count of at least SCHEDULER_HOT_REQUESTS, halving every
+SCHEDULER_POPULARITY_HALF_LIFE_SECONDS) are refreshed in the background shortly
+before their forecast expires, so users find fresh data instead of triggering the
+refresh themselves. If upstream has nothing newer yet (the refresh leaves the
+expiry unchanged), the location is tried again at expiry, then every
+REFRESH_RETRY_SECONDS. Locations whose count decays below the threshold are no
+longer refreshed, and are forgotten once it falls near zero.
+
+Refreshes due at the same time (e.g. every Yr.no forecast expiring on the hour)
+are spread over the SCHEDULER_JITTER_SECONDS before expiry, and started hottest-first within
+SCHEDULER_CONCURRENCY running refreshes and a budget of
+SCHEDULER_UPSTREAM_REQUESTS_PER_MINUTE upstream requests. Refreshes go through
+forecast_cache, so they share the run of a user request for the same location.
+
+State is only touched from the event loop, so no locking is needed.
+"""
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.core.cache import forecast_cache
+from app.core.config import settings
+
+UPSTREAM_REQUESTS_PER_REFRESH = 2  # Yr.no and Open-Meteo
+
+@dataclass
+class _Location:
+    lat: float
+    lon: float
+    score: float  # decayed request count as of `seen`
+    seen: float  # time.time() of the last request
+    expires_at: Optional[float] = None  # forecast expiry that `due_at` was computed from
+    due_at: Optional[float] = None
+    retry_at: float = 0.0  # after a failed refresh
+
+class RefreshScheduler:
+    def __init__(self):
+        self.enabled = settings.SCHEDULER_ENABLED
+        self.concurrency = settings.SCHEDULER_CONCURRENCY
+        self.requests_per_minute = settings.SCHEDULER_UPSTREAM_REQUESTS_PER_MINUTE
+        self.half_life = settings.SCHEDULER_POPULARITY_HALF_LIFE_SECONDS
+        self.hot_requests = settings.SCHEDULER_HOT_REQUESTS
+        self.jitter_seconds = settings.SCHEDULER_JITTER_SECONDS
+        self.tick_seconds = settings.SCHEDULER_TICK_SECONDS
+        self.max_locations = settings.SCHEDULER_MAX_LOCATIONS
+        self._locations: "OrderedDict[int, _Location]" = OrderedDict()  # least recently requested first
+        self._running: Dict[int, asyncio.Task] = {}
+        self._queue: List[Tuple[float, float, int]] = []  # (-score, due_at, cell) of due refreshes waiting to start
+        self._tokens = float(self.requests_per_minute)
+        self._tokens_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.failed = 0
+        self.last_lag_seconds = 0.0  # how late the last refresh started after it was due
+
+    def record(self, cell: int, lat: float, lon: float):
+        """Counts a request for the location in `cell`."""
+        if not self.enabled:
+            return
+        now = time.time()
+        location = self._locations.get(cell)
+        if location is None:
+            location = self._locations[cell] = _Location(lat=lat, lon=lon, score=0.0, seen=now)
+            while len(self._locations) > self.max_locations:
+                self._locations.popitem(last=False)
+        location.score = self._score(location, now) + 1
+        location.seen = now
+        self._locations.move_to_end(cell)
+
+    def _score(self, location: _Location, now: float) -> float:
+        return location.score * 0.5 ** ((now - location.seen) / self.half_life)
+
+    def start(self):
+        """Starts the scheduling loop on the running event loop (app startup)."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        """Stops the loop and cancels refreshes still running (app shutdown)."""
+        tasks = list(self._running.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._running.clear()
+        self._queue = []
+
+    async def _loop(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Refresh scheduler tick failed: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    def tick(self):
+        """Rebuilds the queue of due refreshes and starts what the budget allows."""
+        now = time.time()
+        queue = []
+        for cell, location in list(self._locations.items()):
+            score = self._score(location, now)
+            if score < self.hot_requests / 10:
+                del self._locations[cell]  # nobody asks for it any more
+                continue
+            if score < self.hot_requests or cell in self._running or location.retry_at > now:
+                continue
+            expires_at = forecast_cache.expires_at(cell)
+            expires = expires_at.timestamp() if expires_at is not None else None
+            if location.due_at is None or expires != location.expires_at:
+                location.expires_at = expires
+                if expires is None:
+                    # Not refreshed by this process yet: due now, spread over the jitter window
+                    location.due_at = now + random.uniform(0, self.jitter_seconds)
+                else:
+                    # Within the jitter window before expiry, so the forecast served never expires
+                    location.due_at = max(now, expires - random.uniform(0, self.jitter_seconds))
+            if location.due_at <= now:
+                queue.append((-score, location.due_at, cell))
+        queue.sort()
+        self._queue = queue
+        self._dispatch()
+
+    def _dispatch(self):
+        now = time.time()
+        while self._queue and len(self._running) < self.concurrency:
+            _, due_at, cell = self._queue[0]
+            location = self._locations.get(cell)
+            if location is None or cell in self._running:
+                self._queue.pop(0)
+                continue
+            if not self._take_budget():
+                break  # retried on the next tick or when a refresh finishes
+            self._queue.pop(0)
+            self.last_lag_seconds = max(0.0, now - due_at)
+            task = self._running[cell] = asyncio.ensure_future(self._refresh(cell, location))
+            task.add_done_callback(lambda _: self._dispatch())
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.requests_per_minute),
+            self._tokens + (now - self._tokens_at) * self.requests_per_minute / 60
+        )
+        self._tokens_at = now
+        if self._tokens < UPSTREAM_REQUESTS_PER_REFRESH:
+            return False
+        self._tokens -= UPSTREAM_REQUESTS_PER_REFRESH
+        return True
+
+    async def _refresh(self, cell: int, location: _Location):
+        async def refresh():
+            # The ETL stack is imported on first use, not at cold start
+            from app.core.utils import run_etl_pipeline_async
+
+            return (await run_etl_pipeline_async(location.lat, location.lon)).expires_at
+
+        try:
+            await forecast_cache.get_or_refresh_async(cell, refresh, force=True)
+            self.refreshed += 1
+            expires_at = forecast_cache.expires_at(cell)
+            if location.expires_at is not None and (expires_at is None or expires_at.timestamp() <= location.expires_at):
+                # Nothing newer upstream yet: try again at expiry, then every REFRESH_RETRY_SECONDS
+                location.due_at = max(location.expires_at, time.time() + settings.REFRESH_RETRY_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            location.retry_at = time.time() + settings.REFRESH_RETRY_SECONDS
+            print(f"Scheduled refresh failed for {location.lat}, {location.lon}: {e}")
+        finally:
+            self._running.pop(cell, None)
+
+    def stats(self) -> Dict[str, float]:
+        now = time.time()
+        return {
+            "tracked": len(self._locations),
+            "hot": sum(1 for location in self._locations.values() if self._score(location, now) >= self.hot_requests),
+            "queued": len(self._queue),
+            "running": len(self._running),
+            # How long the oldest queued refresh has been due (0 when the queue is empty)
+            "lag_seconds": max((now - due_at for _, due_at, _ in self._queue), default=0.0),
+            "last_lag_seconds": self.last_lag_seconds,
+            "refreshed": self.refreshed,
+            "failed": self.failed
+        }
+
+refresh_scheduler = RefreshScheduler()
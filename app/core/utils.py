@@ -1,45 +1,120 @@
-from typing import Tuple, Optional
+import asyncio
+import weakref
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple, Optional
 from sqlalchemy.orm import Session
-from app.etl.extract import YrNoFetcher, OpenMeteoFetcher
+from app.core.config import settings
+from app.core.grid import cell_key
+from app.core.locations import LOCATIONS, resolve_location  # noqa: F401  (re-exported)
+from app.core.metrics import TRANSFORM_SECONDS, ROWS_PARSED
+from app.core.nearby import nearby_index
+from app.etl.extract import YrNoFetcher, OpenMeteoFetcher, WeatherFetcher, FetchResult, fetch_all, fetch_all_async, run_sync
 from app.etl.transform import WeatherTransformer
 from app.etl.load import WeatherLoader
+from app.models.columns import ForecastColumns
 
-# Simple hardcoded location mapping
-LOCATIONS = {
-    "oslo": (59.91, 10.75),
-    "bergen": (60.39, 5.32),
-    "trondheim": (63.43, 10.39),
-    "stavanger": (58.97, 5.73),
-    "kristiansand": (58.15, 8.02),
-    "tromsø": (69.65, 18.96)
-}
+@dataclass
+class EtlResult:
+    rows: int  # hourly rows written
+    expires_at: datetime  # earliest time any source expects to publish a newer forecast
 
-def resolve_location(name: str) -> Optional[Tuple[float, float]]:
-    """Resolves a location name to (lat, lon)."""
-    return LOCATIONS.get(name.lower())
+def transform_fetched(
+    yr_result: FetchResult,
+    om_result: FetchResult,
+    lat: float,
+    lon: float
+) -> Tuple[List[ForecastColumns], List[ForecastColumns]]:
+    """
+    Columnar transform of one location's fetch results.
+
+    Returns (forecasts, changed): every source's forecast (the consensus input)
+    and the subset that needs loading. A Yr.no 304 reuses the columns parsed
+    from the stored payload and is left out of `changed`, since its rows are already stored.
+    """
+    yr_unchanged = yr_result.not_modified and yr_result.cache_entry.points is not None
+    if yr_unchanged:
+        yr_columns = yr_result.cache_entry.points
+    else:
+        with TRANSFORM_SECONDS.time(source=YrNoFetcher.source.value):
+            yr_columns = WeatherTransformer.transform_yr_columns(yr_result.payload, lat, lon)
+        ROWS_PARSED.inc(len(yr_columns), source=YrNoFetcher.source.value)
+        yr_columns.issued_at = yr_result.issued_at
+        if yr_result.cache_entry is not None:
+            yr_result.cache_entry.points = yr_columns
+    with TRANSFORM_SECONDS.time(source=OpenMeteoFetcher.source.value):
+        om_columns = WeatherTransformer.transform_open_meteo_columns(om_result.payload, lat, lon)
+    ROWS_PARSED.inc(len(om_columns), source=OpenMeteoFetcher.source.value)
+    om_columns.issued_at = om_result.issued_at
+    forecasts = [yr_columns, om_columns]
+    return forecasts, [om_columns] if yr_unchanged else forecasts
 
-def run_etl_pipeline(lat: float, lon: float, db: Session):
+def run_etl_pipeline(lat: float, lon: float, db: Session) -> EtlResult:
     """
     Runs the full Extract -> Transform -> Load pipeline for a specific location.
     """
     print(f"Triggering ETL pipeline for {lat}, {lon}")
-    
-    # 1. Extract
+    if settings.ETL_STREAMING:
+        result = run_sync(stream_etl_async(lat, lon, db))
+    else:
+        # 1. Extract (all sources concurrently over the shared connection pool)
+        try:
+            yr_result, om_result = fetch_all([YrNoFetcher(), OpenMeteoFetcher()], lat, lon)
+        except Exception as e:
+            print(f"Extraction failed: {e}")
+            raise e
+
+        result = _transform_and_load(yr_result, om_result, lat, lon, db)
+    nearby_index.add(lat, lon, result.expires_at)
+    return result
+
+# One semaphore per event loop (asyncio primitives are bound to the loop that first uses them)
+_etl_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def etl_semaphore() -> asyncio.Semaphore:
+    """Limits concurrent API-triggered ETL runs to settings.ETL_MAX_CONCURRENCY."""
+    loop = asyncio.get_running_loop()
+    semaphore = _etl_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _etl_semaphores[loop] = asyncio.Semaphore(settings.ETL_MAX_CONCURRENCY)
+    return semaphore
+
+async def run_etl_pipeline_async(lat: float, lon: float) -> EtlResult:
+    """
+    Async variant of run_etl_pipeline for the API.
+
+    Waits for an ETL slot, fetches on the event loop, then transforms and loads in a
+    worker thread with its own session, so the loop stays free for read requests.
+    The location is then registered in nearby_index until its forecast expires.
+    """
+    async with etl_semaphore():
+        print(f"Triggering ETL pipeline for {lat}, {lon}")
+        if settings.ETL_STREAMING:
+            result = await stream_etl_async(lat, lon)
+        else:
+            try:
+                yr_result, om_result = await fetch_all_async([YrNoFetcher(), OpenMeteoFetcher()], lat, lon)
+            except Exception as e:
+                print(f"Extraction failed: {e}")
+                raise e
+
+            result = await asyncio.to_thread(_transform_and_load_new_session, yr_result, om_result, lat, lon)
+        nearby_index.add(lat, lon, result.expires_at)
+        return result
+
+def _transform_and_load_new_session(yr_result: FetchResult, om_result: FetchResult, lat: float, lon: float) -> EtlResult:
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
     try:
-        yr_fetcher = YrNoFetcher()
-        om_fetcher = OpenMeteoFetcher()
-        
-        yr_data = yr_fetcher.fetch_forecast(lat, lon)
-        om_data = om_fetcher.fetch_forecast(lat, lon)
-    except Exception as e:
-        print(f"Extraction failed: {e}")
-        raise e
+        return _transform_and_load(yr_result, om_result, lat, lon, db)
+    finally:
+        db.close()
 
+def _transform_and_load(yr_result: FetchResult, om_result: FetchResult, lat: float, lon: float, db: Session) -> EtlResult:
     # 2. Transform
     try:
-        yr_points = WeatherTransformer.transform_yr(yr_data, lat, lon)
-        om_points = WeatherTransformer.transform_open_meteo(om_data, lat, lon)
-        all_points = yr_points + om_points
+        forecasts, changed = transform_fetched(yr_result, om_result, lat, lon)
     except Exception as e:
         print(f"Transformation failed: {e}")
         raise e
@@ -47,13 +122,106 @@ def run_etl_pipeline(lat: float, lon: float, db: Session):
     # 3. Load
     try:
         loader = WeatherLoader(db)
-        loader.load_data(all_points)
+        rows = loader.load_columns(changed)
         
         # 4. Consensus (Weighted ETL)
-        consensus_points = WeatherTransformer.calculate_consensus(all_points)
-        loader.load_consensus(consensus_points)
+        consensus = WeatherTransformer.calculate_consensus_columns(forecasts)
+        loader.load_consensus_columns([consensus])
     except Exception as e:
         print(f"Loading failed: {e}")
         raise e
         
-    return len(all_points)
+    return EtlResult(
+        rows=rows,
+        expires_at=min(yr_result.expires_at, om_result.expires_at)
+    )
+
+async def stream_etl_async(lat: float, lon: float, db: Optional[Session] = None) -> EtlResult:
+    """
+    Streaming Extract -> Transform -> Load (settings.ETL_STREAMING).
+
+    Both sources are parsed as their bodies arrive (app.etl.stream) and the batches are
+    passed through a small bounded queue to WeatherLoader.load_stream, which runs in a
+    worker thread. At most two batches wait at any time, and Open-Meteo is requested a
+    few days at a time (OpenMeteoFetcher.stream_windows), so memory does not grow with
+    the forecast horizon. Consensus is then rebuilt from the stored rows of the
+    location, one window of about a batch of rows at a time. Batches are committed as
+    they are loaded: if a source fails mid-stream, the batches already loaded stay and
+    the error is raised.
+    """
+    from app.core.database import SessionLocal
+    from app.etl.consensus import rebuild_consensus
+    from app.etl.stream import stream_columns
+
+    loop = asyncio.get_running_loop()
+    batches: asyncio.Queue = asyncio.Queue(maxsize=2)
+    results: List[FetchResult] = []
+    hours: List[datetime] = []  # first and last hour of every batch
+
+    async def produce(fetcher: WeatherFetcher):
+        source = fetcher.source.value
+        # One request per window (Open-Meteo: a few days each), read one after the other
+        for days in fetcher.stream_windows():
+            async with fetcher.stream_async(lat, lon, days) as (result, chunks):
+                results.append(result)
+                if result.not_modified:
+                    return  # rows already stored; consensus is rebuilt from them
+                async for batch in stream_columns(fetcher.source, chunks, lat, lon):
+                    ROWS_PARSED.inc(len(batch), source=source)
+                    if not len(batch):
+                        continue
+                    batch.issued_at = result.issued_at
+                    hours.extend(batch.timestamps[[0, -1]].astype(datetime).tolist())
+                    await batches.put([batch])
+
+    async def produce_all():
+        try:
+            await asyncio.gather(produce(YrNoFetcher()), produce(OpenMeteoFetcher()))
+        finally:
+            await batches.put(None)
+
+    def queued() -> Iterator[List[ForecastColumns]]:
+        # Runs in the loader's thread; blocks on the event loop's queue
+        while (batch := asyncio.run_coroutine_threadsafe(batches.get(), loop).result()) is not None:
+            yield batch
+
+    def load(session: Session) -> int:
+        loader = WeatherLoader(session)
+        rows = loader.load_stream(queued())
+        if hours:
+            # Two sources per hour: windows of this many hours read about one batch of rows
+            window = timedelta(hours=max(1, settings.ETL_STREAM_BATCH_ROWS // 2))
+            start, last = min(hours), max(hours)
+            while start <= last:
+                rebuild_consensus(session, cells=[cell_key(lat, lon)], since=start, until=start + window)
+                start += window
+        return rows
+
+    def load_new_session() -> int:
+        session = SessionLocal()
+        try:
+            return load(session)
+        finally:
+            session.close()
+
+    producer = asyncio.create_task(produce_all())
+    try:
+        if db is None:
+            rows = await asyncio.to_thread(load_new_session)
+        else:
+            rows = await asyncio.to_thread(load, db)
+        await producer  # raises the first extract or parse failure
+    except Exception as e:
+        print(f"Streaming ETL failed: {e}")
+        raise
+    finally:
+        producer.cancel()
+        # If this run was cancelled mid-stream, release the loader thread waiting on the queue
+        while not batches.empty():
+            batches.get_nowait()
+        batches.put_nowait(None)
+
+    return EtlResult(
+        rows=rows,
+        expires_at=min(r.expires_at for r in results)
+    )
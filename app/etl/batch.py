@@ -0,0 +1,254 @@
+"""
+Batch ETL runner: extract, transform and load many locations in one go.
+
+Locations are processed by a bounded pool of async workers. Each source has its
+own request-rate limit, failed requests are retried with exponential backoff,
+and rows are written to the database in batches of several locations by a
+single writer so that loads never contend with each other.
+
+Usage (e.g. from cron, to pre-warm the database):
+    python -m app.etl.batch                      # the built-in LOCATIONS map
+    python -m app.etl.batch --locations sites.csv --workers 16 --json
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import httpx
+from app.core.config import settings
+from app.etl.extract import WeatherFetcher, YrNoFetcher, OpenMeteoFetcher, FetchResult, close_async_client
+from app.models.columns import ForecastColumns
+
+Location = Tuple[str, float, float]
+
+def load_locations(path: Optional[str] = None) -> List[Location]:
+    """
+    Reads (name, lat, lon) locations from a CSV (name,lat,lon) or JSON file
+    ([{"name": ..., "lat": ..., "lon": ...}] or {"name": [lat, lon]}).
+    Without a path, returns the LOCATIONS map from app.core.locations.
+    """
+    if path is None:
+        from app.core.locations import LOCATIONS
+        return [(name, lat, lon) for name, (lat, lon) in LOCATIONS.items()]
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            data = json.load(f)
+            if isinstance(data, dict):
+                return [(name, float(lat), float(lon)) for name, (lat, lon) in data.items()]
+            return [(item.get("name", f"{item['lat']},{item['lon']}"), float(item["lat"]), float(item["lon"])) for item in data]
+        rows = [row for row in csv.reader(f) if row and not row[0].startswith("#")]
+    if rows and rows[0][0].strip().lower() == "name":
+        rows = rows[1:]
+    return [(row[0].strip(), float(row[1]), float(row[2])) for row in rows]
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart (per source, shared by all workers)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+@dataclass
+class BatchReport:
+    locations: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retries: int = 0
+    rows_loaded: int = 0
+    consensus_rows: int = 0
+    # Seconds spent in each stage, summed over locations (extract overlaps across workers)
+    stage_seconds: Dict[str, float] = field(default_factory=lambda: {
+        "extract": 0.0, "transform": 0.0, "load": 0.0, "consensus": 0.0
+    })
+    wall_seconds: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def locations_per_second(self) -> float:
+        return self.succeeded / self.wall_seconds if self.wall_seconds else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["locations_per_second"] = self.locations_per_second
+        return data
+
+    def summary(self) -> str:
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.stage_seconds.items())
+        return (
+            f"{self.succeeded}/{self.locations} locations in {self.wall_seconds:.2f}s "
+            f"({self.locations_per_second:.2f} loc/s), {self.failed} failed, {self.retries} retries, "
+            f"{self.rows_loaded} rows + {self.consensus_rows} consensus rows loaded. Stages: {stages}"
+        )
+
+class BatchEtlRunner:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        db_batch_locations: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        rate_limits: Optional[Dict[str, float]] = None
+    ):
+        self.workers = workers or settings.BATCH_WORKERS
+        self.db_batch_locations = db_batch_locations or settings.BATCH_DB_LOCATIONS
+        self.max_retries = settings.BATCH_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = settings.BATCH_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+        self.rate_limits = rate_limits or settings.BATCH_RATE_LIMITS
+        self.fetchers: List[WeatherFetcher] = [YrNoFetcher(), OpenMeteoFetcher()]
+        self.report = BatchReport()
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def _limiter(self, source: str) -> RateLimiter:
+        if source not in self._limiters:
+            self._limiters[source] = RateLimiter(self.rate_limits.get(source, 0))
+        return self._limiters[source]
+
+    async def _fetch(self, fetcher: WeatherFetcher, lat: float, lon: float) -> FetchResult:
+        limiter = self._limiter(fetcher.source.value)
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            try:
+                return await fetcher.fetch_async(lat, lon)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                self.report.retries += 1
+                await asyncio.sleep(self.backoff_seconds * 2 ** attempt * (1 + random.random()))
+
+    async def _process(self, location: Location) -> Tuple[List[ForecastColumns], List[ForecastColumns]]:
+        from app.core.utils import transform_fetched
+
+        _, lat, lon = location
+        t0 = time.perf_counter()
+        yr_result, om_result = await asyncio.gather(*(self._fetch(f, lat, lon) for f in self.fetchers))
+        t1 = time.perf_counter()
+        forecasts, changed = transform_fetched(yr_result, om_result, lat, lon)
+        self.report.stage_seconds["extract"] += t1 - t0
+        self.report.stage_seconds["transform"] += time.perf_counter() - t1
+        return forecasts, changed
+
+    async def _worker(self, queue: "asyncio.Queue[Location]", results: asyncio.Queue):
+        while True:
+            try:
+                location = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await results.put(await self._process(location))
+                self.report.succeeded += 1
+            except Exception as e:
+                self.report.failed += 1
+                self.report.errors[location[0]] = str(e)
+                print(f"Batch ETL failed for {location[0]}: {e}")
+
+    def _flush(self, batch: List[Tuple[List[ForecastColumns], List[ForecastColumns]]]):
+        """Loads a batch of locations with one hourly write and one consensus write."""
+        from app.core.database import SessionLocal
+        from app.etl.consensus import ConsensusEngine
+        from app.etl.load import WeatherLoader
+
+        db = SessionLocal()
+        try:
+            loader = WeatherLoader(db)
+            changed = [f for _, location_changed in batch for f in location_changed]
+            t0 = time.perf_counter()
+            rows = loader.load_columns(changed)
+            t1 = time.perf_counter()
+            consensus = ConsensusEngine().compute([f for forecasts, _ in batch for f in forecasts])
+            loader.load_consensus_columns(consensus)
+            t2 = time.perf_counter()
+        finally:
+            db.close()
+        self.report.stage_seconds["load"] += t1 - t0
+        self.report.stage_seconds["consensus"] += t2 - t1
+        self.report.rows_loaded += rows
+        self.report.consensus_rows += sum(len(c) for c in consensus)
+
+    async def _writer(self, results: asyncio.Queue):
+        batch = []
+        while True:
+            item = await results.get()
+            if item is not None:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= self.db_batch_locations):
+                try:
+                    await asyncio.to_thread(self._flush, batch)
+                except Exception as e:
+                    # Keep draining so workers never block on a full queue
+                    self.report.succeeded -= len(batch)
+                    self.report.failed += len(batch)
+                    self.report.errors[f"db batch of {len(batch)}"] = str(e)
+                    print(f"Batch ETL load failed: {e}")
+                batch = []
+            if item is None:
+                return
+
+    async def run_async(self, locations: Sequence[Location]) -> BatchReport:
+        self.report = BatchReport(locations=len(locations))
+        queue: "asyncio.Queue[Location]" = asyncio.Queue()
+        for location in locations:
+            queue.put_nowait(location)
+        # Bounded so fetching cannot run arbitrarily far ahead of the database
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.db_batch_locations * 2)
+
+        start = time.perf_counter()
+        writer = asyncio.create_task(self._writer(results))
+        await asyncio.gather(*(self._worker(queue, results) for _ in range(min(self.workers, len(locations)) or 1)))
+        await results.put(None)
+        await writer
+        self.report.wall_seconds = time.perf_counter() - start
+        return self.report
+
+    def run(self, locations: Sequence[Location]) -> BatchReport:
+        async def _run():
+            try:
+                return await self.run_async(locations)
+            finally:
+                await close_async_client()
+        return asyncio.run(_run())
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", help="CSV (name,lat,lon) or JSON file; defaults to the built-in LOCATIONS")
+    parser.add_argument("--workers", type=int, help=f"concurrent locations (default {settings.BATCH_WORKERS})")
+    parser.add_argument("--db-batch", type=int, help=f"locations per database write (default {settings.BATCH_DB_LOCATIONS})")
+    parser.add_argument("--retries", type=int, help=f"retries per request (default {settings.BATCH_MAX_RETRIES})")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON (logs go to stderr)")
+    args = parser.parse_args(argv)
+
+    # The ETL logs with print; with --json, stdout carries the report only
+    with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+        from app.core.database import init_db
+        init_db()
+
+        locations = load_locations(args.locations)
+        runner = BatchEtlRunner(workers=args.workers, db_batch_locations=args.db_batch, max_retries=args.retries)
+        print(f"[{datetime.utcnow().isoformat()}] Batch ETL for {len(locations)} locations")
+        report = runner.run(locations)
+    print(json.dumps(report.to_dict(), indent=2) if args.json else report.summary())
+    return 1 if report.failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+"""
+Retention and downsampling of stored history.
+
+Tiers (settings.RETENTION_*):
+1. Hourly rows (weather_data, consensus_data, and the forecast_changes /
+   forecast_snapshots history) are kept for RETENTION_HOURLY_DAYS whole UTC days.
+2. Older days remain only as daily min/mean/max rollups: daily_weather, which the
+   loader maintains for every hour it writes, and daily_consensus, which this job
+   aggregates from consensus_data before the hourly rows go.
+3. With RETENTION_DAILY_DAYS set, daily rollups and forecast_runs older than that
+   are deleted too.
+
+The job is incremental: it only aggregates days that passed the retention since the
+last run, and deletes in transactions of COMPACTION_BATCH_ROWS rows with a short
+pause in between, so live reads and loads are never blocked for long. The watermark
+(schema_state HOURLY_RETAINED_FROM_KEY) is advanced before anything is deleted; read
+endpoints use the daily tables for days before it. An interrupted run is picked up
+by the next one.
+
+Usage (e.g. nightly from cron):
+    python -m app.etl.compact [--json]
+"""
+import argparse
+import json
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Sequence
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.etl.load import WeatherLoader
+from app.models.sql_models import (
+    WeatherTable, ConsensusTable, DailyWeatherTable, DailyConsensusTable, ForecastSnapshotTable,
+    ForecastRunTable, ForecastChangeTable, SchemaStateTable, HOURLY_RETAINED_FROM_KEY
+)
+
+# Hourly data is never compacted closer to today than this: the loader recomputes
+# daily_weather from the hourly rows of every day a forecast touches
+MIN_HOURLY_DAYS = 2
+
+@dataclass
+class CompactionReport:
+    hourly_cutoff: Optional[datetime] = None
+    daily_cutoff: Optional[date] = None
+    daily_consensus_rows: int = 0
+    deleted: Dict[str, int] = field(default_factory=dict)  # rows per table
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        deleted = ", ".join(f"{table} {rows}" for table, rows in self.deleted.items()) or "nothing"
+        return (
+            f"Hourly data kept from {self.hourly_cutoff}, daily from {self.daily_cutoff or 'the start'}; "
+            f"{self.daily_consensus_rows} daily consensus rows written, deleted {deleted} in {self.seconds:.2f}s"
+        )
+
+def hourly_retained_from(db: Session) -> Optional[datetime]:
+    """The compaction watermark: hourly rows before it may be gone (None if never compacted)."""
+    value = db.execute(
+        select(SchemaStateTable.value).where(SchemaStateTable.key == HOURLY_RETAINED_FROM_KEY)
+    ).scalar()
+    return datetime.fromisoformat(value) if value else None
+
+def _set_hourly_retained_from(db: Session, cutoff: datetime):
+    db.execute(SchemaStateTable.__table__.delete().where(SchemaStateTable.key == HOURLY_RETAINED_FROM_KEY))
+    db.execute(SchemaStateTable.__table__.insert().values(key=HOURLY_RETAINED_FROM_KEY, value=cutoff.isoformat()))
+    db.commit()
+
+def downsample_consensus(db: Session, since: Optional[datetime], until: datetime,
+                         batch_cells: Optional[int] = None) -> int:
+    """
+    Aggregates consensus_data hours in [since, until) into daily_consensus, a batch of
+    locations per transaction. Returns the number of daily rows written.
+    """
+    batch_cells = batch_cells or settings.COMPACTION_BATCH_CELLS
+    window = [ConsensusTable.timestamp < until]
+    if since is not None:
+        window.append(ConsensusTable.timestamp >= since)
+    cells = [c for (c,) in db.execute(select(ConsensusTable.grid_cell).where(*window).distinct()) if c is not None]
+
+    loader = WeatherLoader(db)
+    day = func.date(ConsensusTable.timestamp)
+    written = 0
+    for start in range(0, len(cells), batch_cells):
+        rows = db.execute(select(
+            ConsensusTable.grid_cell,
+            func.min(ConsensusTable.lat).label("lat"),
+            func.min(ConsensusTable.lon).label("lon"),
+            day.label("day"),
+            func.sum(ConsensusTable.weighted_temperature).label("total"),
+            func.count(ConsensusTable.weighted_temperature).label("count"),
+            func.min(ConsensusTable.weighted_temperature).label("low"),
+            func.max(ConsensusTable.weighted_temperature).label("high"),
+            func.min(ConsensusTable.temperature_lower).label("lower"),
+            func.max(ConsensusTable.temperature_upper).label("upper"),
+            func.max(ConsensusTable.source_count).label("sources")
+        ).where(
+            ConsensusTable.grid_cell.in_(cells[start:start + batch_cells]), *window
+        ).group_by(ConsensusTable.grid_cell, day)).all()
+        loader.load_daily_consensus([
+            {
+                "grid_cell": r.grid_cell,
+                "lat": r.lat,
+                "lon": r.lon,
+                # SQLite's date() returns text
+                "date": date.fromisoformat(r.day) if isinstance(r.day, str) else r.day,
+                "weighted_temperature_sum": r.total,
+                "weighted_temperature_count": r.count,
+                "weighted_temperature_min": r.low,
+                "weighted_temperature_max": r.high,
+                "temperature_lower": r.lower,
+                "temperature_upper": r.upper,
+                "source_count": r.sources
+            } for r in rows
+        ])
+        written += len(rows)
+    return written
+
+def delete_before(db: Session, column, cutoff, batch_rows: Optional[int] = None,
+                  pause_seconds: Optional[float] = None) -> int:
+    """Deletes rows of `column`'s table where column < cutoff, batch_rows per transaction."""
+    batch_rows = batch_rows or settings.COMPACTION_BATCH_ROWS
+    pause_seconds = settings.COMPACTION_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    table = column.class_
+    deleted = 0
+    while True:
+        ids = db.execute(select(table.id).where(column < cutoff).limit(batch_rows)).scalars().all()
+        if not ids:
+            return deleted
+        db.execute(table.__table__.delete().where(table.id.in_(ids)))
+        db.commit()
+        deleted += len(ids)
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+def compact(db: Session, today: Optional[date] = None, hourly_days: Optional[int] = None,
+            daily_days: Optional[int] = None) -> CompactionReport:
+    """Applies the retention tiers as of `today` (UTC); see the module docstring."""
+    from app.core.cache import response_cache
+
+    started = time.perf_counter()
+    today = today or datetime.utcnow().date()
+    hourly_days = max(MIN_HOURLY_DAYS, settings.RETENTION_HOURLY_DAYS if hourly_days is None else hourly_days)
+    daily_days = settings.RETENTION_DAILY_DAYS if daily_days is None else daily_days
+    report = CompactionReport(hourly_cutoff=datetime.combine(today - timedelta(days=hourly_days), datetime.min.time()))
+
+    # Tier 2: downsample the days that left the hourly window since the last run. Days before
+    # the previous watermark are already aggregated (and their hours possibly partly deleted).
+    previous = hourly_retained_from(db)
+    if previous is None or previous < report.hourly_cutoff:
+        report.daily_consensus_rows = downsample_consensus(db, previous, report.hourly_cutoff)
+        _set_hourly_retained_from(db, report.hourly_cutoff)
+    cutoff = max(report.hourly_cutoff, previous or report.hourly_cutoff)
+
+    hourly = (
+        WeatherTable.timestamp,
+        ConsensusTable.timestamp,
+        ForecastChangeTable.timestamp,
+        ForecastSnapshotTable.issued_at
+    )
+    for column in hourly:
+        report.deleted[column.class_.__tablename__] = delete_before(db, column, cutoff)
+
+    # Tier 3: drop old daily rollups
+    if daily_days:
+        report.daily_cutoff = today - timedelta(days=max(daily_days, hourly_days))
+        for column, value in (
+            (DailyWeatherTable.date, report.daily_cutoff),
+            (DailyConsensusTable.date, report.daily_cutoff),
+            (ForecastRunTable.issued_at, datetime.combine(report.daily_cutoff, datetime.min.time()))
+        ):
+            report.deleted[column.class_.__tablename__] = delete_before(db, column, value)
+        if report.deleted[DailyWeatherTable.__tablename__]:
+            response_cache.invalidate()
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hourly-days", type=int, help=f"days of hourly data to keep (default {settings.RETENTION_HOURLY_DAYS})")
+    parser.add_argument("--daily-days", type=int, help=f"days of daily rollups to keep, 0 for all (default {settings.RETENTION_DAILY_DAYS})")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    from app.core.database import SessionLocal, init_db
+    init_db()
+
+    db = SessionLocal()
+    try:
+        report = compact(db, hourly_days=args.hourly_days, daily_days=args.daily_days)
+    finally:
+        db.close()
+    print(json.dumps(report.to_dict(), indent=2, default=str) if args.json else report.summary())
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
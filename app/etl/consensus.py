@@ -0,0 +1,181 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.grid import cell_key
+from app.core.metrics import CONSENSUS_SECONDS
+from app.models.columns import ForecastColumns, ConsensusColumns
+from app.models.sql_models import WeatherTable
+
+class ConsensusEngine:
+    """
+    Weighted multi-source consensus.
+
+    Rows from any number of sources and locations are aligned on (location, hour)
+    and reduced in a single vectorized pass with np.bincount:
+
+        mean     = sum(w * t) / sum(w)
+        variance = sum(w * (t - mean)^2) / sum(w)
+        interval = mean -/+ z * sqrt(variance)
+
+    The interval is a source-spread band, not a confidence interval for the true
+    temperature: it only measures the (reliability-weighted) disagreement between
+    sources. With a single source there is no spread to measure, so its bounds are
+    NaN (stored as NULL, and the API reports no interval).
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, z: Optional[float] = None):
+        self.weights = dict(settings.CONSENSUS_WEIGHTS if weights is None else weights)
+        self.z = settings.CONSENSUS_CONFIDENCE_Z if z is None else z
+
+    def weight(self, source: str) -> float:
+        return self.weights.get(source, settings.CONSENSUS_DEFAULT_WEIGHT)
+
+    def combine(
+        self,
+        cells: np.ndarray,
+        timestamps: np.ndarray,
+        weights: np.ndarray,
+        temperature: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Reduces flat per-row arrays into one consensus value per (cell, timestamp).
+
+        Returns arrays sorted by cell then timestamp: cell, timestamp, weighted_temperature,
+        temperature_lower, temperature_upper (NaN where only one source reports), source_count.
+        Keys with zero total weight are dropped.
+        """
+        with CONSENSUS_SECONDS.time():
+            return self._combine(cells, timestamps, weights, temperature)
+
+    def _combine(self, cells, timestamps, weights, temperature) -> Dict[str, np.ndarray]:
+        if len(timestamps) == 0:
+            return {
+                "cell": np.array([], dtype=np.int64),
+                "timestamp": np.array([], dtype="datetime64[s]"),
+                "weighted_temperature": np.array([]),
+                "temperature_lower": np.array([]),
+                "temperature_upper": np.array([]),
+                "source_count": np.array([], dtype=np.int64)
+            }
+
+        ts = timestamps.astype("datetime64[s]")
+        order = np.lexsort((ts.astype(np.int64), cells))
+        cells, ts, w, x = cells[order], ts[order], weights[order], temperature[order]
+
+        starts = np.r_[True, (cells[1:] != cells[:-1]) | (ts[1:] != ts[:-1])]
+        group = np.cumsum(starts) - 1
+        n = group[-1] + 1
+
+        total_weight = np.bincount(group, weights=w, minlength=n)
+        source_count = np.bincount(group, minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(group, weights=w * x, minlength=n) / total_weight
+            deviation = x - mean[group]
+            spread = np.sqrt(np.bincount(group, weights=w * deviation * deviation, minlength=n) / total_weight)
+        half_width = np.where(source_count >= 2, self.z * spread, np.nan)
+
+        keep = total_weight > 0
+        return {
+            "cell": cells[starts][keep],
+            "timestamp": ts[starts][keep],
+            "weighted_temperature": mean[keep],
+            "temperature_lower": (mean - half_width)[keep],
+            "temperature_upper": (mean + half_width)[keep],
+            "source_count": source_count[keep]
+        }
+
+    def compute(self, forecasts: Sequence[ForecastColumns]) -> List[ConsensusColumns]:
+        """Consensus for each location present in `forecasts` (any number of sources per location)."""
+        forecasts = [f for f in forecasts if len(f)]
+        if not forecasts:
+            return []
+
+        coords = {}
+        for f in forecasts:
+            coords.setdefault(cell_key(f.lat, f.lon), (f.lat, f.lon))
+
+        result = self.combine(
+            cells=np.concatenate([np.full(len(f), cell_key(f.lat, f.lon), dtype=np.int64) for f in forecasts]),
+            timestamps=np.concatenate([f.timestamps for f in forecasts]),
+            weights=np.concatenate([np.full(len(f), self.weight(f.source.value)) for f in forecasts]),
+            temperature=np.concatenate([f.temperature for f in forecasts])
+        )
+        return self._split(result, coords)
+
+    @staticmethod
+    def _split(result: Dict[str, np.ndarray], coords: Dict[int, tuple]) -> List[ConsensusColumns]:
+        """Splits the flat (cell-sorted) result into one ConsensusColumns per location."""
+        cells = result["cell"]
+        bounds = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1], True])
+        out = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            lat, lon = coords[int(cells[start])]
+            out.append(ConsensusColumns(
+                lat=lat,
+                lon=lon,
+                timestamps=result["timestamp"][start:end],
+                weighted_temperature=result["weighted_temperature"][start:end],
+                source_count=result["source_count"][start:end],
+                temperature_lower=result["temperature_lower"][start:end],
+                temperature_upper=result["temperature_upper"][start:end]
+            ))
+        return out
+
+def rebuild_consensus(db: Session, cells: Optional[Sequence[int]] = None, weights: Optional[Dict[str, float]] = None,
+                      chunk_size: int = 200, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+    """
+    Recomputes stored consensus from weather_data, e.g. after changing CONSENSUS_WEIGHTS.
+    Works through locations `chunk_size` cells at a time, optionally only for hours in
+    [since, until) (naive UTC); returns the number of consensus rows written.
+    """
+    from app.etl.load import WeatherLoader
+
+    engine = ConsensusEngine(weights)
+    if cells is None:
+        cells = [c for (c,) in db.query(WeatherTable.grid_cell).distinct() if c is not None]
+    cells = list(cells)
+
+    loader = WeatherLoader(db)
+    written = 0
+    for start in range(0, len(cells), chunk_size):
+        rows = db.query(
+            WeatherTable.grid_cell,
+            WeatherTable.lat,
+            WeatherTable.lon,
+            WeatherTable.source,
+            WeatherTable.timestamp,
+            WeatherTable.temperature
+        ).filter(
+            WeatherTable.grid_cell.in_(cells[start:start + chunk_size]),
+            WeatherTable.temperature.isnot(None),
+            *([WeatherTable.timestamp >= since] if since is not None else []),
+            *([WeatherTable.timestamp < until] if until is not None else [])
+        ).all()
+        if not rows:
+            continue
+
+        coords = {}
+        for row in rows:
+            coords.setdefault(row.grid_cell, (row.lat, row.lon))
+        result = engine.combine(
+            cells=np.array([r.grid_cell for r in rows], dtype=np.int64),
+            timestamps=np.array([r.timestamp for r in rows], dtype="datetime64[s]"),
+            weights=np.array([engine.weight(r.source) for r in rows]),
+            temperature=np.array([r.temperature for r in rows], dtype=np.float64)
+        )
+        consensus = ConsensusEngine._split(result, coords)
+        loader.load_consensus_columns(consensus)
+        written += sum(len(c) for c in consensus)
+    return written
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal, init_db
+
+    init_db()
+    session = SessionLocal()
+    try:
+        print(f"Rebuilt {rebuild_consensus(session)} consensus rows with weights {settings.CONSENSUS_WEIGHTS}")
+    finally:
+        session.close()
@@ -1,79 +1,371 @@
-import requests
+import asyncio
+import threading
+import time
+import weakref
+import httpx
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, AsyncContextManager, AsyncIterator, List, Optional, Sequence, Coroutine, Tuple
 from app.core.config import settings
+from app.core.metrics import EXTRACT_SECONDS, EXTRACT_BYTES, EXTRACT_ERRORS
+from app.models.schemas import WeatherSource
+
+# One pooled client per event loop: httpx connections are bound to the loop that opened them.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the shared keep-alive HTTP client for the running event loop.
+    Connections (and their TLS sessions) are reused across requests and sources.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            headers={"User-Agent": settings.USER_AGENT},
+            timeout=settings.HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+        _async_clients[loop] = client
+    return client
+
+async def close_async_client():
+    """Closes the running loop's pooled client, e.g. before a short-lived loop (asyncio.run) exits."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+class _LoopThread:
+    """
+    A long-lived event loop in a daemon thread used by the sync wrappers.
+    Keeping the loop alive keeps its pooled client (and open connections) alive between calls.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._loop.run_forever, name="weather-etl-http", daemon=True)
+                thread.start()
+            return self._loop
+
+    def run(self, coro: Coroutine) -> Any:
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result()
+
+_loop_thread = _LoopThread()
+
+def run_sync(coro: Coroutine) -> Any:
+    """Runs a fetcher coroutine to completion from synchronous code."""
+    return _loop_thread.run(coro)
+
+@dataclass
+class ConditionalEntry:
+    """Validators and last parsed response for one location, used for conditional requests."""
+    last_modified: str  # raw Last-Modified header, echoed back as If-Modified-Since
+    payload: Optional[Dict[str, Any]]  # None when the response was streamed (see stream_async)
+    points: Any = None  # transformed output of `payload`, attached by the pipeline
+
+@dataclass
+class FetchResult:
+    """A fetched forecast payload plus the upstream freshness information that came with it."""
+    payload: Dict[str, Any]
+    expires_at: datetime
+    last_modified: Optional[datetime] = None
+    not_modified: bool = False  # upstream answered 304; `payload` is the stored copy
+    cache_entry: Optional[ConditionalEntry] = None
+    issued_at: Optional[datetime] = None  # when the forecast run was issued, if known
+
+async def _counted_chunks(response: httpx.Response, source: str) -> AsyncIterator[bytes]:
+    """The response body as it arrives, counted towards the extract byte metric."""
+    async for chunk in response.aiter_bytes():
+        EXTRACT_BYTES.inc(len(chunk), source=source)
+        yield chunk
+
+async def _no_chunks() -> AsyncIterator[bytes]:
+    return
+    yield
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).astimezone(timezone.utc)
+    except (TypeError, ValueError):
+        return None
 
 class WeatherFetcher(ABC):
     """Abstract base class for weather data fetchers."""
-    
+
+    source: WeatherSource
+
     @abstractmethod
-    def fetch_forecast(self, lat: float, lon: float) -> Dict[str, Any]:
+    async def fetch_async(self, lat: float, lon: float) -> FetchResult:
         """
         Fetch weather forecast for a given latitude and longitude.
-        
+
         Args:
             lat: Latitude
             lon: Longitude
-            
+
         Returns:
-            Raw JSON response as a dictionary.
+            FetchResult with the raw JSON response and when the source expects to publish new data.
         """
         pass
 
-class YrNoFetcher(WeatherFetcher):
-    """Fetcher for Yr.no (MET Norway)."""
-    
+    @abstractmethod
+    def stream_async(self, lat: float, lon: float,
+                     days: Optional[Tuple[date, date]] = None) -> AsyncContextManager[Tuple[FetchResult, AsyncIterator[bytes]]]:
+        """
+        Like fetch_async, but without reading the body: an async context manager yielding
+        the FetchResult (payload None) and an iterator over the body chunks as they
+        arrive, for incremental parsing (app.etl.stream). `days` is one of the
+        stream_windows: the (first, last) UTC days to request, or None for the whole forecast.
+        """
+        pass
+
+    def stream_windows(self, today: Optional[date] = None) -> List[Optional[Tuple[date, date]]]:
+        """The requests a streamed run is split into (see stream_async); one by default."""
+        return [None]
+
+    async def fetch_forecast_async(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Raw JSON response as a dictionary."""
+        return (await self.fetch_async(lat, lon)).payload
+
     def fetch_forecast(self, lat: float, lon: float) -> Dict[str, Any]:
-        headers = {
-            "User-Agent": settings.USER_AGENT
+        """Synchronous wrapper around fetch_forecast_async."""
+        return run_sync(self.fetch_forecast_async(lat, lon))
+
+class YrNoFetcher(WeatherFetcher):
+    """
+    Fetcher for Yr.no (MET Norway).
+
+    Sends If-Modified-Since for locations fetched before, as MET's terms of service ask.
+    A 304 returns the stored payload with not_modified=True, so callers can skip transform and load.
+    """
+
+    source = WeatherSource.YR_NO
+
+    # Shared across instances (the pipeline creates a fetcher per run); LRU-bounded
+    _conditional: "OrderedDict[Any, ConditionalEntry]" = OrderedDict()
+    _conditional_lock = threading.Lock()
+
+    def _conditional_headers(self, key) -> Tuple[Optional[ConditionalEntry], Optional[Dict[str, str]]]:
+        """The stored entry for `key` and the If-Modified-Since header to send, if any."""
+        with self._conditional_lock:
+            entry = self._conditional.get(key)
+        return entry, {"If-Modified-Since": entry.last_modified} if entry else None
+
+    def _remember(self, key, entry: ConditionalEntry):
+        with self._conditional_lock:
+            self._conditional[key] = entry
+            self._conditional.move_to_end(key)
+            while len(self._conditional) > settings.YR_CONDITIONAL_CACHE_MAX_ENTRIES:
+                self._conditional.popitem(last=False)
+
+    @staticmethod
+    def _result(response: httpx.Response, payload: Optional[Dict[str, Any]], not_modified: bool,
+                entry: Optional[ConditionalEntry]) -> FetchResult:
+        # MET Norway publishes when the forecast may next change in the Expires header
+        now = datetime.now(timezone.utc)
+        expires_at = _parse_http_date(response.headers.get("Expires"))
+        if expires_at is None or expires_at <= now:
+            expires_at = now + timedelta(seconds=settings.FORECAST_DEFAULT_TTL_SECONDS)
+        last_modified = _parse_http_date(entry.last_modified if entry else None)
+        return FetchResult(
+            payload=payload,
+            expires_at=expires_at,
+            last_modified=last_modified,
+            not_modified=not_modified,
+            cache_entry=entry,
+            issued_at=last_modified
+        )
+
+    async def fetch_async(self, lat: float, lon: float) -> FetchResult:
+        params = {
+            "lat": lat,
+            "lon": lon
         }
+        key = (lat, lon)
+        entry, headers = self._conditional_headers(key)
+        if entry is not None and entry.payload is None:
+            entry, headers = None, None  # streamed last time: no stored payload to fall back on
+
+        try:
+            with EXTRACT_SECONDS.time(source=self.source.value):
+                response = await get_async_client().get(settings.YR_NO_BASE_URL, params=params, headers=headers)
+            EXTRACT_BYTES.inc(len(response.content), source=self.source.value)
+            not_modified = response.status_code == 304 and entry is not None
+            if not not_modified:
+                response.raise_for_status()
+                payload = response.json()
+        except httpx.HTTPError as e:
+            EXTRACT_ERRORS.inc(source=self.source.value)
+            print(f"Error fetching from Yr.no: {e}")
+            raise
+
+        if not_modified:
+            payload = entry.payload
+        elif response.headers.get("Last-Modified"):
+            entry = ConditionalEntry(last_modified=response.headers["Last-Modified"], payload=payload)
+            self._remember(key, entry)
+        else:
+            entry = None
+        return self._result(response, payload, not_modified, entry)
+
+    @asynccontextmanager
+    async def stream_async(self, lat: float, lon: float, days: Optional[Tuple[date, date]] = None):
+        """
+        Streaming fetch_async (Yr.no always sends the whole forecast; `days` is unused). A 304 yields no chunks (the rows are already stored);
+        only the validators of a streamed response are kept, not its payload.
+        """
         params = {
             "lat": lat,
             "lon": lon
         }
-        
+        key = (lat, lon)
+        entry, headers = self._conditional_headers(key)
+
+        start = time.perf_counter()
         try:
-            response = requests.get(settings.YR_NO_BASE_URL, headers=headers, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            async with get_async_client().stream("GET", settings.YR_NO_BASE_URL, params=params, headers=headers) as response:
+                EXTRACT_SECONDS.observe(time.perf_counter() - start, source=self.source.value)
+                not_modified = response.status_code == 304 and entry is not None
+                if not not_modified:
+                    response.raise_for_status()
+                    if response.headers.get("Last-Modified"):
+                        entry = ConditionalEntry(last_modified=response.headers["Last-Modified"], payload=None)
+                        self._remember(key, entry)
+                    else:
+                        entry = None
+                chunks = _no_chunks() if not_modified else _counted_chunks(response, self.source.value)
+                yield self._result(response, None, not_modified, entry), chunks
+        except httpx.HTTPError as e:
+            EXTRACT_ERRORS.inc(source=self.source.value)
             print(f"Error fetching from Yr.no: {e}")
             raise
 
 class OpenMeteoFetcher(WeatherFetcher):
     """Fetcher for Open-Meteo."""
-    
-    def fetch_forecast(self, lat: float, lon: float) -> Dict[str, Any]:
-        params = {
+
+    source = WeatherSource.OPEN_METEO
+
+    async def fetch_async(self, lat: float, lon: float) -> FetchResult:
+        try:
+            with EXTRACT_SECONDS.time(source=self.source.value):
+                response = await get_async_client().get(settings.OPEN_METEO_BASE_URL, params=self._params(lat, lon))
+            EXTRACT_BYTES.inc(len(response.content), source=self.source.value)
+            response.raise_for_status()
+            payload = response.json()
+        except httpx.HTTPError as e:
+            EXTRACT_ERRORS.inc(source=self.source.value)
+            print(f"Error fetching from Open-Meteo: {e}")
+            raise
+
+        return self._result(payload)
+
+    @asynccontextmanager
+    async def stream_async(self, lat: float, lon: float, days: Optional[Tuple[date, date]] = None):
+        start = time.perf_counter()
+        params = self._params(lat, lon)
+        if days is not None:
+            del params["forecast_days"]
+            params["start_date"], params["end_date"] = (day.isoformat() for day in days)
+        try:
+            async with get_async_client().stream("GET", settings.OPEN_METEO_BASE_URL, params=params) as response:
+                EXTRACT_SECONDS.observe(time.perf_counter() - start, source=self.source.value)
+                response.raise_for_status()
+                yield self._result(None), _counted_chunks(response, self.source.value)
+        except httpx.HTTPError as e:
+            EXTRACT_ERRORS.inc(source=self.source.value)
+            print(f"Error fetching from Open-Meteo: {e}")
+            raise
+
+    def stream_windows(self, today: Optional[date] = None) -> List[Optional[Tuple[date, date]]]:
+        """
+        The forecast in ranges of ETL_STREAM_OPEN_METEO_DAYS days. Open-Meteo sends
+        column arrays, so an hour is only complete at the end of a response; requesting
+        it in ranges bounds what a streamed run has to hold to one range.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        step = max(1, settings.ETL_STREAM_OPEN_METEO_DAYS)
+        total = settings.OPEN_METEO_FORECAST_DAYS
+        return [
+            (today + timedelta(days=first), today + timedelta(days=min(first + step, total) - 1))
+            for first in range(0, total, step)
+        ]
+
+    @staticmethod
+    def _params(lat: float, lon: float) -> Dict[str, Any]:
+        return {
             "latitude": lat,
             "longitude": lon,
             "hourly": "temperature_2m,precipitation",
+            "forecast_days": settings.OPEN_METEO_FORECAST_DAYS,
             "timezone": "UTC"
         }
-        
-        try:
-            response = requests.get(settings.OPEN_METEO_BASE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"Error fetching from Open-Meteo: {e}")
-            raise
+
+    def _result(self, payload: Optional[Dict[str, Any]]) -> FetchResult:
+        # Open-Meteo sends no cache headers; its models update on a fixed cadence,
+        # so the run is identified by the update window it was fetched in
+        expires_at = self.next_update(datetime.now(timezone.utc))
+        return FetchResult(
+            payload=payload,
+            expires_at=expires_at,
+            issued_at=expires_at - timedelta(minutes=settings.OPEN_METEO_UPDATE_MINUTES)
+        )
+
+    @staticmethod
+    def next_update(now: datetime) -> datetime:
+        """Start of the next OPEN_METEO_UPDATE_MINUTES window after `now`."""
+        step = settings.OPEN_METEO_UPDATE_MINUTES * 60
+        epoch = int(now.timestamp())
+        return datetime.fromtimestamp(epoch - epoch % step + step, tz=timezone.utc)
+
+async def fetch_all_async(fetchers: Sequence[WeatherFetcher], lat: float, lon: float) -> List[FetchResult]:
+    """
+    Fetches the forecast from every source concurrently.
+    Results are returned in the same order as `fetchers`; the first failure is raised.
+    """
+    return list(await asyncio.gather(*(f.fetch_async(lat, lon) for f in fetchers)))
+
+def fetch_all(fetchers: Sequence[WeatherFetcher], lat: float, lon: float) -> List[FetchResult]:
+    """Synchronous wrapper around fetch_all_async."""
+    return run_sync(fetch_all_async(fetchers, lat, lon))
 
 class GeocodingFetcher:
     """Fetcher for Open-Meteo Geocoding API."""
-    
-    def search(self, query: str) -> Dict[str, Any]:
+
+    async def search_async(self, query: str) -> Dict[str, Any]:
         params = {
             "name": query,
-            "count": 10,
+            "count": settings.GEOCODING_RESULT_COUNT,
             "language": "en",
             "format": "json"
         }
-        
+
         try:
-            response = requests.get(settings.OPEN_METEO_GEOCODING_URL, params=params, timeout=10)
+            with EXTRACT_SECONDS.time(source="geocoding"):
+                response = await get_async_client().get(settings.OPEN_METEO_GEOCODING_URL, params=params)
+            EXTRACT_BYTES.inc(len(response.content), source="geocoding")
             response.raise_for_status()
             return response.json()
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
+            EXTRACT_ERRORS.inc(source="geocoding")
             print(f"Error fetching from Open-Meteo Geocoding: {e}")
             raise
+
+    def search(self, query: str) -> Dict[str, Any]:
+        """Synchronous wrapper around search_async."""
+        return run_sync(self.search_async(query))
@@ -1,85 +1,399 @@
-from typing import List
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Set, Tuple
+from datetime import date, datetime, time, timedelta, timezone
 from sqlalchemy.orm import Session
 from app.models.schemas import WeatherDataPoint, ConsensusDataPoint
-from app.models.sql_models import WeatherTable, ConsensusTable, Base
-from app.core.database import engine
+from app.models.columns import ForecastColumns, ConsensusColumns, to_datetimes, to_naive_utc, to_optional_floats
+from app.models.sql_models import (
+    WeatherTable, ConsensusTable, DailyWeatherTable, DailyConsensusTable, ForecastSnapshotTable, ForecastRunTable,
+    ForecastChangeTable
+)
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.grid import cell_key
+from app.core.metrics import LOAD_SECONDS, ROWS_WRITTEN
+from app.etl.snapshot import SNAPSHOT_KEYS, snapshot_row
 
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
+# Dialects that support INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = ("sqlite", "postgresql")
+
+WEATHER_KEYS = ("timestamp", "lat", "lon", "source")
+CONSENSUS_KEYS = ("timestamp", "lat", "lon")
+DAILY_KEYS = ("grid_cell", "source", "date")
+DAILY_CONSENSUS_KEYS = ("grid_cell", "date")
+RUN_KEYS = ("grid_cell", "source", "issued_at")
+CHANGE_KEYS = ("grid_cell", "source", "timestamp", "issued_at")
+
+def _utc_date(ts: datetime) -> date:
+    """UTC calendar date of a timestamp; naive timestamps are already UTC."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.date()
+
+def _same(a: Optional[float], b: Optional[float]) -> bool:
+    """Value equality where None and NaN both mean missing."""
+    if a is None or a != a:
+        return b is None or b != b
+    return a == b
 
 class WeatherLoader:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, bulk: Optional[bool] = None, batch_size: Optional[int] = None,
+                 diff: Optional[bool] = None):
+        """
+        Args:
+            db: Database session.
+            bulk: Write each batch with a single INSERT ... ON CONFLICT DO UPDATE statement.
+                Defaults to settings.LOADER_BULK_UPSERT; ignored on dialects without upsert support.
+            batch_size: Rows per upsert statement. Defaults to settings.LOADER_BATCH_SIZE.
+            diff: Write only changed hours and record forecast runs (see _diff_runs).
+                Defaults to settings.LOADER_DIFF_RUNS.
+        """
         self.db = db
+        self.bulk = settings.LOADER_BULK_UPSERT if bulk is None else bulk
+        self.batch_size = batch_size or settings.LOADER_BATCH_SIZE
+        self.diff = settings.LOADER_DIFF_RUNS if diff is None else diff
+        self._stream_runs: Optional[Set[Tuple[int, str]]] = None  # runs already started by load_stream
+
+    def _can_upsert(self) -> bool:
+        return self.bulk and self.db.get_bind().dialect.name in UPSERT_DIALECTS
 
-    def load_data(self, points: List[WeatherDataPoint]):
+    def _write(self, model, rows: List[Dict[str, Any]], keys: Sequence[str]):
+        """Inserts or updates `rows` keyed on `keys`, in bulk where the dialect allows."""
+        if not rows:
+            return
+        if self._can_upsert():
+            self._upsert(model.__table__, rows, keys)
+        else:
+            self._merge(model, rows, keys)
+
+    def _upsert(self, table, rows: List[Dict[str, Any]], keys: Sequence[str]):
         """
-        Loads a list of WeatherDataPoints into the database.
-        Merges duplicates based on business keys if implemented, 
-        currently does simple inserts.
-        """
-        for point in points:
-            # Check for existing record to avoid duplicates (naive approach)
-            # In a real high-throughput scenario, use "upsert" or unique constraints.
-            # We assume (timestamp, lat, lon, source) is unique.
-            existing = self.db.query(WeatherTable).filter(
-                WeatherTable.timestamp == point.timestamp,
-                WeatherTable.lat == point.lat,
-                WeatherTable.lon == point.lon,
-                WeatherTable.source == point.source
-            ).first()
+        Writes rows with INSERT ... ON CONFLICT (keys) DO UPDATE, one executemany per batch.
+        Relies on the unique index over `keys` declared on the table.
+        """
+        if self.db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
 
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={c: stmt.excluded[c] for c in rows[0] if c not in keys}
+        )
+        for start in range(0, len(rows), self.batch_size):
+            self.db.execute(stmt, rows[start:start + self.batch_size])
+
+    def _merge(self, model, rows: List[Dict[str, Any]], keys: Sequence[str]):
+        """Row-by-row fallback: one lookup per row, then insert or update."""
+        for row in rows:
+            existing = self.db.query(model).filter_by(**{k: row[k] for k in keys}).first()
             if existing:
-                # Update existing record
-                existing.temperature = point.temperature
-                existing.precipitation = point.precipitation
+                for name, value in row.items():
+                    setattr(existing, name, value)
             else:
-                # Create new record
-                db_item = WeatherTable(
-                    timestamp=point.timestamp,
-                    lat=point.lat,
-                    lon=point.lon,
-                    source=point.source,
-                    temperature=point.temperature,
-                    precipitation=point.precipitation
+                self.db.add(model(**row))
+
+    def load_data(self, points: List[WeatherDataPoint]) -> int:
+        """
+        Loads a list of WeatherDataPoints into the database.
+        Rows are keyed on (timestamp, lat, lon, source); existing rows are updated.
+        Returns the number of rows written.
+        """
+        fetched_at = datetime.utcnow()
+        rows = [
+            {
+                "timestamp": point.timestamp,
+                "lat": point.lat,
+                "lon": point.lon,
+                "grid_cell": cell_key(point.lat, point.lon),
+                "source": point.source.value,
+                "temperature": point.temperature,
+                "precipitation": point.precipitation,
+                "fetched_at": fetched_at
+            } for point in points
+        ]
+        return self._load_weather_rows(rows, {}, fetched_at)
+
+    def load_columns(self, forecasts: Sequence[ForecastColumns]) -> int:
+        """
+        Columnar variant of load_data: rows are built straight from the arrays
+        without materialising WeatherDataPoints. With settings.FORECAST_SNAPSHOTS,
+        each forecast is also stored as a compressed run snapshot (app.etl.snapshot).
+        """
+        rows, issued = [], {}
+        fetched_at = datetime.utcnow()
+        for forecast in forecasts:
+            cell = cell_key(forecast.lat, forecast.lon)
+            source = forecast.source.value
+            rows.extend(
+                {
+                    "timestamp": ts,
+                    "lat": forecast.lat,
+                    "lon": forecast.lon,
+                    "grid_cell": cell,
+                    "source": source,
+                    "temperature": temp,
+                    "precipitation": precip,
+                    "fetched_at": fetched_at
+                } for ts, temp, precip in zip(
+                    to_datetimes(forecast.timestamps),
+                    forecast.temperature.tolist(),
+                    forecast.precipitation.tolist()
                 )
-                self.db.add(db_item)
-        
+            )
+            if forecast.issued_at is not None:
+                issued[(cell, source)] = to_naive_utc(forecast.issued_at)
+        snapshots = []
+        if settings.FORECAST_SNAPSHOTS and self._stream_runs is None:
+            snapshots = [snapshot_row(f, issued_at=fetched_at) for f in forecasts if len(f)]
+        return self._load_weather_rows(rows, issued, fetched_at, snapshots)
+
+    def load_stream(self, batches: Iterable[Sequence[ForecastColumns]]) -> int:
+        """
+        Loads forecasts arriving as consecutive slices (e.g. from app.etl.stream), one
+        load_columns transaction per batch, pulling the next batch only after the last
+        one is written. A run's forecast_runs counts add up across its batches.
+        Snapshots need a whole run, so none are written.
+        Returns the number of rows written.
+        """
+        self._stream_runs = set()
+        try:
+            return sum(self.load_columns(batch) for batch in batches)
+        finally:
+            self._stream_runs = None
+
+    def _load_weather_rows(self, rows: List[Dict[str, Any]], issued: Dict[Tuple[int, str], datetime],
+                           fetched_at: datetime, snapshots: Sequence[Dict[str, Any]] = ()) -> int:
+        """
+        Writes hourly rows (only the changed ones when diffing), their run records and
+        snapshots, and the affected daily rollups, in one transaction.
+        `issued` maps (grid_cell, source) to the run's issue time.
+        """
         try:
-            self.db.commit()
-            print(f"Successfully loaded {len(points)} records.")
+            with LOAD_SECONDS.time(table=WeatherTable.__tablename__):
+                total = len(rows)
+                if self.diff:
+                    rows, inserted = self._diff_runs(rows, issued, fetched_at)
+                self._write(WeatherTable, rows, WEATHER_KEYS)
+                self._write(ForecastSnapshotTable, list(snapshots), SNAPSHOT_KEYS)
+                self.refresh_daily({(row["grid_cell"], _utc_date(row["timestamp"])) for row in rows})
+                self.db.commit()
+            response_cache.invalidate({row["grid_cell"] for row in rows})
+            if self.diff:
+                ROWS_WRITTEN.inc(inserted, table=WeatherTable.__tablename__, result="inserted")
+                ROWS_WRITTEN.inc(len(rows) - inserted, table=WeatherTable.__tablename__, result="updated")
+                ROWS_WRITTEN.inc(total - len(rows), table=WeatherTable.__tablename__, result="unchanged")
+            else:
+                ROWS_WRITTEN.inc(len(rows), table=WeatherTable.__tablename__, result="upserted")
+            print(f"Successfully loaded {len(rows)} records ({total - len(rows)} unchanged).")
+            return len(rows)
         except Exception as e:
             self.db.rollback()
             print(f"Error loading data: {e}")
             raise
 
+    def _diff_runs(self, rows: List[Dict[str, Any]], issued: Dict[Tuple[int, str], datetime],
+                   fetched_at: datetime) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Compares incoming rows with the stored forecast for each (grid_cell, source) and
+        returns the hours that are new or whose values changed, plus how many are new.
+        Records the run in forecast_runs and the changed values in forecast_changes.
+        """
+        if not rows:
+            return rows, 0
+        for row in rows:
+            row["timestamp"] = to_naive_utc(row["timestamp"])
+
+        stored: Dict[Tuple[int, str, datetime], Tuple[Optional[float], Optional[float]]] = {}
+        cells = sorted({row["grid_cell"] for row in rows})
+        first = min(row["timestamp"] for row in rows)
+        last = max(row["timestamp"] for row in rows)
+        for start in range(0, len(cells), self.batch_size):
+            for r in self.db.query(
+                WeatherTable.grid_cell,
+                WeatherTable.source,
+                WeatherTable.timestamp,
+                WeatherTable.temperature,
+                WeatherTable.precipitation
+            ).filter(
+                WeatherTable.grid_cell.in_(cells[start:start + self.batch_size]),
+                WeatherTable.timestamp >= first,
+                WeatherTable.timestamp <= last
+            ):
+                stored[(r.grid_cell, r.source, r.timestamp)] = (r.temperature, r.precipitation)
+
+        changed, runs, inserted = [], {}, 0
+        for row in rows:
+            key = (row["grid_cell"], row["source"])
+            run = runs.get(key)
+            if run is None:
+                run = runs[key] = {
+                    "grid_cell": row["grid_cell"],
+                    "lat": row["lat"],
+                    "lon": row["lon"],
+                    "source": row["source"],
+                    "issued_at": issued.get(key, fetched_at),
+                    "loaded_at": fetched_at,
+                    "hours": 0, "changed_hours": 0, "new_hours": 0
+                }
+            run["hours"] += 1
+            previous = stored.get((*key, row["timestamp"]))
+            if previous is not None and _same(previous[0], row["temperature"]) and _same(previous[1], row["precipitation"]):
+                continue
+            run["changed_hours"] += 1
+            run["new_hours"] += previous is None
+            inserted += previous is None
+            changed.append(row)
+
+        # A run loaded again (e.g. re-fetched within the same issue window) accumulates its counts
+        for r in self.db.query(ForecastRunTable).filter(
+            ForecastRunTable.grid_cell.in_({run["grid_cell"] for run in runs.values()}),
+            ForecastRunTable.issued_at.in_({run["issued_at"] for run in runs.values()})
+        ):
+            run = runs.get((r.grid_cell, r.source))
+            if run is not None and run["issued_at"] == r.issued_at:
+                run["changed_hours"] += r.changed_hours or 0
+                run["new_hours"] += r.new_hours or 0
+                if self._stream_runs is not None and (r.grid_cell, r.source) in self._stream_runs:
+                    run["hours"] += r.hours or 0  # a later batch of the run being streamed
+        if self._stream_runs is not None:
+            self._stream_runs.update(runs)
+
+        self._write(ForecastRunTable, list(runs.values()), RUN_KEYS)
+        self._write(ForecastChangeTable, [
+            {
+                "grid_cell": row["grid_cell"],
+                "source": row["source"],
+                "timestamp": row["timestamp"],
+                "issued_at": runs[(row["grid_cell"], row["source"])]["issued_at"],
+                "temperature": row["temperature"],
+                "precipitation": row["precipitation"]
+            } for row in changed
+        ], CHANGE_KEYS)
+        return changed, inserted
+
+    def refresh_daily(self, days: Optional[Set[Tuple[int, date]]] = None):
+        """
+        Recomputes the daily_weather rollups for the given (grid_cell, UTC date) pairs
+        from the hourly rows, or for every day in weather_data when `days` is None.
+        Does not commit; load_data runs it in the same transaction as the hourly write.
+        """
+        if days is not None and not days:
+            return
+
+        self.db.flush()
+        query = self.db.query(
+            WeatherTable.grid_cell,
+            WeatherTable.lat,
+            WeatherTable.lon,
+            WeatherTable.source,
+            WeatherTable.timestamp,
+            WeatherTable.temperature,
+            WeatherTable.precipitation
+        )
+        if days is not None:
+            first = min(d for _, d in days)
+            last = max(d for _, d in days)
+            query = query.filter(
+                WeatherTable.grid_cell.in_({cell for cell, _ in days}),
+                WeatherTable.timestamp >= datetime.combine(first, time()),
+                WeatherTable.timestamp < datetime.combine(last + timedelta(days=1), time())
+            )
+
+        rollups: Dict[Tuple[int, str, date], Dict[str, Any]] = {}
+        for row in query:
+            day = _utc_date(row.timestamp)
+            if days is not None and (row.grid_cell, day) not in days:
+                continue
+            key = (row.grid_cell, row.source, day)
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = {
+                    "grid_cell": row.grid_cell,
+                    "lat": row.lat,
+                    "lon": row.lon,
+                    "source": row.source,
+                    "date": day,
+                    "temperature_sum": 0.0, "temperature_count": 0,
+                    "temperature_min": None, "temperature_max": None,
+                    "precipitation_sum": 0.0, "precipitation_count": 0,
+                    "precipitation_min": None, "precipitation_max": None
+                }
+            for name, value in (("temperature", row.temperature), ("precipitation", row.precipitation)):
+                if value is None:
+                    continue
+                rollup[f"{name}_sum"] += value
+                rollup[f"{name}_count"] += 1
+                low, high = rollup[f"{name}_min"], rollup[f"{name}_max"]
+                rollup[f"{name}_min"] = value if low is None else min(low, value)
+                rollup[f"{name}_max"] = value if high is None else max(high, value)
+
+        self._write(DailyWeatherTable, list(rollups.values()), DAILY_KEYS)
+
     def load_consensus(self, points: List[ConsensusDataPoint]):
         """
         Loads a list of ConsensusDataPoints into the database.
+        Rows are keyed on (timestamp, lat, lon); existing rows are updated.
         """
-        for point in points:
-            existing = self.db.query(ConsensusTable).filter(
-                ConsensusTable.timestamp == point.timestamp,
-                ConsensusTable.lat == point.lat,
-                ConsensusTable.lon == point.lon
-            ).first()
+        self._load_consensus_rows([
+            {
+                "timestamp": point.timestamp,
+                "lat": point.lat,
+                "lon": point.lon,
+                "grid_cell": cell_key(point.lat, point.lon),
+                "weighted_temperature": point.weighted_temperature,
+                "temperature_lower": point.temperature_lower,
+                "temperature_upper": point.temperature_upper,
+                "source_count": point.source_count
+            } for point in points
+        ])
 
-            if existing:
-                existing.weighted_temperature = point.weighted_temperature
-                existing.source_count = point.source_count
-            else:
-                db_item = ConsensusTable(
-                    timestamp=point.timestamp,
-                    lat=point.lat,
-                    lon=point.lon,
-                    weighted_temperature=point.weighted_temperature,
-                    source_count=point.source_count
+    def load_consensus_columns(self, consensus: Sequence[ConsensusColumns]):
+        """Columnar variant of load_consensus; accepts one ConsensusColumns per location."""
+        rows = []
+        for location in consensus:
+            cell = cell_key(location.lat, location.lon)
+            rows.extend(
+                {
+                    "timestamp": ts,
+                    "lat": location.lat,
+                    "lon": location.lon,
+                    "grid_cell": cell,
+                    "weighted_temperature": temp,
+                    "temperature_lower": lower,
+                    "temperature_upper": upper,
+                    "source_count": count
+                } for ts, temp, lower, upper, count in zip(
+                    to_datetimes(location.timestamps),
+                    location.weighted_temperature.tolist(),
+                    to_optional_floats(location.temperature_lower),
+                    to_optional_floats(location.temperature_upper),
+                    location.source_count.tolist()
                 )
-                self.db.add(db_item)
-        
+            )
+        self._load_consensus_rows(rows)
+
+    def _load_consensus_rows(self, rows: List[Dict[str, Any]]):
         try:
-            self.db.commit()
-            print(f"Successfully loaded {len(points)} consensus records.")
+            with LOAD_SECONDS.time(table=ConsensusTable.__tablename__):
+                self._write(ConsensusTable, rows, CONSENSUS_KEYS)
+                self.db.commit()
+            response_cache.invalidate({row["grid_cell"] for row in rows})
+            ROWS_WRITTEN.inc(len(rows), table=ConsensusTable.__tablename__, result="upserted")
+            print(f"Successfully loaded {len(rows)} consensus records.")
         except Exception as e:
             self.db.rollback()
             print(f"Error loading consensus data: {e}")
             raise
+
+    def load_daily_consensus(self, rows: List[Dict[str, Any]]):
+        """Writes daily_consensus rows (built by app.etl.compact), keyed on (grid_cell, date)."""
+        try:
+            with LOAD_SECONDS.time(table=DailyConsensusTable.__tablename__):
+                self._write(DailyConsensusTable, rows, DAILY_CONSENSUS_KEYS)
+                self.db.commit()
+            ROWS_WRITTEN.inc(len(rows), table=DailyConsensusTable.__tablename__, result="upserted")
+        except Exception as e:
+            self.db.rollback()
+            print(f"Error loading daily consensus data: {e}")
+            raise
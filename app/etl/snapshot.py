@@ -0,0 +1,134 @@
+"""
+Compact columnar storage of whole forecast runs (the forecast_snapshots table).
+
+Each fetched forecast is kept as a single row keyed by (grid cell, source, issue time):
+the temperature and precipitation series as little-endian float32 arrays on a regular
+time grid (`start` + i * `step_seconds`, NaN where the source has no value for a step),
+concatenated and zlib-compressed. Reading a run is one row fetch and one decompress;
+the series are np.frombuffer views over the decompressed bytes.
+
+Enabled with settings.FORECAST_SNAPSHOTS; WeatherLoader.load_columns writes a snapshot
+for every forecast it loads, alongside the hourly rows.
+"""
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.grid import cell_key
+from app.models.columns import ForecastColumns, to_datetimes, to_naive_utc
+from app.models.schemas import WeatherSource
+from app.models.sql_models import ForecastSnapshotTable
+
+SNAPSHOT_KEYS = ("grid_cell", "source", "issued_at")
+
+_FLOAT = np.dtype("<f4")
+_DEFAULT_STEP_SECONDS = 3600
+
+@dataclass
+class ForecastSnapshot:
+    """A decoded forecast run. `temperature` and `precipitation` are read-only float32 views."""
+    source: WeatherSource
+    lat: float
+    lon: float
+    issued_at: datetime  # naive UTC
+    start: np.datetime64
+    step_seconds: int
+    temperature: np.ndarray
+    precipitation: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.temperature)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.start + np.arange(len(self), dtype=np.int64) * np.timedelta64(self.step_seconds, "s")
+
+    def to_columns(self) -> ForecastColumns:
+        """Back to ForecastColumns (float64 copies), dropping the steps the source had no value for."""
+        present = ~np.isnan(self.temperature)
+        return ForecastColumns(
+            source=self.source,
+            lat=self.lat,
+            lon=self.lon,
+            timestamps=self.timestamps[present],
+            temperature=self.temperature[present].astype(np.float64),
+            precipitation=self.precipitation[present].astype(np.float64),
+            issued_at=self.issued_at
+        )
+
+def encode(forecast: ForecastColumns) -> Dict[str, Any]:
+    """
+    Snapshot row values for a non-empty forecast. The time step is the greatest common
+    divisor of the gaps between timestamps, so mixed hourly/6-hourly series (Yr.no)
+    fit one grid with NaN in the unused slots.
+    """
+    seconds = forecast.timestamps.astype("datetime64[s]").astype(np.int64)
+    step = int(np.gcd.reduce(np.diff(seconds))) if len(seconds) > 1 else 0
+    step = step or _DEFAULT_STEP_SECONDS
+    length = int((seconds[-1] - seconds[0]) // step) + 1
+    slots = (seconds - seconds[0]) // step
+
+    series = np.full((2, length), np.nan, dtype=_FLOAT)
+    series[0, slots] = forecast.temperature
+    series[1, slots] = forecast.precipitation
+    return {
+        "start": to_datetimes(forecast.timestamps[:1])[0],
+        "step_seconds": step,
+        "length": length,
+        "data": zlib.compress(series.tobytes(), settings.FORECAST_SNAPSHOT_COMPRESSION_LEVEL)
+    }
+
+def snapshot_row(forecast: ForecastColumns, issued_at: datetime) -> Dict[str, Any]:
+    """Full forecast_snapshots row for `forecast`; `issued_at` is used when the forecast carries none."""
+    return {
+        "grid_cell": cell_key(forecast.lat, forecast.lon),
+        "lat": forecast.lat,
+        "lon": forecast.lon,
+        "source": forecast.source.value,
+        "issued_at": to_naive_utc(forecast.issued_at or issued_at),
+        **encode(forecast)
+    }
+
+def decode(row: ForecastSnapshotTable) -> ForecastSnapshot:
+    raw = zlib.decompress(row.data)
+    return ForecastSnapshot(
+        source=WeatherSource(row.source),
+        lat=row.lat,
+        lon=row.lon,
+        issued_at=row.issued_at,
+        start=np.datetime64(row.start, "s"),
+        step_seconds=row.step_seconds,
+        temperature=np.frombuffer(raw, dtype=_FLOAT, count=row.length),
+        precipitation=np.frombuffer(raw, dtype=_FLOAT, count=row.length, offset=row.length * _FLOAT.itemsize)
+    )
+
+def latest_snapshot(db: Session, lat: float, lon: float, source: WeatherSource) -> Optional[ForecastSnapshot]:
+    """The most recently issued stored run for a location and source."""
+    row = db.query(ForecastSnapshotTable).filter(
+        ForecastSnapshotTable.grid_cell == cell_key(lat, lon),
+        ForecastSnapshotTable.source == source.value
+    ).order_by(ForecastSnapshotTable.issued_at.desc()).first()
+    return decode(row) if row else None
+
+def snapshot_history(
+    db: Session,
+    lat: float,
+    lon: float,
+    source: WeatherSource,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> List[ForecastSnapshot]:
+    """Stored runs for a location and source, newest first, optionally issued at or after `since`."""
+    query = db.query(ForecastSnapshotTable).filter(
+        ForecastSnapshotTable.grid_cell == cell_key(lat, lon),
+        ForecastSnapshotTable.source == source.value
+    )
+    if since is not None:
+        query = query.filter(ForecastSnapshotTable.issued_at >= to_naive_utc(since))
+    query = query.order_by(ForecastSnapshotTable.issued_at.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return [decode(row) for row in query]
@@ -0,0 +1,124 @@
+"""
+Streaming transform of upstream forecast responses (settings.ETL_STREAMING).
+
+The response body is fed to ijson's push parser chunk by chunk as it arrives, and
+normalized rows are handed out as ForecastColumns batches of at most `batch_rows`
+rows, so neither the raw body nor its decoded dict tree is ever held whole:
+
+- Yr.no: every timeseries entry is complete on its own, so rows are emitted as soon
+  as they are parsed and memory stays at one chunk plus one batch.
+- Open-Meteo sends column arrays ("time", then "temperature_2m", ...), so an hour is
+  only complete once its last column has been read. Earlier columns are kept as
+  packed arrays (8 bytes per value, not Python objects) and batched at the end of
+  the response. Memory therefore grows with the hours in one response; streamed
+  runs request ETL_STREAM_OPEN_METEO_DAYS days per response to bound it
+  (OpenMeteoFetcher.stream_windows).
+
+Rows are normalized exactly as transform_yr_columns / transform_open_meteo_columns do.
+"""
+from array import array
+from typing import AsyncIterator, List, Optional
+import ijson
+import numpy as np
+from app.core.config import settings
+from app.etl.transform import _parse_timestamps
+from app.models.columns import ForecastColumns
+from app.models.schemas import WeatherSource
+
+def _columns(source: WeatherSource, lat: float, lon: float, times, temps, precips) -> ForecastColumns:
+    return ForecastColumns(
+        source=source,
+        lat=lat,
+        lon=lon,
+        timestamps=_parse_timestamps(times) if isinstance(times, list) else times,
+        temperature=np.array(temps, dtype=np.float64),
+        precipitation=np.nan_to_num(np.array(precips, dtype=np.float64))
+    )
+
+async def stream_yr_columns(chunks: AsyncIterator[bytes], lat: float, lon: float,
+                            batch_rows: int) -> AsyncIterator[ForecastColumns]:
+    items = ijson.sendable_list()
+    parser = ijson.items_coro(items, "properties.timeseries.item", use_float=True)
+    times: List[str] = []
+    temps: List[float] = []
+    precips: List[float] = []
+
+    def take():
+        for item in items:
+            data = item.get("data", {})
+            instant = data.get("instant", {}).get("details", {})
+            # Skip points where critical data is missing
+            if instant.get("air_temperature") is None:
+                continue
+            times.append(item.get("time"))
+            temps.append(instant["air_temperature"])
+            precips.append(data.get("next_1_hours", {}).get("details", {}).get("precipitation_amount", 0.0))
+        del items[:]
+
+    async for chunk in chunks:
+        parser.send(chunk)
+        take()
+        while len(times) >= batch_rows:
+            yield _columns(WeatherSource.YR_NO, lat, lon, times[:batch_rows], temps[:batch_rows], precips[:batch_rows])
+            del times[:batch_rows], temps[:batch_rows], precips[:batch_rows]
+    parser.close()  # raises on a truncated body
+    take()
+    for start in range(0, len(times), batch_rows):
+        end = start + batch_rows
+        yield _columns(WeatherSource.YR_NO, lat, lon, times[start:end], temps[start:end], precips[start:end])
+
+_OPEN_METEO_COLUMNS = ("hourly.temperature_2m.item", "hourly.precipitation.item")
+_TIME_PARSE_ROWS = 4096  # timestamps are parsed into the packed column this many at a time
+
+async def stream_open_meteo_columns(chunks: AsyncIterator[bytes], lat: float, lon: float,
+                                    batch_rows: int) -> AsyncIterator[ForecastColumns]:
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+    seconds = array("q")  # epoch seconds
+    pending_times: List[str] = []
+    values = {prefix: array("d") for prefix in _OPEN_METEO_COLUMNS}
+    nan = float("nan")
+
+    def flush_times():
+        seconds.extend(_parse_timestamps(pending_times).astype(np.int64).tolist())
+        del pending_times[:]
+
+    def take():
+        for prefix, event, value in events:
+            if prefix == "hourly.time.item":
+                pending_times.append(value)
+                if len(pending_times) >= _TIME_PARSE_ROWS:
+                    flush_times()
+            elif prefix in values:
+                values[prefix].append(nan if value is None else value)
+        del events[:]
+
+    async for chunk in chunks:
+        parser.send(chunk)
+        take()
+    parser.close()
+    take()
+    flush_times()
+
+    temps = np.frombuffer(values["hourly.temperature_2m.item"], dtype=np.float64)
+    precips = np.frombuffer(values["hourly.precipitation.item"], dtype=np.float64)
+    timestamps = np.frombuffer(seconds, dtype=np.int64).astype("datetime64[s]")
+    # Ensure all arrays are same length
+    if not (len(timestamps) == len(temps) == len(precips)):
+        print("Mismatch in Open-Meteo array lengths")
+        return
+
+    for start in range(0, len(timestamps), batch_rows):
+        end = start + batch_rows
+        # Hours without a temperature (null -> NaN) are dropped, as in transform_open_meteo
+        keep = ~np.isnan(temps[start:end])
+        yield _columns(
+            WeatherSource.OPEN_METEO, lat, lon,
+            timestamps[start:end][keep], temps[start:end][keep], precips[start:end][keep]
+        )
+
+def stream_columns(source: WeatherSource, chunks: AsyncIterator[bytes], lat: float, lon: float,
+                   batch_rows: Optional[int] = None) -> AsyncIterator[ForecastColumns]:
+    """Batches of at most `batch_rows` (default settings.ETL_STREAM_BATCH_ROWS) rows parsed from `chunks`."""
+    transform = stream_yr_columns if source == WeatherSource.YR_NO else stream_open_meteo_columns
+    return transform(chunks, lat, lon, batch_rows or settings.ETL_STREAM_BATCH_ROWS)
@@ -1,8 +1,24 @@
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Sequence
+from datetime import timezone
+import numpy as np
 from app.models.schemas import WeatherDataPoint, WeatherSource, ConsensusDataPoint
+from app.models.columns import ForecastColumns, ConsensusColumns
 from dateutil import parser
 
+def _parse_timestamps(values: Sequence[str]) -> np.ndarray:
+    """
+    Parses ISO-8601 UTC timestamps in bulk into datetime64[s].
+    Handles the fixed formats both APIs use ("2026-01-12T00:00" and "2026-01-12T00:00:00Z");
+    anything else falls back to dateutil per element.
+    """
+    try:
+        return np.array([v[:-1] if v.endswith("Z") else v for v in values], dtype="datetime64[s]")
+    except ValueError:
+        parsed = [parser.isoparse(v) for v in values]
+        return np.array([
+            (ts.astimezone(timezone.utc) if ts.tzinfo else ts).replace(tzinfo=None) for ts in parsed
+        ], dtype="datetime64[s]")
+
 class WeatherTransformer:
     @staticmethod
     def transform_yr(raw_data: Dict[str, Any], lat: float, lon: float) -> List[WeatherDataPoint]:
@@ -60,13 +76,7 @@ class WeatherTransformer:
 
             for i in range(len(times)):
                 timestamp = parser.isoparse(times[i])
-                # Ensure UTC awareness if naive
-                if timestamp.tzinfo is None:
-                     timestamp = timestamp.replace(tzinfo=datetime.timezone.utc) if hasattr(datetime, 'timezone') else timestamp
-                # Fallback for older python or just use dateutil properly? 
-                # Actually, simpliest is to assume Open-Meteo returns UTC (Z) if we didn't specify timezone,
-                # but we used timezone=auto. Let's force it to match YR's awareness.
-                from datetime import timezone
+                # We request timezone=UTC; force awareness to match Yr.no's timestamps
                 if timestamp.tzinfo is None:
                     timestamp = timestamp.replace(tzinfo=timezone.utc)
                 
@@ -83,52 +93,106 @@ class WeatherTransformer:
 
         return points
 
+    @staticmethod
+    def transform_yr_columns(raw_data: Dict[str, Any], lat: float, lon: float) -> ForecastColumns:
+        """
+        Columnar variant of transform_yr: returns the forecast as parallel arrays.
+        """
+        times, temps, precips = [], [], []
+        try:
+            for item in raw_data.get("properties", {}).get("timeseries", []):
+                data = item.get("data", {})
+                instant = data.get("instant", {}).get("details", {})
+                # Skip points where critical data is missing
+                if instant.get("air_temperature") is None:
+                    continue
+                times.append(item.get("time"))
+                temps.append(instant["air_temperature"])
+                precips.append(data.get("next_1_hours", {}).get("details", {}).get("precipitation_amount", 0.0))
+
+            return ForecastColumns(
+                source=WeatherSource.YR_NO,
+                lat=lat,
+                lon=lon,
+                timestamps=_parse_timestamps(times),
+                temperature=np.array(temps, dtype=np.float64),
+                precipitation=np.nan_to_num(np.array(precips, dtype=np.float64))
+            )
+        except Exception as e:
+            print(f"Error transforming Yr.no data: {e}")
+            return ForecastColumns.empty(WeatherSource.YR_NO, lat, lon)
+
+    @staticmethod
+    def transform_open_meteo_columns(raw_data: Dict[str, Any], lat: float, lon: float) -> ForecastColumns:
+        """
+        Columnar variant of transform_open_meteo: the hourly arrays are converted
+        (and their timestamps parsed) in bulk instead of per element.
+        """
+        try:
+            hourly = raw_data.get("hourly", {})
+            times = hourly.get("time", [])
+            temps = np.array(hourly.get("temperature_2m", []), dtype=np.float64)
+            precips = np.array(hourly.get("precipitation", []), dtype=np.float64)
+
+            # Ensure all arrays are same length
+            if not (len(times) == len(temps) == len(precips)):
+                print("Mismatch in Open-Meteo array lengths")
+                return ForecastColumns.empty(WeatherSource.OPEN_METEO, lat, lon)
+
+            # Hours without a temperature (null -> NaN) are dropped, as in transform_yr
+            keep = ~np.isnan(temps)
+            return ForecastColumns(
+                source=WeatherSource.OPEN_METEO,
+                lat=lat,
+                lon=lon,
+                timestamps=_parse_timestamps(times)[keep],
+                temperature=temps[keep],
+                precipitation=np.nan_to_num(precips[keep])
+            )
+        except Exception as e:
+            print(f"Error transforming Open-Meteo data: {e}")
+            return ForecastColumns.empty(WeatherSource.OPEN_METEO, lat, lon)
+
+    @staticmethod
+    def calculate_consensus_columns(forecasts: Sequence[ForecastColumns]) -> ConsensusColumns:
+        """
+        Columnar consensus for one location, weighted per source by settings.CONSENSUS_WEIGHTS.
+        See ConsensusEngine for the alignment and confidence interval.
+        """
+        from app.etl.consensus import ConsensusEngine
+
+        result = ConsensusEngine().compute(forecasts)
+        if not result:
+            empty = np.array([])
+            return ConsensusColumns(forecasts[0].lat, forecasts[0].lon, np.array([], dtype="datetime64[s]"),
+                                    empty, np.array([], dtype=np.int64), empty, empty)
+        return result[0]
+
     @staticmethod
     def calculate_consensus(points: List[WeatherDataPoint]) -> List[ConsensusDataPoint]:
         """
-        Calculates a consensus temperature based on weighted sources.
-        YR: 0.6
-        Open-Meteo: 0.4
+        Calculates a consensus temperature based on weighted sources
+        (settings.CONSENSUS_WEIGHTS, by default Yr.no 0.6 / Open-Meteo 0.4).
+        Assumes all points belong to one location.
         """
-        grouped = {}
-        # Group by timestamp (assuming lat/lon are consistent for the batch)
+        if not points:
+            return []
+
+        by_source: Dict[WeatherSource, List[WeatherDataPoint]] = {}
         for p in points:
-            key = p.timestamp
-            if key not in grouped:
-                grouped[key] = []
-            grouped[key].append(p)
-            
-        consensus_points = []
-        
-        for ts, group in grouped.items():
-            if not group:
-                continue
-                
-            lat = group[0].lat
-            lon = group[0].lon
-            
-            yr_temp = next((p.temperature for p in group if p.source == WeatherSource.YR_NO), None)
-            om_temp = next((p.temperature for p in group if p.source == WeatherSource.OPEN_METEO), None)
-            
-            weighted_sum = 0.0
-            total_weight = 0.0
-            
-            if yr_temp is not None:
-                weighted_sum += yr_temp * 0.6
-                total_weight += 0.6
-                
-            if om_temp is not None:
-                weighted_sum += om_temp * 0.4
-                total_weight += 0.4
-            
-            if total_weight > 0:
-                final_temp = weighted_sum / total_weight
-                consensus_points.append(ConsensusDataPoint(
-                    timestamp=ts,
-                    lat=lat,
-                    lon=lon,
-                    weighted_temperature=final_temp,
-                    source_count=len(group)
-                ))
-                
-        return consensus_points
+            by_source.setdefault(p.source, []).append(p)
+
+        forecasts = [
+            ForecastColumns(
+                source=source,
+                lat=group[0].lat,
+                lon=group[0].lon,
+                timestamps=np.array([
+                    (p.timestamp.astimezone(timezone.utc) if p.timestamp.tzinfo else p.timestamp).replace(tzinfo=None)
+                    for p in group
+                ], dtype="datetime64[s]"),
+                temperature=np.array([p.temperature for p in group], dtype=np.float64),
+                precipitation=np.array([p.precipitation for p in group], dtype=np.float64)
+            ) for source, group in by_source.items()
+        ]
+        return WeatherTransformer.calculate_consensus_columns(forecasts).to_points()
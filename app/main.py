@@ -1,24 +1,57 @@
 import os
-from fastapi import FastAPI
+import sys
+from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from app.api.v1.weather import router as weather_router
-from app.core.database import init_db
+from app.core.database import init_db, async_engine
 
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from app.core.limiter import limiter
+from app.core.cache import forecast_cache, response_cache
+from app.core.geocoding import geocoding_cache
+from app.core.nearby import nearby_index
+from app.core.scheduler import refresh_scheduler
+from app.core.metrics import metrics, MetricsMiddleware
 
 app = FastAPI(title="WeatherETL", description="A weather data ETL pipeline API")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(MetricsMiddleware)
 
-# Initialize database tables on startup
+def _cache_metrics():
+    lines = []
+    for name, stats in (
+        ("forecast_cache", forecast_cache.stats()),
+        ("response_cache", response_cache.stats()),
+        ("geocoding_cache", geocoding_cache.stats()),
+        ("nearby_index", nearby_index.stats()),
+        ("refresh_scheduler", refresh_scheduler.stats())
+    ):
+        for key, value in stats.items():
+            lines.append(f"# TYPE weather_{name}_{key} gauge")
+            lines.append(f"weather_{name}_{key} {value}")
+    return lines
+
+metrics.add_collector(_cache_metrics)
+
+# Initialize database tables on startup. The ETL modules and the geocoding cache
+# are loaded on first use, keeping them off the serverless cold-start path.
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     init_db()
+    refresh_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await refresh_scheduler.stop()
+    extract = sys.modules.get("app.etl.extract")
+    if extract is not None:
+        await extract.close_async_client()
+    await async_engine.dispose()
 
 app.include_router(weather_router, prefix="/api/v1", tags=["weather"])
 
@@ -31,6 +64,19 @@ if os.path.exists(static_dir):
 def read_root():
     return FileResponse(os.path.join(static_dir, "index.html"))
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+async def health_check():
+    return {
+        "status": "healthy",
+        "forecast_cache": forecast_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "geocoding_cache": geocoding_cache.stats(),
+        "nearby_index": nearby_index.stats(),
+        "refresh_scheduler": refresh_scheduler.stats()
+    }
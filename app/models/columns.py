@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+import numpy as np
+from app.models.schemas import WeatherDataPoint, WeatherSource, ConsensusDataPoint
+
+def to_datetimes(timestamps: np.ndarray) -> List[datetime]:
+    """datetime64 array (UTC) -> list of naive UTC datetimes, as stored in the database."""
+    return timestamps.astype("datetime64[us]").tolist()
+
+def to_naive_utc(ts: datetime) -> datetime:
+    """Naive UTC form of a timestamp, as stored in the database."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def to_optional_floats(values: np.ndarray) -> List[Optional[float]]:
+    """float64 array -> list of floats, NaN as None (stored as NULL)."""
+    return [None if v != v else v for v in values.tolist()]
+
+@dataclass
+class ForecastColumns:
+    """
+    One source's forecast for one location as parallel arrays.
+    Columnar counterpart of a list of WeatherDataPoints.
+    """
+    source: WeatherSource
+    lat: float
+    lon: float
+    timestamps: np.ndarray  # datetime64[s], UTC, ascending
+    temperature: np.ndarray  # float64
+    precipitation: np.ndarray  # float64
+    issued_at: Optional[datetime] = None  # forecast run time, set from the FetchResult
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def empty(cls, source: WeatherSource, lat: float, lon: float) -> "ForecastColumns":
+        return cls(source, lat, lon, np.array([], dtype="datetime64[s]"), np.array([]), np.array([]))
+
+    def to_points(self) -> List[WeatherDataPoint]:
+        return [
+            WeatherDataPoint(
+                timestamp=ts.replace(tzinfo=timezone.utc),
+                lat=self.lat,
+                lon=self.lon,
+                source=self.source,
+                temperature=temp,
+                precipitation=precip
+            ) for ts, temp, precip in zip(to_datetimes(self.timestamps), self.temperature.tolist(), self.precipitation.tolist())
+        ]
+
+@dataclass
+class ConsensusColumns:
+    """Consensus for one location as parallel arrays. Columnar counterpart of ConsensusDataPoints."""
+    lat: float
+    lon: float
+    timestamps: np.ndarray  # datetime64[s], UTC, ascending
+    weighted_temperature: np.ndarray  # float64
+    source_count: np.ndarray  # int64
+    temperature_lower: np.ndarray  # float64, source-spread band bounds; NaN with fewer than two sources
+    temperature_upper: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def to_points(self) -> List[ConsensusDataPoint]:
+        return [
+            ConsensusDataPoint(
+                timestamp=ts.replace(tzinfo=timezone.utc),
+                lat=self.lat,
+                lon=self.lon,
+                weighted_temperature=temp,
+                source_count=count,
+                temperature_lower=lower,
+                temperature_upper=upper
+            ) for ts, temp, count, lower, upper in zip(
+                to_datetimes(self.timestamps),
+                self.weighted_temperature.tolist(),
+                self.source_count.tolist(),
+                to_optional_floats(self.temperature_lower),
+                to_optional_floats(self.temperature_upper)
+            )
+        ]
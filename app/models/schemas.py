@@ -1,7 +1,7 @@
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, Field
+from datetime import datetime, date as date_type
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 class WeatherSource(str, Enum):
     YR_NO = "yr"
@@ -33,6 +33,8 @@ class ConsensusDataPoint(BaseModel):
     lon: float
     weighted_temperature: float
     source_count: int
+    temperature_lower: Optional[float] = None
+    temperature_upper: Optional[float] = None
 
 class LocationSearchResult(BaseModel):
     name: str
@@ -40,3 +42,21 @@ class LocationSearchResult(BaseModel):
     lon: float
     country: str
     region: Optional[str] = None
+
+class BatchLocation(BaseModel):
+    """A location given either by name (see resolve_location) or by coordinates."""
+    name: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+class BatchWeatherRequest(BaseModel):
+    locations: List[BatchLocation] = Field(..., min_length=1)
+    date: Optional[date_type] = None  # day for the source deviation; defaults to today (UTC)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "locations": [{"name": "Oslo"}, {"lat": 60.39, "lon": 5.32}],
+                "date": "2026-01-12"
+            }
+        }
@@ -1,23 +1,175 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, Index, LargeBinary
 from app.core.database import Base
 
 class WeatherTable(Base):
     __tablename__ = "weather_data"
+    __table_args__ = (
+        # Business key; also the conflict target for bulk upserts
+        Index("uq_weather_data_point", "timestamp", "lat", "lon", "source", unique=True),
+        # Location lookups: one grid cell, optionally one source, over a time range
+        Index("ix_weather_data_cell_source_time", "grid_cell", "source", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, index=True)
     lat = Column(Float)
     lon = Column(Float)
+    grid_cell = Column(BigInteger)
     source = Column(String)
     temperature = Column(Float)
     precipitation = Column(Float)
+    fetched_at = Column(DateTime)  # UTC time the row was last written by the loader
 
 class ConsensusTable(Base):
     __tablename__ = "consensus_data"
+    __table_args__ = (
+        Index("uq_consensus_data_point", "timestamp", "lat", "lon", unique=True),
+        Index("ix_consensus_data_cell_time", "grid_cell", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, index=True)
     lat = Column(Float)
     lon = Column(Float)
+    grid_cell = Column(BigInteger)
     weighted_temperature = Column(Float)
+    temperature_lower = Column(Float)
+    temperature_upper = Column(Float)
     source_count = Column(Integer)
+
+class DailyWeatherTable(Base):
+    """Per-day rollup of weather_data, maintained by WeatherLoader for the days each load touches."""
+    __tablename__ = "daily_weather"
+    __table_args__ = (
+        Index("uq_daily_weather_cell_source_date", "grid_cell", "source", "date", unique=True),
+        # Retention cutoff (app.etl.compact deletes by date)
+        Index("ix_daily_weather_date", "date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    grid_cell = Column(BigInteger)
+    lat = Column(Float)
+    lon = Column(Float)
+    source = Column(String)
+    date = Column(Date)  # UTC date
+    temperature_sum = Column(Float)
+    temperature_count = Column(Integer)
+    temperature_min = Column(Float)
+    temperature_max = Column(Float)
+    precipitation_sum = Column(Float)
+    precipitation_count = Column(Integer)
+    precipitation_min = Column(Float)
+    precipitation_max = Column(Float)
+
+class ForecastSnapshotTable(Base):
+    """
+    One fetched forecast run per row, stored columnar (see app.etl.snapshot): float32
+    series on a regular time grid from `start` every `step_seconds`, zlib-compressed.
+    """
+    __tablename__ = "forecast_snapshots"
+    __table_args__ = (
+        Index("uq_forecast_snapshots_cell_source_issued", "grid_cell", "source", "issued_at", unique=True),
+        # Retention cutoff (app.etl.compact deletes by issue time)
+        Index("ix_forecast_snapshots_issued", "issued_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    grid_cell = Column(BigInteger)
+    lat = Column(Float)
+    lon = Column(Float)
+    source = Column(String)
+    issued_at = Column(DateTime)  # UTC
+    start = Column(DateTime)  # UTC time of the first step
+    step_seconds = Column(Integer)
+    length = Column(Integer)  # steps per series
+    data = Column(LargeBinary)  # zlib(temperature float32[length] + precipitation float32[length])
+
+class ForecastRunTable(Base):
+    """One row per loaded forecast run (location, source, issue time) with how much of it changed."""
+    __tablename__ = "forecast_runs"
+    __table_args__ = (
+        Index("uq_forecast_runs_cell_source_issued", "grid_cell", "source", "issued_at", unique=True),
+        # Retention cutoff (app.etl.compact deletes by issue time)
+        Index("ix_forecast_runs_issued", "issued_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    grid_cell = Column(BigInteger)
+    lat = Column(Float)
+    lon = Column(Float)
+    source = Column(String)
+    issued_at = Column(DateTime)  # UTC; the load time when the source gives no issue time
+    loaded_at = Column(DateTime)  # UTC
+    hours = Column(Integer)  # hours in the run
+    changed_hours = Column(Integer)  # hours written (new or with different values)
+    new_hours = Column(Integer)  # of which not stored before
+
+class ForecastChangeTable(Base):
+    """Audit trail: the values a run wrote for each hour it changed."""
+    __tablename__ = "forecast_changes"
+    __table_args__ = (
+        Index("uq_forecast_changes_point_run", "grid_cell", "source", "timestamp", "issued_at", unique=True),
+        # Retention cutoff (app.etl.compact deletes by forecast hour)
+        Index("ix_forecast_changes_time", "timestamp"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    grid_cell = Column(BigInteger)
+    source = Column(String)
+    timestamp = Column(DateTime)  # forecast hour
+    issued_at = Column(DateTime)  # run that wrote these values
+    temperature = Column(Float)
+    precipitation = Column(Float)
+
+class GeocodingTable(Base):
+    """Persisted result pages of the geocoding cache (app.core.geocoding), one row per (query, rank)."""
+    __tablename__ = "geocoding_cache"
+    __table_args__ = (
+        Index("uq_geocoding_cache_query_rank", "query", "rank", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    query = Column(String)  # normalized query text
+    rank = Column(Integer)
+    name = Column(String)
+    lat = Column(Float)
+    lon = Column(Float)
+    country = Column(String)
+    region = Column(String)
+    cached_at = Column(DateTime)
+
+class DailyConsensusTable(Base):
+    """Daily downsample of consensus_data, written by app.etl.compact before old hourly rows are deleted."""
+    __tablename__ = "daily_consensus"
+    __table_args__ = (
+        Index("uq_daily_consensus_cell_date", "grid_cell", "date", unique=True),
+        # Retention cutoff (app.etl.compact deletes by date)
+        Index("ix_daily_consensus_date", "date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    grid_cell = Column(BigInteger)
+    lat = Column(Float)
+    lon = Column(Float)
+    date = Column(Date)  # UTC date
+    weighted_temperature_sum = Column(Float)
+    weighted_temperature_count = Column(Integer)
+    weighted_temperature_min = Column(Float)
+    weighted_temperature_max = Column(Float)
+    temperature_lower = Column(Float)  # lowest interval bound of the day
+    temperature_upper = Column(Float)  # highest interval bound of the day
+    source_count = Column(Integer)  # most sources seen in one hour of the day
+
+# schema_state key holding the compaction watermark: hourly rows before it (naive UTC,
+# ISO format) may have been deleted, and only the daily tables cover those days
+HOURLY_RETAINED_FROM_KEY = "hourly_retained_from"
+
+class SchemaStateTable(Base):
+    """
+    Key/value bookkeeping: the fingerprint of the schema last applied to this database
+    (init_db) and the compaction watermark (HOURLY_RETAINED_FROM_KEY).
+    """
+    __tablename__ = "schema_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(String)
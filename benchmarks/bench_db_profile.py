@@ -0,0 +1,177 @@
+"""
+Mixed read/write throughput with and without the database engine profile (DATABASE_TUNING).
+
+Writer processes keep re-loading forecasts (with changed values, so every hour is
+written) while reader processes run the dashboard queries: the current hour and the
+daily rollups for a random location, like API workers next to a batch ETL run.
+Each profile runs against a fresh SQLite file in its own process tree, since the
+engine is configured when app.core.database is imported.
+
+Usage:
+    python -m benchmarks.bench_db_profile [--seconds 10] [--readers 8] [--writers 2] [--locations 200]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+def _seed(locations: int):
+    from app.core.database import SessionLocal, init_db
+    from app.etl.load import WeatherLoader
+    from benchmarks.suite import _location_columns
+
+    init_db()
+    forecasts = [_location_columns(i) for i in range(locations)]
+    db = SessionLocal()
+    try:
+        loader = WeatherLoader(db)
+        for location in forecasts:
+            loader.load_columns(location)
+    finally:
+        db.close()
+    return forecasts
+
+def _writer(forecasts, seed: int, seconds: float, results):
+    """Re-loads random locations with shifted values, so every hour is rewritten."""
+    from dataclasses import replace
+    from app.core.database import SessionLocal, engine
+    from app.etl.load import WeatherLoader
+
+    engine.dispose(close=False)  # connections inherited through fork belong to the parent
+    sys.stdout = open(os.devnull, "w")  # the loader logs every write
+    rng = random.Random(seed)
+    latencies, errors = [], []
+    db = SessionLocal()
+    loader = WeatherLoader(db)
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            shift = rng.uniform(-1, 1)
+            location = [replace(f, temperature=f.temperature + shift) for f in rng.choice(forecasts)]
+            start = time.perf_counter()
+            try:
+                loader.load_columns(location)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                db.rollback()
+                errors.append(str(e).splitlines()[0])
+    finally:
+        db.close()
+    results.put(("write", latencies, errors))
+
+def _reader(forecasts, seed: int, seconds: float, results):
+    """Dashboard reads: the current hour and the daily rollups of a random location."""
+    from datetime import timedelta
+    from sqlalchemy import select
+    from app.core.database import SessionLocal, engine
+    from app.core.grid import cell_key
+    from app.models.sql_models import WeatherTable, DailyWeatherTable
+    from benchmarks.suite import FIXTURE_START
+
+    engine.dispose(close=False)
+    rng = random.Random(seed)
+    latencies, errors = [], []
+    db = SessionLocal()
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            location = rng.choice(forecasts)[0]
+            cell = cell_key(location.lat, location.lon)
+            hour = FIXTURE_START + timedelta(hours=rng.randrange(len(location)))
+            start = time.perf_counter()
+            try:
+                db.execute(select(WeatherTable).where(
+                    WeatherTable.grid_cell == cell,
+                    WeatherTable.timestamp >= hour,
+                    WeatherTable.timestamp < hour + timedelta(hours=1)
+                )).scalars().all()
+                db.execute(select(DailyWeatherTable).where(DailyWeatherTable.grid_cell == cell)).scalars().all()
+                db.commit()  # end the read transaction, as a request would
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                db.rollback()
+                errors.append(str(e).splitlines()[0])
+    finally:
+        db.close()
+    results.put(("read", latencies, errors))
+
+def worker(args: argparse.Namespace):
+    """One profile: seeds the database, then runs readers and writers as separate processes."""
+    # Point the app at a throwaway database before anything imports the engine.
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='weatheretl-bench-'), 'bench.db')}"
+    sys.stdout, stdout = sys.stderr, sys.stdout
+    forecasts = _seed(args.locations)
+    sys.stdout = stdout
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_writer, args=(forecasts, i, args.seconds, results)) for i in range(args.writers)]
+    processes += [ctx.Process(target=_reader, args=(forecasts, 1000 + i, args.seconds, results)) for i in range(args.readers)]
+    for p in processes:
+        p.start()
+    collected = {"read": [], "write": []}
+    errors = []
+    for _ in processes:
+        kind, latencies, errs = results.get()
+        collected[kind].extend(latencies)
+        errors.extend(errs)
+    for p in processes:
+        p.join()
+
+    reads, writes = collected["read"], collected["write"]
+
+    def p95(values):
+        return sorted(values)[int(0.95 * (len(values) - 1))] * 1000 if values else None
+
+    print(json.dumps({
+        "reads_per_s": len(reads) / args.seconds,
+        "writes_per_s": len(writes) / args.seconds,
+        "read_p50_ms": statistics.median(reads) * 1000 if reads else None,
+        "read_p95_ms": p95(reads),
+        "write_p95_ms": p95(writes),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration per profile")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--locations", type=int, default=200, help="locations seeded and written (250 rows each)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args)
+
+    results = []
+    for label, tuning in (("default", "false"), ("tuned", "true")):
+        env = {**os.environ, "DATABASE_TUNING": tuning}
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_db_profile", "--worker"] + sys.argv[1:],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append((label, json.loads(out.strip().splitlines()[-1])))
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    print(f"\n{args.readers} readers, {args.writers} writers, {args.locations} locations, {args.seconds:.0f}s per profile")
+    print(f"{'profile':<10}{'reads/s':>10}{'writes/s':>10}{'read p50 ms':>13}{'read p95 ms':>13}{'write p95 ms':>14}{'errors':>8}")
+    for label, r in results:
+        print(
+            f"{label:<10}{fmt(r['reads_per_s']):>10}{fmt(r['writes_per_s']):>10}{fmt(r['read_p50_ms']):>13}"
+            f"{fmt(r['read_p95_ms']):>13}{fmt(r['write_p95_ms']):>14}{r['errors']:>8}"
+        )
+        if r["first_error"]:
+            print(f"  first error: {r['first_error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark for WeatherLoader: per-run load time vs. upsert batch size.
+
+Each "run" loads one location's worth of forecast points (Yr.no + Open-Meteo,
+~250 rows by default) twice: once into an empty table (inserts) and once more
+over the same keys (updates), mirroring an hourly re-fetch. The batch-size sweep
+writes every row; the "diff" configuration shows the default loader, which skips
+the unchanged re-fetch.
+
+Usage:
+    python -m benchmarks.bench_load [--points 250] [--runs 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Point the app at a throwaway database before anything imports the engine.
+_tmpdir = tempfile.mkdtemp(prefix="weatheretl-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from app.core.database import SessionLocal, init_db, engine  # noqa: E402
+from app.etl.load import WeatherLoader  # noqa: E402
+from app.models.schemas import WeatherDataPoint, WeatherSource  # noqa: E402
+from app.models.sql_models import WeatherTable  # noqa: E402
+
+BATCH_SIZES = [1, 10, 50, 100, 250, 1000]
+
+def make_points(n: int, lat: float, lon: float):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    sources = [WeatherSource.YR_NO, WeatherSource.OPEN_METEO]
+    return [
+        WeatherDataPoint(
+            timestamp=start + timedelta(hours=i // len(sources)),
+            lat=lat,
+            lon=lon,
+            source=sources[i % len(sources)],
+            temperature=float(i % 30),
+            precipitation=0.1
+        ) for i in range(n)
+    ]
+
+def time_runs(loader_kwargs, points_per_run: int, runs: int):
+    with engine.begin() as conn:
+        conn.execute(WeatherTable.__table__.delete())
+
+    insert_times, update_times = [], []
+    db = SessionLocal()
+    try:
+        loader = WeatherLoader(db, **loader_kwargs)
+        for run in range(runs):
+            points = make_points(points_per_run, 59.0 + run * 0.01, 10.0)
+            t0 = time.perf_counter()
+            loader.load_data(points)
+            insert_times.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            loader.load_data(points)
+            update_times.append(time.perf_counter() - t0)
+    finally:
+        db.close()
+    return sum(insert_times) / runs, sum(update_times) / runs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=250, help="points per ETL run")
+    parser.add_argument("--runs", type=int, default=20, help="runs per configuration")
+    args = parser.parse_args()
+
+    init_db()
+    configs = [("row-by-row", {"bulk": False, "diff": False})]
+    configs += [(f"upsert batch={b}", {"bulk": True, "batch_size": b, "diff": False}) for b in BATCH_SIZES]
+    configs += [("diff (default)", {"bulk": True, "diff": True})]
+
+    results = []
+    for label, kwargs in configs:
+        results.append((label, *time_runs(kwargs, args.points, args.runs)))
+
+    print(f"\n{args.points} points/run, {args.runs} runs, {engine.dialect.name}")
+    print(f"{'mode':<20}{'insert ms/run':>16}{'update ms/run':>16}")
+    for label, ins, upd in results:
+        print(f"{label:<20}{ins * 1000:>16.2f}{upd * 1000:>16.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Benchmark suite for the ETL stages and the API hot paths.
+
+Runs against the recorded payloads in benchmarks/fixtures, a throwaway SQLite
+database and the local stand-in upstream (benchmarks/upstream.py), so results
+depend only on the code and the machine. Groups:
+
+    transform   transform_yr / transform_open_meteo (point and columnar variants)
+    consensus   calculate_consensus (points) and calculate_consensus_columns
+    load        WeatherLoader.load_data and load_columns: first load, then an unchanged re-fetch
+    api         every endpoint in app/api/v1/weather.py under concurrent load (uvicorn + httpx)
+
+Stage benchmarks run at each --scale (rows); transform and consensus are capped at
+1m rows since they hold whole payloads in memory. The 10m load takes a while and
+several GB of disk, so it is opt-in.
+
+Every result has a stable id and one headline value (median seconds for stages,
+p95 milliseconds for endpoints); --compare reports the ratio to a previous run.
+
+Usage:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --groups load --scales 1k,100k,10m
+    python -m benchmarks.suite --json results.json
+    python -m benchmarks.suite --compare baseline.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+GROUPS = ("transform", "consensus", "load", "api")
+IN_MEMORY_MAX_ROWS = 1_000_000
+LOAD_CHUNK_ROWS = 50_000
+ROWS_PER_LOCATION = 250  # one location's run: 125 hours from each of two sources
+FIXTURE_START = datetime(2026, 1, 12, 11)
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+def format_scale(n: int) -> str:
+    for suffix, size in (("m", 1_000_000), ("k", 1_000)):
+        if n >= size and n % size == 0:
+            return f"{n // size}{suffix}"
+    return str(n)
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times), "repeat": repeat}
+
+def stage_result(group: str, name: str, rows: int, timing: Dict[str, float]) -> Dict[str, Any]:
+    return {
+        "id": f"{group}/{name}/n={format_scale(rows)}",
+        "group": group,
+        "name": name,
+        "rows": rows,
+        **timing,
+        "rows_per_s": rows / timing["median_s"] if timing["median_s"] else None,
+        "metric": "median_s",
+        "value": timing["median_s"]
+    }
+
+# Payloads scaled from the fixtures
+
+def yr_payload(rows: int) -> Dict[str, Any]:
+    from benchmarks.upstream import YR_FIXTURE
+
+    series = YR_FIXTURE["properties"]["timeseries"]
+    return {**YR_FIXTURE, "properties": {**YR_FIXTURE["properties"], "timeseries": [
+        {
+            "time": (FIXTURE_START + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "data": series[i % len(series)]["data"]
+        } for i in range(rows)
+    ]}}
+
+def open_meteo_payload(rows: int) -> Dict[str, Any]:
+    from benchmarks.upstream import OPEN_METEO_FIXTURE
+
+    hourly = OPEN_METEO_FIXTURE["hourly"]
+    size = len(hourly["time"])
+    return {**OPEN_METEO_FIXTURE, "hourly": {
+        "time": [(FIXTURE_START + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(rows)],
+        "temperature_2m": [hourly["temperature_2m"][i % size] for i in range(rows)],
+        "precipitation": [hourly["precipitation"][i % size] for i in range(rows)]
+    }}
+
+def repeats(rows: int) -> int:
+    return 5 if rows <= 100_000 else 1
+
+# Groups
+
+def bench_transform(scales: List[int]) -> List[Dict[str, Any]]:
+    from app.etl.transform import WeatherTransformer as T
+    from benchmarks.upstream import YR_FIXTURE, OPEN_METEO_FIXTURE
+
+    results = []
+    cases = [(len(YR_FIXTURE["properties"]["timeseries"]), YR_FIXTURE, len(OPEN_METEO_FIXTURE["hourly"]["time"]), OPEN_METEO_FIXTURE)]
+    cases += [(n, yr_payload(n), n, open_meteo_payload(n)) for n in scales if n <= IN_MEMORY_MAX_ROWS]
+    for yr_rows, yr, om_rows, om in cases:
+        results.append(stage_result("transform", "transform_yr", yr_rows, measure(lambda: T.transform_yr(yr, 59.91, 10.75), repeats(yr_rows))))
+        results.append(stage_result("transform", "transform_yr_columns", yr_rows, measure(lambda: T.transform_yr_columns(yr, 59.91, 10.75), repeats(yr_rows))))
+        results.append(stage_result("transform", "transform_open_meteo", om_rows, measure(lambda: T.transform_open_meteo(om, 59.91, 10.75), repeats(om_rows))))
+        results.append(stage_result("transform", "transform_open_meteo_columns", om_rows, measure(lambda: T.transform_open_meteo_columns(om, 59.91, 10.75), repeats(om_rows))))
+    return results
+
+def bench_consensus(scales: List[int]) -> List[Dict[str, Any]]:
+    from app.etl.transform import WeatherTransformer as T
+
+    results = []
+    for n in [ROWS_PER_LOCATION] + [n for n in scales if n <= IN_MEMORY_MAX_ROWS]:
+        yr = T.transform_yr_columns(yr_payload(n // 2), 59.91, 10.75)
+        om = T.transform_open_meteo_columns(open_meteo_payload(n - n // 2), 59.91, 10.75)
+        points = yr.to_points() + om.to_points()
+        results.append(stage_result("consensus", "calculate_consensus", n, measure(lambda: T.calculate_consensus(points), repeats(n))))
+        results.append(stage_result("consensus", "calculate_consensus_columns", n, measure(lambda: T.calculate_consensus_columns([yr, om]), repeats(n))))
+    return results
+
+def _location_columns(index: int):
+    """One location's run (ROWS_PER_LOCATION rows over two sources) as ForecastColumns."""
+    import numpy as np
+    from app.models.columns import ForecastColumns
+    from app.models.schemas import WeatherSource
+
+    hours = ROWS_PER_LOCATION // 2
+    lat, lon = -60.0 + (index // 1000) * 0.01, -170.0 + (index % 1000) * 0.01
+    timestamps = np.datetime64(FIXTURE_START, "s") + np.arange(hours) * np.timedelta64(3600, "s")
+    temperature = np.round(np.sin(np.arange(hours) / 24 * 2 * np.pi) * 4 + index % 7, 1)
+    return [
+        ForecastColumns(source, lat, lon, timestamps, temperature + shift, np.full(hours, 0.1))
+        for source, shift in ((WeatherSource.YR_NO, 0.0), (WeatherSource.OPEN_METEO, 0.5))
+    ]
+
+def bench_load(scales: List[int]) -> List[Dict[str, Any]]:
+    from app.core.database import SessionLocal, engine
+    from app.etl.load import WeatherLoader
+    from app.models.sql_models import WeatherTable, DailyWeatherTable, ForecastRunTable, ForecastChangeTable
+
+    def reset():
+        with engine.begin() as conn:
+            for table in (WeatherTable, DailyWeatherTable, ForecastRunTable, ForecastChangeTable):
+                conn.execute(table.__table__.delete())
+
+    def run(n: int, method: str) -> Dict[str, float]:
+        """Times `method` over n rows in chunks; the first pass inserts, the second re-loads unchanged data."""
+        locations = max(1, n // ROWS_PER_LOCATION)
+        per_chunk = max(1, LOAD_CHUNK_ROWS // ROWS_PER_LOCATION)
+        passes = []
+        db = SessionLocal()
+        try:
+            loader = WeatherLoader(db)
+            for _ in range(2):
+                elapsed = 0.0
+                for first in range(0, locations, per_chunk):
+                    forecasts = [f for i in range(first, min(first + per_chunk, locations)) for f in _location_columns(i)]
+                    if method == "load_data":
+                        batch = [p for f in forecasts for p in f.to_points()]
+                        start = time.perf_counter()
+                        loader.load_data(batch)
+                    else:
+                        start = time.perf_counter()
+                        loader.load_columns(forecasts)
+                    elapsed += time.perf_counter() - start
+                passes.append(elapsed)
+        finally:
+            db.close()
+        return passes
+
+    results = []
+    for n in scales:
+        for method in ("load_data", "load_columns"):
+            reset()
+            insert_s, refetch_s = run(n, method)
+            results.append(stage_result("load", f"{method}.insert", n, {"median_s": insert_s, "min_s": insert_s, "repeat": 1}))
+            results.append(stage_result("load", f"{method}.refetch_unchanged", n, {"median_s": refetch_s, "min_s": refetch_s, "repeat": 1}))
+            print(f"  load {method} n={format_scale(n)}: insert {insert_s:.2f}s, re-fetch {refetch_s:.2f}s", file=sys.stderr)
+    reset()
+    return results
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _drive(base_url: str, method: str, make_request: Callable[[int], Dict[str, Any]], requests: int, concurrency: int):
+    import httpx
+
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def one(i: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.request(method, **make_request(i))
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.perf_counter() - start
+    return latencies, errors, wall
+
+def bench_api(requests: int, concurrency: int) -> List[Dict[str, Any]]:
+    import uvicorn
+    from app.core.limiter import limiter
+    from app.main import app
+
+    limiter.enabled = False  # measure the endpoints, not 429s
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="benchmark-api", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+
+    today = datetime.now(timezone.utc).date().isoformat()
+    batch = {"locations": [{"lat": 59.91 + i * 0.01, "lon": 10.75} for i in range(50)]}
+    scenarios = [
+        # Distinct coordinates: every request runs ETL against the stand-in upstream
+        ("GET /weather/current (cold)", "GET", lambda i: {"url": f"/api/v1/weather/current?lat={30 + i * 0.01:.4f}&lon=5.0"}),
+        ("GET /weather/current (warm)", "GET", lambda i: {"url": "/api/v1/weather/current?lat=59.91&lon=10.75"}),
+        ("GET /weather/daily-average", "GET", lambda i: {"url": "/api/v1/weather/daily-average?location=oslo"}),
+        ("GET /weather/source-deviation", "GET", lambda i: {"url": f"/api/v1/weather/source-deviation?date={today}&location=oslo"}),
+        ("GET /weather/search", "GET", lambda i: {"url": "/api/v1/weather/search?name=osl"}),
+        ("POST /weather/batch (50 locations)", "POST", lambda i: {"url": "/api/v1/weather/batch", "json": batch}),
+        ("GET /health", "GET", lambda i: {"url": "/health"}),
+    ]
+
+    results = []
+    try:
+        # Prime the location the warm scenarios read
+        asyncio.run(_drive(base_url, "GET", lambda i: {"url": "/api/v1/weather/current?lat=59.91&lon=10.75"}, 1, 1))
+        for label, method, make_request in scenarios:
+            latencies, errors, wall = asyncio.run(_drive(base_url, method, make_request, requests, concurrency))
+            ms = sorted(l * 1000 for l in latencies)
+            pct = lambda p: ms[min(len(ms) - 1, int(round(p / 100 * (len(ms) - 1))))]
+            results.append({
+                "id": f"api/{label}/c={concurrency}",
+                "group": "api",
+                "name": label,
+                "requests": requests,
+                "concurrency": concurrency,
+                "errors": errors,
+                "requests_per_s": requests / wall,
+                "p50_ms": pct(50),
+                "p95_ms": pct(95),
+                "p99_ms": pct(99),
+                "max_ms": ms[-1],
+                "metric": "p95_ms",
+                "value": pct(95)
+            })
+            print(f"  {label}: p50 {pct(50):.1f} ms, p95 {pct(95):.1f} ms, {requests / wall:.0f} req/s, {errors} errors", file=sys.stderr)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    return results
+
+# Reporting
+
+def metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import numpy
+    import sqlalchemy
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+        "args": vars(args)
+    }
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, max_regression: Optional[float]) -> bool:
+    """Prints current vs baseline per id; returns False if any result regressed beyond max_regression."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["id"]: r for r in json.load(f)["results"]}
+    ok = True
+    print(f"\n{'id':<70}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for r in results:
+        base = baseline.get(r["id"])
+        if base is None or not base["value"]:
+            continue
+        ratio = r["value"] / base["value"]
+        flag = ""
+        if max_regression is not None and ratio > 1 + max_regression:
+            ok, flag = False, "  REGRESSED"
+        print(f"{r['id']:<70}{base['value']:>12.4g}{r['value']:>12.4g}{ratio:>8.2f}{flag}")
+    return ok
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", default=",".join(GROUPS), help=f"comma-separated subset of {','.join(GROUPS)}")
+    parser.add_argument("--scales", default="1k,100k", help="row counts for the stage benchmarks, e.g. 1k,100k,10m")
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients per endpoint scenario")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="seconds the stand-in upstream waits per response")
+    parser.add_argument("--json", help="write results to this file ('-' for stdout)")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--max-regression", type=float, help="with --compare, exit 1 if any result is slower by more than this fraction")
+    args = parser.parse_args(argv)
+
+    groups = [g.strip() for g in args.groups.split(",") if g.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+    scales = [parse_scale(s) for s in args.scales.split(",") if s.strip()]
+
+    # Throwaway database and stand-in upstream, configured before the app is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='weatheretl-suite-'), 'bench.db')}"
+    runners = {
+        "transform": lambda: bench_transform(scales),
+        "consensus": lambda: bench_consensus(scales),
+        "load": lambda: bench_load(scales),
+        "api": lambda: bench_api(args.requests, args.concurrency),
+    }
+    results = []
+    # The app logs with print; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        from benchmarks import upstream
+        server, base_url = upstream.start(latency=args.upstream_latency)
+        upstream.configure_env(base_url)
+
+        from app.core.database import init_db
+        init_db()
+
+        for group in groups:
+            print(f"[{group}]")
+            results.extend(runners[group]())
+        server.shutdown()
+
+    report = {"meta": metadata(args), "results": results}
+    # With --json -, stdout carries the JSON report only
+    with contextlib.redirect_stdout(sys.stderr if args.json == "-" else sys.stdout):
+        print(f"\n{'id':<70}{'value':>12}  metric")
+        for r in results:
+            print(f"{r['id']:<70}{r['value']:>12.4g}  {r['metric']}")
+        regressed = args.compare and not compare(results, args.compare, args.max_regression)
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
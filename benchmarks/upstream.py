@@ -0,0 +1,160 @@
+"""
+Local stand-in for the Yr.no, Open-Meteo and geocoding APIs, serving the recorded
+payloads in benchmarks/fixtures.
+
+Forecast timestamps are shifted so that the Yr.no series starts at the current hour
+and the Open-Meteo series at the current UTC midnight, as the live APIs do, and each
+location gets slightly different values. Yr.no responses carry Last-Modified/Expires
+and honour If-Modified-Since. An optional delay simulates network latency.
+
+    python -m benchmarks.upstream --port 8765 --latency 0.05
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def load_fixture(name: str) -> Dict[str, Any]:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+YR_FIXTURE = load_fixture("yr_locationforecast_compact.json")
+OPEN_METEO_FIXTURE = load_fixture("open_meteo_forecast.json")
+GEOCODING_FIXTURE = load_fixture("geocoding_search.json")
+
+def _geocoding_match(query: str, name: str) -> bool:
+    """
+    Open-Meteo's matching: one character finds nothing, two only exact names, and
+    longer queries match fuzzily (here: prefixes, allowing for a typo).
+    """
+    query, name = query.casefold().strip(), name.casefold()
+    if len(query) < 2:
+        return False
+    if len(query) == 2:
+        return name == query
+    return len(name) >= len(query) and SequenceMatcher(None, query, name[:len(query)]).ratio() >= 0.75
+
+def _shifted_yr(now: datetime, offset: float) -> Dict[str, Any]:
+    series = YR_FIXTURE["properties"]["timeseries"]
+    first = datetime.strptime(series[0]["time"], "%Y-%m-%dT%H:%M:%SZ")
+    shift = now.replace(minute=0, second=0, microsecond=0, tzinfo=None) - first
+    timeseries = []
+    for item in series:
+        ts = datetime.strptime(item["time"], "%Y-%m-%dT%H:%M:%SZ") + shift
+        details = dict(item["data"]["instant"]["details"])
+        details["air_temperature"] = round(details["air_temperature"] + offset, 1)
+        timeseries.append({
+            "time": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "data": {**item["data"], "instant": {"details": details}}
+        })
+    return {**YR_FIXTURE, "properties": {**YR_FIXTURE["properties"], "timeseries": timeseries}}
+
+def _shifted_open_meteo(now: datetime, offset: float) -> Dict[str, Any]:
+    hourly = OPEN_METEO_FIXTURE["hourly"]
+    first = datetime.strptime(hourly["time"][0], "%Y-%m-%dT%H:%M")
+    shift = now.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None) - first
+    return {**OPEN_METEO_FIXTURE, "hourly": {
+        "time": [(datetime.strptime(t, "%Y-%m-%dT%H:%M") + shift).strftime("%Y-%m-%dT%H:%M") for t in hourly["time"]],
+        "temperature_2m": [None if t is None else round(t + offset, 1) for t in hourly["temperature_2m"]],
+        "precipitation": hourly["precipitation"]
+    }}
+
+def _location_offset(query: Dict[str, list], lat_key: str, lon_key: str) -> float:
+    """Small deterministic per-location temperature offset, so locations differ."""
+    try:
+        lat = float(query[lat_key][0])
+        lon = float(query[lon_key][0])
+    except (KeyError, ValueError):
+        return 0.0
+    return round(((lat * 7.0 + lon * 3.0) % 4.0) - 2.0, 1)
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    requests = 0
+    not_modified = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        with self._lock:
+            UpstreamHandler.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        now = datetime.now(timezone.utc)
+        headers = {"Content-Type": "application/json"}
+
+        if url.path.startswith("/yr"):
+            # The "run" is issued at the top of the hour and valid until the next one
+            issued = now.replace(minute=0, second=0, microsecond=0)
+            last_modified = format_datetime(issued, usegmt=True)
+            headers["Last-Modified"] = last_modified
+            headers["Expires"] = format_datetime(issued + timedelta(hours=1), usegmt=True)
+            if self.headers.get("If-Modified-Since") == last_modified:
+                with self._lock:
+                    UpstreamHandler.not_modified += 1
+                return self._send(304, b"", headers)
+            body = _shifted_yr(now, _location_offset(query, "lat", "lon"))
+        elif url.path.startswith("/om"):
+            body = _shifted_open_meteo(now, _location_offset(query, "latitude", "longitude"))
+            if "start_date" in query:
+                # A day range (streamed runs request the forecast a few days at a time)
+                first, last = query["start_date"][0], query["end_date"][0]
+                keep = [i for i, t in enumerate(body["hourly"]["time"]) if first <= t[:10] <= last]
+                body["hourly"] = {name: [values[i] for i in keep] for name, values in body["hourly"].items()}
+        elif url.path.startswith("/geo"):
+            name = query.get("name", [""])[0]
+            body = {**GEOCODING_FIXTURE, "results": [
+                r for r in GEOCODING_FIXTURE["results"] if _geocoding_match(name, r["name"])
+            ]}
+        else:
+            return self._send(404, b"", {})
+        self._send(200, json.dumps(body).encode(), headers)
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str]):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start(port: int = 0, latency: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Starts the server in a daemon thread; returns it and its base URL."""
+    UpstreamHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), UpstreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="benchmark-upstream", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def configure_env(base_url: str):
+    """Points the app's upstream URLs at the stand-in server (before app.core.config is imported)."""
+    os.environ["YR_NO_BASE_URL"] = f"{base_url}/yr"
+    os.environ["OPEN_METEO_BASE_URL"] = f"{base_url}/om"
+    os.environ["OPEN_METEO_GEOCODING_URL"] = f"{base_url}/geo"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    server, url = start(args.port, args.latency)
+    print(f"Serving fixtures at {url} (yr: {url}/yr, open-meteo: {url}/om, geocoding: {url}/geo)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
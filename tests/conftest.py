@@ -0,0 +1,30 @@
+"""
+Shared setup: the app's engines are created when app.core.database is imported,
+so point DATABASE_URL at a throwaway database before any test imports the app.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='weatheretl-tests-'), 'test.db')}"
+
+@pytest.fixture
+def db():
+    from app.core.database import SessionLocal, init_db
+
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    from app.core.limiter import limiter
+    from app.main import app
+
+    limiter.reset()
+    return TestClient(app)
@@ -0,0 +1,66 @@
+"""POST /weather/batch: request validation and the per-day source deviation."""
+import math
+from datetime import date
+
+from app.core.grid import cell_key
+from app.models.sql_models import DailyWeatherTable
+
+def _rollup(lat: float, lon: float, source: str, day: date, temperature: float) -> DailyWeatherTable:
+    return DailyWeatherTable(
+        grid_cell=cell_key(lat, lon), lat=lat, lon=lon, source=source, date=day,
+        temperature_sum=temperature * 24, temperature_count=24,
+        temperature_min=temperature, temperature_max=temperature,
+        precipitation_sum=0.0, precipitation_count=24, precipitation_min=0.0, precipitation_max=0.0
+    )
+
+def test_batch_with_date_reports_that_days_deviation(client, db):
+    day = date(2026, 1, 12)
+    db.add_all([
+        _rollup(10.5, 20.5, "yr", day, 4.0),
+        _rollup(10.5, 20.5, "open-meteo", day, 1.5),
+        _rollup(10.5, 20.5, "yr", date(2026, 1, 13), 9.0)
+    ])
+    db.commit()
+
+    response = client.post("/api/v1/weather/batch", json={"locations": [{"lat": 10.5, "lon": 20.5}], "date": "2026-01-12"})
+
+    assert response.status_code == 200
+    [result] = response.json()
+    assert result["deviation"]["date"] == "2026-01-12"
+    assert result["deviation"]["source_averages"] == {"yr": 4.0, "open-meteo": 1.5}
+    assert result["deviation"]["deviation_yr_vs_openmeteo"] == 2.5
+    assert [d["date"] for d in result["daily"]] == ["2026-01-12", "2026-01-13"]
+
+def test_batch_rejects_invalid_date(client):
+    response = client.post("/api/v1/weather/batch", json={"locations": [{"lat": 1.0, "lon": 2.0}], "date": "not-a-day"})
+    assert response.status_code == 422
+
+def test_batch_reports_unresolvable_locations_per_item(client):
+    response = client.post("/api/v1/weather/batch", json={"locations": [{"name": None}, {"lat": 1.0, "lon": 2.0}]})
+    assert response.status_code == 200
+    missing, empty = response.json()
+    assert missing["error"] == "Must provide location name or lat/lon"
+    assert empty["current"]["sources"] == [] and empty["daily"] == []
+
+def _locations(count: int) -> list:
+    return [{"lat": 30.0 + i / 100, "lon": 40.0} for i in range(count)]
+
+def test_batch_cost_scales_with_the_location_cap(client):
+    from app.core.config import settings
+
+    full = settings.BATCH_QUERY_MAX_LOCATIONS
+    hits_per_full_batch = math.ceil(full / settings.BATCH_QUERY_LOCATIONS_PER_HIT)
+    # More locations than the 100/hour limit, still well within it
+    assert client.post("/api/v1/weather/batch", json={"locations": _locations(150)}).status_code == 200
+    used = math.ceil(150 / settings.BATCH_QUERY_LOCATIONS_PER_HIT)
+    for _ in range((100 - used) // hits_per_full_batch):
+        assert client.post("/api/v1/weather/batch", json={"locations": _locations(full)}).status_code == 200
+    assert client.post("/api/v1/weather/batch", json={"locations": _locations(full)}).status_code == 429
+
+def test_batch_over_the_cap_is_rejected_without_charging(client):
+    from app.core.config import settings
+
+    for _ in range(101):
+        response = client.post("/api/v1/weather/batch", json={"locations": _locations(settings.BATCH_QUERY_MAX_LOCATIONS + 1)})
+        assert response.status_code == 400
+    assert client.post("/api/v1/weather/batch", json={"locations": _locations(1)}).status_code == 200
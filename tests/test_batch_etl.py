@@ -0,0 +1,137 @@
+"""BatchEtlRunner with stubbed fetchers: retries, per-source rate limits, partial failures, the CLI report."""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.core.grid import cell_key
+from app.etl import batch
+from app.etl.batch import BatchEtlRunner, RateLimiter
+from app.etl.extract import FetchResult
+from app.models.schemas import WeatherSource
+from app.models.sql_models import ConsensusTable, WeatherTable
+
+FIRST = datetime(2026, 6, 1)
+HOURS = 6
+
+def _payload(source: WeatherSource) -> dict:
+    times = [FIRST + timedelta(hours=i) for i in range(HOURS)]
+    if source == WeatherSource.YR_NO:
+        return {"properties": {"timeseries": [
+            {"time": t.strftime("%Y-%m-%dT%H:%M:%SZ"), "data": {"instant": {"details": {"air_temperature": 10.0}}}}
+            for t in times
+        ]}}
+    return {"hourly": {
+        "time": [t.strftime("%Y-%m-%dT%H:%M") for t in times],
+        "temperature_2m": [12.0] * HOURS,
+        "precipitation": [0.0] * HOURS
+    }}
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://upstream.test")
+    return httpx.HTTPStatusError(f"{status}", request=request, response=httpx.Response(status, request=request))
+
+class StubFetcher:
+    """Fails the first `failures[name]` calls for a location with `error`, then serves a payload."""
+
+    def __init__(self, source: WeatherSource, failures=None, error=None):
+        self.source = source
+        self.failures = dict(failures or {})
+        self.error = error or _status_error(503)
+        self.calls = []  # (lat, lon, time.monotonic())
+
+    async def fetch_async(self, lat: float, lon: float) -> FetchResult:
+        self.calls.append((lat, lon, time.monotonic()))
+        if self.failures.get((lat, lon), 0) > 0:
+            self.failures[(lat, lon)] -= 1
+            raise self.error
+        return FetchResult(payload=_payload(self.source), expires_at=datetime(2030, 1, 1, tzinfo=timezone.utc))
+
+def _runner(yr: StubFetcher, om: StubFetcher, **kwargs) -> BatchEtlRunner:
+    runner = BatchEtlRunner(rate_limits={}, **kwargs)
+    runner.fetchers = [yr, om]
+    return runner
+
+def test_retryable_errors_are_retried_with_exponential_backoff(db):
+    yr = StubFetcher(WeatherSource.YR_NO, failures={(69.5, 18.5): 2})
+    om = StubFetcher(WeatherSource.OPEN_METEO)
+
+    report = _runner(yr, om, workers=1, max_retries=3, backoff_seconds=0.05).run([("Tromsø", 69.5, 18.5)])
+
+    assert (report.succeeded, report.failed, report.retries) == (1, 0, 2)
+    first, second, third = (t for *_, t in yr.calls)
+    # backoff * 2 ** attempt, plus up to as much again of jitter
+    assert 0.05 <= second - first < 0.2
+    assert 0.1 <= third - second < 0.4
+    stored = db.query(WeatherTable).filter(WeatherTable.grid_cell == cell_key(69.5, 18.5))
+    assert stored.count() == 2 * HOURS
+    consensus = db.query(ConsensusTable).filter(ConsensusTable.grid_cell == cell_key(69.5, 18.5)).all()
+    assert [c.weighted_temperature for c in consensus] == [pytest.approx(10.8)] * HOURS
+
+def test_retries_stop_after_max_retries(db):
+    yr = StubFetcher(WeatherSource.YR_NO, failures={(69.6, 18.6): 5})
+    report = _runner(yr, StubFetcher(WeatherSource.OPEN_METEO), max_retries=2, backoff_seconds=0.001).run([("x", 69.6, 18.6)])
+
+    assert (report.succeeded, report.failed, report.retries) == (0, 1, 2)
+    assert len(yr.calls) == 3
+
+def test_client_errors_are_not_retried_and_fail_only_their_location(db):
+    yr = StubFetcher(WeatherSource.YR_NO, failures={(69.7, 18.7): 1}, error=_status_error(404))
+    locations = [("missing", 69.7, 18.7), ("a", 69.8, 18.8), ("b", 69.9, 18.9)]
+
+    report = _runner(yr, StubFetcher(WeatherSource.OPEN_METEO), workers=2, db_batch_locations=1).run(locations)
+
+    assert (report.succeeded, report.failed, report.retries) == (2, 1, 0)
+    assert list(report.errors) == ["missing"]
+    assert report.rows_loaded == 2 * 2 * HOURS
+    assert db.query(WeatherTable).filter(WeatherTable.grid_cell == cell_key(69.7, 18.7)).count() == 0
+    assert db.query(WeatherTable).filter(WeatherTable.grid_cell == cell_key(69.9, 18.9)).count() == 2 * HOURS
+
+def test_rate_limiter_spaces_calls_per_source():
+    async def run():
+        limiter = RateLimiter(rate=20.0)
+        times = []
+
+        async def call():
+            await limiter.acquire()
+            times.append(time.monotonic())
+
+        await asyncio.gather(*(call() for _ in range(5)))
+        return sorted(times)
+
+    times = asyncio.run(run())
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert all(gap >= 0.045 for gap in gaps), gaps
+    assert times[-1] - times[0] < 0.4
+
+def test_sources_are_limited_independently(db):
+    yr, om = StubFetcher(WeatherSource.YR_NO), StubFetcher(WeatherSource.OPEN_METEO)
+    runner = _runner(yr, om, workers=4)
+    runner.rate_limits = {"yr": 10.0}  # Open-Meteo unlimited
+
+    runner.run([(f"loc{i}", 70.0 + i / 10, 19.0) for i in range(4)])
+
+    yr_times = sorted(t for *_, t in yr.calls)
+    om_times = sorted(t for *_, t in om.calls)
+    assert all(b - a >= 0.09 for a, b in zip(yr_times, yr_times[1:]))
+    assert om_times[-1] - om_times[0] < 0.15  # the four Yr.no calls span at least 0.3s
+
+def test_cli_json_report_is_the_only_stdout(tmp_path, monkeypatch, capsys):
+    locations = tmp_path / "sites.csv"
+    locations.write_text("name,lat,lon\nalta,70.5,23.5\n", encoding="utf-8")
+
+    class StubRunner(BatchEtlRunner):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.fetchers = [StubFetcher(WeatherSource.YR_NO), StubFetcher(WeatherSource.OPEN_METEO)]
+
+    monkeypatch.setattr(batch, "BatchEtlRunner", StubRunner)
+
+    assert batch.main(["--locations", str(locations), "--json"]) == 0
+    out, err = capsys.readouterr()
+    report = json.loads(out)
+    assert (report["locations"], report["succeeded"], report["rows_loaded"]) == (1, 1, 2 * HOURS)
+    assert "Batch ETL for 1 locations" in err and "Successfully loaded" in err
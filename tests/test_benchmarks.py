@@ -0,0 +1,16 @@
+"""The benchmark suite's machine-readable output."""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_suite_json_to_stdout_is_parseable():
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--groups", "consensus", "--scales", "1k", "--json", "-"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout)
+    assert {r["id"] for r in report["results"]} >= {"consensus/calculate_consensus_columns/n=1k"}
+    assert "[consensus]" in result.stderr
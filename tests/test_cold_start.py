@@ -0,0 +1,54 @@
+"""
+Cold-start budget for the serverless entry point (api/index.py).
+
+Every check runs in a fresh interpreter, as a cold start does. The time budget
+can be adjusted for slower machines with IMPORT_TIME_BUDGET_SECONDS.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET_SECONDS", "1.25"))
+
+# Loaded on first ETL run or search, never by the import itself
+LAZY_MODULES = ("numpy", "httpx", "app.core.utils", "app.etl.extract", "app.etl.transform", "app.etl.load")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import api.index
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+INIT_DB_PROBE = """
+import json
+from sqlalchemy import event
+from app.core.database import engine, init_db
+statements = []
+event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+init_db()
+print(json.dumps({"statements": len(statements)}))
+"""
+
+def _run(probe: str, tmp_path) -> dict:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'cold.db'}"}
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_import_within_budget(tmp_path):
+    best = min(_run(IMPORT_PROBE, tmp_path)["seconds"] for _ in range(3))
+    assert best < BUDGET_SECONDS, f"importing api.index took {best:.3f}s (budget {BUDGET_SECONDS}s)"
+
+def test_import_defers_etl_stack(tmp_path):
+    modules = set(_run(IMPORT_PROBE, tmp_path)["modules"])
+    assert not modules & set(LAZY_MODULES), f"imported eagerly: {sorted(modules & set(LAZY_MODULES))}"
+
+def test_import_does_not_touch_database(tmp_path):
+    _run(IMPORT_PROBE, tmp_path)
+    assert not (tmp_path / "cold.db").exists()
+
+def test_init_db_skips_applied_schema(tmp_path):
+    assert _run(INIT_DB_PROBE, tmp_path)["statements"] > 1  # creates the schema
+    assert _run(INIT_DB_PROBE, tmp_path)["statements"] == 1  # one fingerprint lookup
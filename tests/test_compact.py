@@ -0,0 +1,103 @@
+"""Retention compaction: daily downsampling, the hourly watermark, and incremental runs."""
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.etl.compact import compact, hourly_retained_from
+from app.etl.consensus import ConsensusEngine
+from app.etl.load import WeatherLoader
+from app.models.columns import ForecastColumns
+from app.models.schemas import WeatherSource
+from app.models.sql_models import (
+    ConsensusTable, DailyConsensusTable, DailyWeatherTable, ForecastChangeTable, ForecastRunTable,
+    ForecastSnapshotTable, WeatherTable
+)
+
+@pytest.fixture
+def session(tmp_path):
+    # Compaction deletes across whole tables, so it gets a database of its own
+    engine = create_engine(f"sqlite:///{tmp_path / 'compact.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+def _load(db, first_hour: str, hours: int, offset: float = 0.0):
+    timestamps = np.datetime64(first_hour, "s") + np.arange(hours) * np.timedelta64(3600, "s")
+    forecasts = [
+        ForecastColumns(
+            source=source, lat=60.0, lon=10.0, timestamps=timestamps,
+            temperature=np.arange(hours, dtype=np.float64) + shift + offset, precipitation=np.zeros(hours)
+        ) for source, shift in ((WeatherSource.YR_NO, 0.0), (WeatherSource.OPEN_METEO, 2.0))
+    ]
+    loader = WeatherLoader(db)
+    loader.load_columns(forecasts)
+    loader.load_consensus_columns(ConsensusEngine(weights={"yr": 1.0, "open-meteo": 1.0}).compute(forecasts))
+
+def _daily_consensus(db):
+    return {r.date: (r.weighted_temperature_count, r.weighted_temperature_min, r.weighted_temperature_max)
+            for r in db.query(DailyConsensusTable)}
+
+def test_old_hours_are_downsampled_then_deleted(session):
+    _load(session, "2026-01-10T00", 4 * 24)  # Jan 10-13
+
+    report = compact(session, today=date(2026, 1, 14), hourly_days=2)
+
+    assert report.hourly_cutoff == datetime(2026, 1, 12)
+    assert hourly_retained_from(session) == datetime(2026, 1, 12)
+    assert _daily_consensus(session) == {date(2026, 1, 10): (24, 1.0, 24.0), date(2026, 1, 11): (24, 25.0, 48.0)}
+    assert report.deleted == {"weather_data": 96, "consensus_data": 48, "forecast_changes": 96, "forecast_snapshots": 0}
+    assert session.query(ConsensusTable).filter(ConsensusTable.timestamp < datetime(2026, 1, 12)).count() == 0
+    assert session.query(WeatherTable).count() == 96
+    # Hourly weather survives as the loader's daily rollups
+    assert session.query(DailyWeatherTable).count() == 8
+
+def test_later_runs_only_aggregate_days_past_the_watermark(session):
+    _load(session, "2026-01-10T00", 4 * 24)
+    compact(session, today=date(2026, 1, 14), hourly_days=2)
+    # A late write for a day already aggregated is not aggregated again
+    _load(session, "2026-01-11T00", 1, offset=100.0)
+
+    report = compact(session, today=date(2026, 1, 15), hourly_days=2)
+
+    assert hourly_retained_from(session) == datetime(2026, 1, 13)
+    assert report.daily_consensus_rows == 1
+    assert _daily_consensus(session)[date(2026, 1, 11)] == (24, 25.0, 48.0)
+    assert _daily_consensus(session)[date(2026, 1, 12)] == (24, 49.0, 72.0)
+    assert session.query(ConsensusTable).filter(ConsensusTable.timestamp < datetime(2026, 1, 13)).count() == 0
+
+def test_watermark_never_moves_back(session):
+    _load(session, "2026-01-10T00", 4 * 24)
+    compact(session, today=date(2026, 1, 14), hourly_days=2)
+
+    report = compact(session, today=date(2026, 1, 14), hourly_days=3)
+
+    assert hourly_retained_from(session) == datetime(2026, 1, 12)
+    assert report.daily_consensus_rows == 0
+    assert sum(report.deleted.values()) == 0
+
+def test_daily_rollups_expire_with_daily_retention(session):
+    _load(session, "2026-01-10T00", 4 * 24)
+
+    report = compact(session, today=date(2026, 1, 14), hourly_days=2, daily_days=3)
+
+    assert report.daily_cutoff == date(2026, 1, 11)
+    assert set(_daily_consensus(session)) == {date(2026, 1, 11)}
+    assert {r.date for r in session.query(DailyWeatherTable)} == {date(2026, 1, d) for d in (11, 12, 13)}
+
+@pytest.mark.parametrize("column", [
+    WeatherTable.timestamp, ConsensusTable.timestamp, ForecastChangeTable.timestamp, ForecastSnapshotTable.issued_at,
+    DailyWeatherTable.date, DailyConsensusTable.date, ForecastRunTable.issued_at
+])
+def test_retention_deletes_search_an_index(session, column):
+    # Each delete batch re-runs this query; a full scan per batch makes a large backlog quadratic
+    query = select(column.class_.id).where(column < datetime(2026, 1, 1)).limit(5000)
+    plan = " ".join(row[-1] for row in session.execute(text(f"EXPLAIN QUERY PLAN {query.compile(compile_kwargs={'literal_binds': True})}")))
+    assert plan.startswith("SEARCH") and "INDEX" in plan, plan
@@ -0,0 +1,69 @@
+"""ConsensusEngine: weighted mean, source-spread band, and storing single-source hours."""
+import math
+
+import numpy as np
+import pytest
+
+from app.etl.consensus import ConsensusEngine
+from app.etl.load import WeatherLoader
+from app.models.columns import ForecastColumns
+from app.models.schemas import WeatherSource
+from app.models.sql_models import ConsensusTable
+
+HOURS = np.array(["2026-01-12T00", "2026-01-12T01"], dtype="datetime64[s]")
+
+def _forecast(source: WeatherSource, temperatures, lat: float = 61.0, lon: float = 7.0, hours=HOURS) -> ForecastColumns:
+    return ForecastColumns(
+        source=source, lat=lat, lon=lon, timestamps=hours,
+        temperature=np.array(temperatures, dtype=np.float64),
+        precipitation=np.zeros(len(hours))
+    )
+
+def test_weighted_mean_and_spread_band():
+    engine = ConsensusEngine(weights={"yr": 0.75, "open-meteo": 0.25}, z=2.0)
+    [consensus] = engine.compute([
+        _forecast(WeatherSource.YR_NO, [4.0, 10.0]),
+        _forecast(WeatherSource.OPEN_METEO, [0.0, 10.0])
+    ])
+
+    assert consensus.weighted_temperature.tolist() == [3.0, 10.0]
+    assert consensus.source_count.tolist() == [2, 2]
+    # Weighted standard deviation of 4 and 0 around 3: sqrt(0.75 * 1 + 0.25 * 9) = sqrt(3)
+    assert consensus.temperature_lower[0] == pytest.approx(3.0 - 2 * math.sqrt(3))
+    assert consensus.temperature_upper[0] == pytest.approx(3.0 + 2 * math.sqrt(3))
+    # Sources agree: a zero-width band
+    assert consensus.temperature_lower[1] == consensus.temperature_upper[1] == 10.0
+
+def test_single_source_hours_have_no_band():
+    engine = ConsensusEngine(weights={"yr": 0.6, "open-meteo": 0.4})
+    [consensus] = engine.compute([
+        _forecast(WeatherSource.YR_NO, [4.0, 5.0]),
+        _forecast(WeatherSource.OPEN_METEO, [2.0], hours=HOURS[:1])
+    ])
+
+    assert consensus.source_count.tolist() == [2, 1]
+    assert consensus.weighted_temperature[1] == 5.0
+    assert np.isnan(consensus.temperature_lower[1]) and np.isnan(consensus.temperature_upper[1])
+    point = consensus.to_points()[1]
+    assert point.temperature_lower is None and point.temperature_upper is None
+
+def test_locations_are_combined_separately():
+    engine = ConsensusEngine(weights={"yr": 1.0, "open-meteo": 1.0})
+    results = engine.compute([
+        _forecast(WeatherSource.YR_NO, [1.0, 1.0], lat=61.0),
+        _forecast(WeatherSource.YR_NO, [5.0, 5.0], lat=62.0),
+        _forecast(WeatherSource.OPEN_METEO, [3.0, 3.0], lat=61.0)
+    ])
+
+    by_lat = {c.lat: c for c in results}
+    assert by_lat[61.0].weighted_temperature.tolist() == [2.0, 2.0]
+    assert by_lat[62.0].weighted_temperature.tolist() == [5.0, 5.0]
+    assert by_lat[62.0].source_count.tolist() == [1, 1]
+
+def test_single_source_band_is_stored_as_null(db):
+    consensus = ConsensusEngine().compute([_forecast(WeatherSource.YR_NO, [4.0, 5.0], lat=63.5, lon=8.5)])
+    WeatherLoader(db).load_consensus_columns(consensus)
+
+    rows = db.query(ConsensusTable).filter(ConsensusTable.lat == 63.5, ConsensusTable.lon == 8.5).all()
+    assert len(rows) == 2
+    assert all(r.temperature_lower is None and r.temperature_upper is None for r in rows)
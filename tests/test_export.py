@@ -0,0 +1,104 @@
+"""
+/weather/export across the compaction watermark: days before it come from the daily
+rollups, later hours from the hourly tables, with no day duplicated or dropped.
+"""
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.etl.compact import _set_hourly_retained_from, downsample_consensus
+from app.etl.consensus import ConsensusEngine
+from app.etl.load import WeatherLoader
+from app.models.columns import ForecastColumns
+from app.models.schemas import WeatherSource
+from app.models.sql_models import SchemaStateTable, HOURLY_RETAINED_FROM_KEY
+
+LAT, LON = 71.25, 25.75
+FIRST = datetime(2026, 7, 1)
+WATERMARK = datetime(2026, 7, 3)
+HOURS = 4 * 24  # Jul 1-4
+
+@pytest.fixture
+def stored(db):
+    timestamps = np.datetime64(FIRST, "s") + np.arange(HOURS) * np.timedelta64(3600, "s")
+    hour_of_day = np.arange(HOURS, dtype=np.float64) % 24
+    forecasts = [
+        ForecastColumns(source=source, lat=LAT, lon=LON, timestamps=timestamps,
+                        temperature=hour_of_day + shift, precipitation=np.full(HOURS, 0.5))
+        for source, shift in ((WeatherSource.YR_NO, 0.0), (WeatherSource.OPEN_METEO, 2.0))
+    ]
+    loader = WeatherLoader(db)
+    loader.load_columns(forecasts)
+    loader.load_consensus_columns(ConsensusEngine(weights={"yr": 1.0, "open-meteo": 1.0}).compute(forecasts))
+    # Compacted up to the watermark; the hourly rows before it are left in place, as after
+    # an interrupted run, so reading both tables for those days would show up as duplicates
+    downsample_consensus(db, None, WATERMARK)
+    _set_hourly_retained_from(db, WATERMARK)
+    yield
+    db.query(SchemaStateTable).filter(SchemaStateTable.key == HOURLY_RETAINED_FROM_KEY).delete()
+    db.commit()
+
+def _export(client, fmt: str, **params):
+    response = client.get("/api/v1/weather/export", params={"lat": LAT, "lon": LON, "format": fmt, **params})
+    assert response.status_code == 200, response.text
+    if fmt == "ndjson":
+        return [json.loads(line) for line in response.text.splitlines()]
+    import pyarrow as pa
+
+    rows = pa.ipc.open_stream(response.content).read_all().to_pylist()
+    for row in rows:
+        row["timestamp"] = row["timestamp"].replace(tzinfo=None).isoformat()
+    return rows
+
+def _hours(first: datetime, count: int):
+    return [(first + timedelta(hours=i)).isoformat() for i in range(count)]
+
+@pytest.mark.parametrize("fmt", ["ndjson", "arrow"])
+def test_weather_export_across_the_watermark(client, stored, fmt):
+    rows = _export(client, fmt, source="yr", start="2026-07-01T12:00:00", end="2026-07-04T06:00:00")
+
+    assert [(r["timestamp"], r["resolution"]) for r in rows] == (
+        [("2026-07-01T00:00:00", "day"), ("2026-07-02T00:00:00", "day")]
+        + [(ts, "hour") for ts in _hours(WATERMARK, 30)]
+    )
+    day = rows[0]
+    assert (day["source"], day["temperature"], day["temperature_min"], day["temperature_max"]) == ("yr", 11.5, 0.0, 23.0)
+    assert day["precipitation"] == 0.5
+    hour = rows[2]
+    assert (hour["temperature"], hour["temperature_min"], hour["temperature_max"]) == (0.0, None, None)
+
+@pytest.mark.parametrize("fmt", ["ndjson", "arrow"])
+def test_all_sources_are_exported_one_after_the_other(client, stored, fmt):
+    rows = _export(client, fmt, source="all", start="2026-07-02T00:00:00", end="2026-07-03T02:00:00")
+
+    assert [(r["source"], r["timestamp"], r["resolution"]) for r in rows] == [
+        (source, ts, resolution)
+        for source in ("open-meteo", "yr")
+        for ts, resolution in (("2026-07-02T00:00:00", "day"), ("2026-07-03T00:00:00", "hour"), ("2026-07-03T01:00:00", "hour"))
+    ]
+
+@pytest.mark.parametrize("fmt", ["ndjson", "arrow"])
+def test_consensus_export_across_the_watermark(client, stored, fmt):
+    rows = _export(client, fmt, source="consensus", start="2026-07-02T23:00:00", end="2026-07-03T01:00:00")
+
+    assert [(r["timestamp"], r["resolution"]) for r in rows] == [
+        ("2026-07-02T00:00:00", "day"), ("2026-07-03T00:00:00", "hour")
+    ]
+    day, hour = rows
+    assert (day["weighted_temperature"], day["weighted_temperature_min"], day["weighted_temperature_max"]) == (12.5, 1.0, 24.0)
+    assert (day["source_count"], hour["source_count"]) == (2, 2)
+    assert (hour["weighted_temperature"], hour["temperature_lower"], hour["temperature_upper"]) == (1.0, -0.96, 2.96)
+
+@pytest.mark.parametrize("start, end, expected", [
+    # Entirely before the watermark: whole days only, the partial last day included
+    ("2026-07-01T06:00:00", "2026-07-02T06:00:00", [("2026-07-01T00:00:00", "day"), ("2026-07-02T00:00:00", "day")]),
+    # Ends exactly at the watermark: the day that starts there is not included
+    ("2026-07-02T00:00:00", "2026-07-03T00:00:00", [("2026-07-02T00:00:00", "day")]),
+    # Starts exactly at the watermark: hourly only
+    ("2026-07-03T00:00:00", "2026-07-03T02:00:00", [("2026-07-03T00:00:00", "hour"), ("2026-07-03T01:00:00", "hour")]),
+])
+def test_window_edges_at_the_watermark(client, stored, start, end, expected):
+    rows = _export(client, "ndjson", source="open-meteo", start=start, end=end)
+    assert [(r["timestamp"], r["resolution"]) for r in rows] == expected
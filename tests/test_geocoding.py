@@ -0,0 +1,102 @@
+"""
+GeocodingCache against a model of the Open-Meteo geocoding search: one character
+finds nothing, two characters match names exactly, longer queries match fuzzily.
+"""
+import asyncio
+import threading
+from difflib import SequenceMatcher
+
+import pytest
+
+from app.core.geocoding import GeocodingCache
+from app.models.sql_models import GeocodingTable
+
+PLACES = [
+    {"name": name, "lat": lat, "lon": lon, "country": country, "region": None}
+    for name, lat, lon, country in (
+        ("Bergen", 60.39, 5.32, "Norway"),
+        ("Berlin", 52.5244, 13.4105, "Germany"),
+        ("Bern", 46.9481, 7.4474, "Switzerland"),
+        ("Bergamo", 45.6950, 9.6700, "Italy"),
+        ("Be'er Sheva", 31.2518, 34.7913, "Israel")
+    )
+]
+
+def _fuzzy_prefix(query: str, name: str) -> bool:
+    return len(name) >= len(query) and SequenceMatcher(None, query, name[:len(query)]).ratio() >= 0.75
+
+class Upstream:
+    def __init__(self):
+        self.calls = []
+
+    def search(self, query: str, count: int):
+        self.calls.append(query)
+        q = query.casefold()
+        if len(q) < 2:
+            return []
+        if len(q) == 2:
+            return [p for p in PLACES if p["name"].casefold() == q][:count]
+        return [p for p in PLACES if _fuzzy_prefix(q, p["name"].casefold())][:count]
+
+def search(cache: GeocodingCache, upstream: Upstream, query: str):
+    """What /weather/search does: answer locally or fetch and store."""
+    places = cache.lookup(query)
+    if places is None:
+        places = upstream.search(query, cache.page_size)
+        cache.store(query, places)
+    return [p["name"] for p in places]
+
+@pytest.fixture
+def cache(db):
+    db.query(GeocodingTable).delete()
+    db.commit()
+    return GeocodingCache(page_size=3)
+
+def test_short_query_result_does_not_answer_longer_queries(cache):
+    upstream = Upstream()
+    assert search(cache, upstream, "Be") == []
+    assert search(cache, upstream, "Bergen") == ["Bergen"]
+    assert search(cache, upstream, "Berlin") == ["Berlin"]
+    assert upstream.calls == ["Be", "Bergen", "Berlin"]
+
+def test_partial_page_is_not_reused_for_fuzzy_longer_query(cache):
+    upstream = Upstream()
+    wide = GeocodingCache(page_size=10)
+    assert len(search(wide, upstream, "Berl")) < wide.page_size
+    # A typo still finds Berlin upstream; filtering the cached "berl" page by prefix would not
+    assert search(wide, upstream, "Berlni") == ["Berlin"]
+    assert upstream.calls == ["Berl", "Berlni"]
+
+def test_repeated_query_is_served_from_cache(cache):
+    upstream = Upstream()
+    first = search(cache, upstream, "  BERGEN ")
+    assert search(cache, upstream, "bergen") == first
+    assert upstream.calls == ["  BERGEN "]
+    assert cache.stats()["hits"] == 1
+
+def test_full_page_of_indexed_names_answers_prefix(cache):
+    upstream = Upstream()
+    search(cache, upstream, "Bera")  # indexes Bergen, Berlin, Bern
+    search(cache, upstream, "Bergam")  # indexes Bergamo
+    assert cache.lookup("ber") is not None  # four indexed names start with "ber", a full page
+    assert cache.lookup("berg") is None  # only two do
+    assert cache.stats()["prefix_hits"] == 1
+
+def test_resolve_finds_places_from_earlier_searches(cache):
+    search(cache, Upstream(), "Bergamo")
+    assert cache.resolve("bergamo")["country"] == "Italy"
+    assert cache.resolve("Bergamo ")["lat"] == pytest.approx(45.695)
+    assert cache.resolve("Bergam") is None
+
+def test_async_load_runs_off_the_event_loop(cache, monkeypatch):
+    load, threads = cache.load, []
+    monkeypatch.setattr(cache, "load", lambda: threads.append(threading.get_ident()) or load())
+
+    async def scenario():
+        await cache.load_async()
+        await cache.load_async()  # already loaded: no thread hop
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert len(threads) == 1 and threads[0] != loop_thread
+    assert cache.resolve("Oslo")["lat"] == pytest.approx(59.91)
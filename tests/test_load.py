@@ -0,0 +1,45 @@
+"""WeatherLoader diff mode: only new or changed hours are written, and every run is recorded."""
+from datetime import datetime
+
+import numpy as np
+
+from app.core.grid import cell_key
+from app.etl.load import WeatherLoader
+from app.models.columns import ForecastColumns
+from app.models.schemas import WeatherSource
+from app.models.sql_models import DailyWeatherTable, ForecastChangeTable, ForecastRunTable, WeatherTable
+
+LAT, LON = 64.25, 9.75
+HOURS = np.array(["2026-02-01T00", "2026-02-01T01", "2026-02-01T02"], dtype="datetime64[s]")
+
+def _forecast(temperatures, issued_at: datetime) -> ForecastColumns:
+    return ForecastColumns(
+        source=WeatherSource.YR_NO, lat=LAT, lon=LON, timestamps=HOURS,
+        temperature=np.array(temperatures, dtype=np.float64),
+        precipitation=np.zeros(len(HOURS)), issued_at=issued_at
+    )
+
+def _runs(db):
+    return {
+        r.issued_at: (r.hours, r.changed_hours, r.new_hours)
+        for r in db.query(ForecastRunTable).filter(ForecastRunTable.grid_cell == cell_key(LAT, LON))
+    }
+
+def test_only_changed_hours_are_written(db):
+    loader = WeatherLoader(db, diff=True)
+    first, second, third = datetime(2026, 2, 1, 0), datetime(2026, 2, 1, 1), datetime(2026, 2, 1, 2)
+
+    assert loader.load_columns([_forecast([1.0, 2.0, 3.0], first)]) == 3
+    assert loader.load_columns([_forecast([1.0, 2.0, 3.0], second)]) == 0
+    assert loader.load_columns([_forecast([1.0, 2.5, 3.0], third)]) == 1
+
+    assert _runs(db) == {first: (3, 3, 3), second: (3, 0, 0), third: (3, 1, 0)}
+    rows = db.query(WeatherTable).filter(WeatherTable.grid_cell == cell_key(LAT, LON)).order_by(WeatherTable.timestamp).all()
+    assert [r.temperature for r in rows] == [1.0, 2.5, 3.0]
+    changes = db.query(ForecastChangeTable).filter(
+        ForecastChangeTable.grid_cell == cell_key(LAT, LON),
+        ForecastChangeTable.issued_at == third
+    ).all()
+    assert [(c.timestamp.hour, c.temperature) for c in changes] == [(1, 2.5)]
+    [daily] = db.query(DailyWeatherTable).filter(DailyWeatherTable.grid_cell == cell_key(LAT, LON)).all()
+    assert daily.temperature_sum == 6.5 and daily.temperature_count == 3
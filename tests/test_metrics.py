@@ -0,0 +1,126 @@
+"""Prometheus text exposition: histogram series, label escaping and the /metrics endpoint."""
+import math
+from typing import Dict, List, Tuple
+
+import pytest
+
+from app.core import metrics as metrics_module
+from app.core.metrics import MetricsRegistry
+
+Sample = Tuple[str, Dict[str, str], float]
+
+def parse(text: str) -> Tuple[Dict[str, str], List[Sample]]:
+    """Parses exposition text into ({metric: type}, [(name, labels, value)]), checking its syntax."""
+    assert text.endswith("\n")
+    types, samples = {}, []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+            continue
+        if line.startswith("#"):
+            assert line.startswith("# HELP "), line
+            continue
+        name_end = next((i for i, c in enumerate(line) if c in "{ "), len(line))
+        name, rest, labels = line[:name_end], line[name_end:], {}
+        if rest.startswith("{"):
+            i = 1
+            while rest[i] != "}":
+                eq = rest.index("=", i)
+                key = rest[i:eq].lstrip(",")
+                assert rest[eq + 1] == '"', line
+                i, value = eq + 2, []
+                while rest[i] != '"':
+                    if rest[i] == "\\":
+                        i += 1
+                        value.append({"n": "\n", "\\": "\\", '"': '"'}[rest[i]])
+                    else:
+                        value.append(rest[i])
+                    i += 1
+                labels[key] = "".join(value)
+                i += 1
+                if rest[i] == ",":
+                    i += 1
+            rest = rest[i + 1:]
+        assert rest.startswith(" ") and len(rest.split()) == 1, line
+        samples.append((name, labels, float(rest.strip())))
+    return types, samples
+
+def series(samples: List[Sample], name: str, **labels) -> List[Sample]:
+    return [s for s in samples if s[0] == name and all(s[1].get(k) == v for k, v in labels.items())]
+
+def test_histogram_buckets_sum_and_count():
+    registry = MetricsRegistry()
+    latency = registry.histogram("op_seconds", "Operation latency.", ["op"], buckets=(0.1, 1.0, 0.5))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0):
+        latency.observe(value, op="read")
+    latency.observe(0.2, op="write")
+
+    types, samples = parse(registry.render())
+
+    assert types == {"op_seconds": "histogram"}
+    buckets = [(s[1]["le"], s[2]) for s in series(samples, "op_seconds_bucket", op="read")]
+    # Cumulative, in bound order; a value equal to a bound counts in that bucket
+    assert buckets == [("0.1", 2), ("0.5", 3), ("1", 4), ("+Inf", 5)]
+    assert series(samples, "op_seconds_sum", op="read")[0][2] == pytest.approx(3.15)
+    assert series(samples, "op_seconds_count", op="read")[0][2] == 5
+    assert [(s[1]["le"], s[2]) for s in series(samples, "op_seconds_bucket", op="write")] == [
+        ("0.1", 0), ("0.5", 1), ("1", 1), ("+Inf", 1)
+    ]
+
+def test_timer_observes_its_block():
+    registry = MetricsRegistry()
+    latency = registry.histogram("block_seconds", "Block time.")
+    with latency.time():
+        pass
+
+    _, samples = parse(registry.render())
+    assert series(samples, "block_seconds_count") == [("block_seconds_count", {}, 1)]
+    assert series(samples, "block_seconds_bucket", le="+Inf")[0][2] == 1
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors.", ["message"])
+    awkward = 'path C:\\tmp said "no"\nthen quit'
+    errors.inc(message=awkward)
+    errors.inc(2, message=awkward)
+
+    text = registry.render()
+    _, samples = parse(text)
+
+    assert 'message="path C:\\\\tmp said \\"no\\"\\nthen quit"' in text
+    assert samples == [("errors_total", {"message": awkward}, 3)]
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    calls = registry.counter("calls_total", "Calls.")
+    latency = registry.histogram("call_seconds", "Call time.")
+    calls.inc()
+    with latency.time():
+        pass
+
+    _, samples = parse(registry.render())
+    assert samples == []
+
+def test_metrics_endpoint_output_parses(client):
+    assert client.get("/health").status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    types, samples = parse(response.text)
+    assert types["http_request_duration_seconds"] == "histogram"
+    assert types["weather_etl_extract_seconds"] == "histogram"
+    assert types["weather_forecast_cache_hits"] == "gauge"
+    health = series(samples, "http_request_duration_seconds_count", method="GET", route="/health", status="200")
+    assert len(health) == 1 and health[0][2] >= 1
+    # Every histogram series ends with a +Inf bucket equal to its count
+    for name, labels, value in series(samples, "http_request_duration_seconds_count"):
+        [inf] = series(samples, "http_request_duration_seconds_bucket", le="+Inf", **labels)
+        assert inf[2] == value
+    assert all(not math.isnan(value) for _, _, value in samples)
+
+def test_metrics_endpoint_disabled(client, monkeypatch):
+    monkeypatch.setattr(metrics_module.metrics, "enabled", False)
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,58 @@
+"""NearbyIndex: radius search over the lat/lon buckets, expiry and the LRU bound."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.nearby import NearbyIndex, distance_km
+
+def _fresh(minutes: int = 30) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=minutes)
+
+def test_distance_km():
+    assert distance_km(0.0, 0.0, 0.0, 1.0) == pytest.approx(111.19, abs=0.01)
+    assert distance_km(59.91, 10.75, 59.91, 10.75) == 0.0
+
+def test_nearest_within_radius_nearest_first():
+    index = NearbyIndex(radius_km=5.0, max_locations=100)
+    index.add(60.00, 10.00, _fresh())
+    index.add(60.02, 10.00, _fresh())  # 2.2 km from the query point below
+    index.add(60.10, 10.00, _fresh())  # 11 km: out of range
+
+    found = index.nearest(60.04, 10.00, k=5)
+
+    assert [(n.lat, n.lon) for n in found] == [(60.02, 10.00), (60.00, 10.00)]
+    assert found[0].distance_km == pytest.approx(2.22, abs=0.01)
+
+def test_own_cell_and_expired_entries_are_skipped():
+    index = NearbyIndex(radius_km=5.0, max_locations=100)
+    index.add(60.00, 10.00, _fresh())
+    index.add(60.01, 10.00, _fresh(minutes=-1))
+
+    assert index.nearest(60.00, 10.00) == []
+    assert index.stats() == {"locations": 1, "hits": 0, "misses": 1}
+
+def test_neighbours_across_bucket_edges_near_the_pole():
+    # At 85 degrees a few km span several degree-buckets of longitude
+    index = NearbyIndex(radius_km=5.0, max_locations=100)
+    index.add(85.0, 0.3, _fresh())
+
+    [neighbour] = index.nearest(85.0, 0.0)
+    assert neighbour.distance_km == pytest.approx(2.9, abs=0.1)
+    assert index.nearest(85.0, 1.0) == []  # 8.7 km
+
+def test_least_recently_used_locations_are_evicted():
+    index = NearbyIndex(radius_km=5.0, max_locations=2)
+    index.add(60.00, 10.00, _fresh())
+    index.add(61.00, 10.00, _fresh())
+    index.nearest(60.01, 10.00)  # uses the first
+    index.add(62.00, 10.00, _fresh())
+
+    assert index.nearest(60.01, 10.00) != []
+    assert index.nearest(61.01, 10.00) == []
+    assert index.stats()["locations"] == 2
+
+def test_zero_radius_disables_the_index():
+    index = NearbyIndex(radius_km=0.0, max_locations=10)
+    index.add(60.00, 10.00, _fresh())
+    assert index.nearest(60.001, 10.00) == []
+    assert index.stats()["locations"] == 0
@@ -0,0 +1,63 @@
+"""ResponseCache invalidation per grid cell, and conditional GETs on the aggregate endpoints."""
+import numpy as np
+
+from app.core.cache import ResponseCache
+from app.etl.load import WeatherLoader
+from app.models.columns import ForecastColumns
+from app.models.schemas import WeatherSource
+
+def test_invalidate_drops_only_the_written_cells():
+    cache = ResponseCache(max_entries=10, ttl_seconds=0)
+    token = cache.token()
+    cache.set(("daily-average", 1), 1, b"[1]", token)
+    cache.set(("source-deviation", 1, "2026-01-01"), 1, b"{}", token)
+    cache.set(("daily-average", 2), 2, b"[2]", token)
+
+    cache.invalidate({1})
+
+    assert cache.get(("daily-average", 1)) is None
+    assert cache.get(("source-deviation", 1, "2026-01-01")) is None
+    assert cache.get(("daily-average", 2)).body == b"[2]"
+    assert cache.stats()["invalidations"] == 2
+
+def test_response_computed_across_a_write_is_not_stored():
+    cache = ResponseCache(max_entries=10, ttl_seconds=0)
+    token = cache.token()  # taken before reading the database
+    cache.invalidate({1})  # a load commits meanwhile
+    entry = cache.set(("daily-average", 1), 1, b"[]", token)
+
+    assert entry.body == b"[]"
+    assert cache.get(("daily-average", 1)) is None
+    cache.set(("daily-average", 2), 2, b"[]", token)  # other cells are unaffected
+    assert cache.get(("daily-average", 2)) is not None
+
+def test_full_invalidation_and_lru_bound():
+    cache = ResponseCache(max_entries=2, ttl_seconds=0)
+    for cell in (1, 2, 3):
+        cache.set(("daily-average", cell), cell, b"[]", cache.token())
+    assert cache.get(("daily-average", 1)) is None
+    assert cache.stats()["entries"] == 2
+
+    token = cache.token()
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+    cache.set(("daily-average", 3), 3, b"[]", token)
+    assert cache.get(("daily-average", 3)) is None
+
+def test_daily_average_revalidates_until_the_loader_writes(client, db):
+    params = {"lat": 67.25, "lon": 14.25}
+    first = client.get("/api/v1/weather/daily-average", params=params)
+    assert first.status_code == 200 and first.json() == []
+    etag = first.headers["etag"]
+    assert client.get("/api/v1/weather/daily-average", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    WeatherLoader(db).load_columns([ForecastColumns(
+        source=WeatherSource.YR_NO, lat=67.25, lon=14.25,
+        timestamps=np.array(["2026-04-01T00", "2026-04-01T01"], dtype="datetime64[s]"),
+        temperature=np.array([2.0, 4.0]), precipitation=np.zeros(2)
+    )])
+
+    after = client.get("/api/v1/weather/daily-average", params=params, headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["etag"] != etag
+    assert after.json() == [{"date": "2026-04-01", "average_temperature": 3.0, "average_precipitation": 0.0}]
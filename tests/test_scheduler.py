@@ -0,0 +1,112 @@
+"""RefreshScheduler: popularity decay, the hot threshold, the upstream budget and due times."""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import utils
+from app.core.cache import forecast_cache
+from app.core.scheduler import RefreshScheduler
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = RefreshScheduler()
+    scheduler.enabled = True
+    scheduler.hot_requests = 3.0
+    scheduler.half_life = 3600
+    scheduler.jitter_seconds = 300
+    scheduler.concurrency = 2
+    dispatched = []
+    monkeypatch.setattr(scheduler, "_dispatch", lambda: dispatched.append(list(scheduler._queue)))
+    return scheduler
+
+def _record(scheduler, cell: int, times: int):
+    for _ in range(times):
+        scheduler.record(cell, 60.0, 10.0)
+
+def test_popularity_halves_every_half_life(scheduler):
+    _record(scheduler, 1, 4)
+    location = scheduler._locations[1]
+    assert scheduler._score(location, location.seen) == pytest.approx(4.0)
+    assert scheduler._score(location, location.seen + 3600) == pytest.approx(2.0)
+    assert scheduler._score(location, location.seen + 7200) == pytest.approx(1.0)
+
+def test_only_hot_locations_are_queued_and_cold_ones_forgotten(scheduler):
+    scheduler.jitter_seconds = 0
+    _record(scheduler, 11, 2)
+    _record(scheduler, 12, 4)
+    scheduler.tick()
+    assert [cell for *_, cell in scheduler._queue] == [12]
+
+    # Ten half-lives later, both have decayed below a tenth of the threshold
+    for location in scheduler._locations.values():
+        location.seen -= 10 * 3600
+    scheduler.tick()
+    assert scheduler._queue == [] and scheduler._locations == {}
+
+def test_due_refreshes_start_hottest_first(scheduler):
+    scheduler.jitter_seconds = 0
+    for cell, requests in ((21, 4), (22, 9), (23, 6)):
+        _record(scheduler, cell, requests)
+    scheduler.tick()
+    assert [cell for *_, cell in scheduler._queue] == [22, 23, 21]
+
+def test_refresh_is_due_within_the_jitter_window_before_expiry(scheduler):
+    _record(scheduler, 31, 4)
+    _record(scheduler, 32, 4)
+    now = datetime.now(timezone.utc)
+    forecast_cache.set(31, now + timedelta(minutes=20))
+    forecast_cache.set(32, now + timedelta(minutes=2))
+    try:
+        scheduler.tick()
+        far, near = scheduler._locations[31], scheduler._locations[32]
+        assert far.expires_at - 300 <= far.due_at <= far.expires_at
+        assert time.time() - 1 <= near.due_at <= near.expires_at  # clamped to now at the earliest
+        assert [cell for *_, cell in scheduler._queue] in ([], [32])
+    finally:
+        forecast_cache.invalidate(31)
+        forecast_cache.invalidate(32)
+
+def test_upstream_budget_refills_over_time(scheduler):
+    scheduler.requests_per_minute = 4  # two refreshes a minute
+    scheduler._tokens = 4.0
+    scheduler._tokens_at = time.monotonic()
+    assert scheduler._take_budget() and scheduler._take_budget()
+    assert not scheduler._take_budget()
+
+    scheduler._tokens_at -= 30  # half a minute: two requests, one refresh
+    assert scheduler._take_budget()
+    assert not scheduler._take_budget()
+
+    scheduler._tokens_at -= 600  # the bucket never holds more than a minute's worth
+    assert scheduler._take_budget() and scheduler._take_budget()
+    assert not scheduler._take_budget()
+
+def test_early_refresh_runs_while_fresh_and_backs_off_when_nothing_is_newer(scheduler, monkeypatch):
+    expiry = datetime.now(timezone.utc) + timedelta(minutes=2)
+    calls = []
+
+    async def fake_pipeline(lat, lon):
+        calls.append((lat, lon))
+        return SimpleNamespace(expires_at=next_expiry)
+
+    monkeypatch.setattr(utils, "run_etl_pipeline_async", fake_pipeline)
+    _record(scheduler, 41, 4)
+    location = scheduler._locations[41]
+    forecast_cache.set(41, expiry)
+    try:
+        # Upstream publishes a newer forecast: the entry is extended before it ever expires
+        next_expiry = expiry + timedelta(hours=1)
+        location.expires_at = expiry.timestamp()
+        asyncio.run(scheduler._refresh(41, location))
+        assert calls == [(60.0, 10.0)] and forecast_cache.expires_at(41) == next_expiry
+
+        # Nothing newer yet: retried at expiry at the earliest, not on every tick
+        location.expires_at = next_expiry.timestamp()
+        asyncio.run(scheduler._refresh(41, location))
+        assert len(calls) == 2
+        assert location.due_at == next_expiry.timestamp()
+    finally:
+        forecast_cache.invalidate(41)
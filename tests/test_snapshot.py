@@ -0,0 +1,51 @@
+"""Forecast snapshots: encoding on a regular time grid and decoding back to columns."""
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.etl.snapshot import decode, encode, latest_snapshot, snapshot_row
+from app.models.columns import ForecastColumns
+from app.models.schemas import WeatherSource
+from app.models.sql_models import ForecastSnapshotTable
+
+# Hourly, then 6-hourly, as Yr.no serves them
+HOURS = np.array(["2026-03-01T00", "2026-03-01T01", "2026-03-01T02", "2026-03-01T08", "2026-03-01T14"], dtype="datetime64[s]")
+
+def _forecast(lat: float = 65.5, lon: float = 11.5, offset: float = 0.0, issued_at=None) -> ForecastColumns:
+    return ForecastColumns(
+        source=WeatherSource.YR_NO, lat=lat, lon=lon, timestamps=HOURS,
+        temperature=np.array([1.5, 2.0, -0.25, 4.0, 3.5]) + offset,
+        precipitation=np.array([0.0, 0.5, 0.0, 1.25, 0.0]),
+        issued_at=issued_at
+    )
+
+def test_mixed_steps_share_one_grid():
+    values = encode(_forecast())
+    assert values["step_seconds"] == 3600
+    assert values["length"] == 15
+    assert values["start"] == datetime(2026, 3, 1, 0)
+
+def test_round_trip():
+    issued = datetime(2026, 3, 1, 0, tzinfo=timezone.utc)
+    row = ForecastSnapshotTable(**snapshot_row(_forecast(issued_at=issued), issued_at=datetime(2026, 3, 1, 5)))
+    snapshot = decode(row)
+
+    assert snapshot.issued_at == datetime(2026, 3, 1, 0)
+    assert len(snapshot) == 15 and np.isnan(snapshot.temperature[3:8]).all()
+    columns = snapshot.to_columns()
+    assert columns.timestamps.tolist() == HOURS.tolist()
+    assert columns.temperature.tolist() == [1.5, 2.0, -0.25, 4.0, 3.5]  # exact in float32
+    assert columns.precipitation.tolist() == [0.0, 0.5, 0.0, 1.25, 0.0]
+    assert columns.issued_at == snapshot.issued_at
+
+def test_latest_snapshot_is_the_newest_run(db):
+    db.add_all([
+        ForecastSnapshotTable(**snapshot_row(_forecast(lat=66.5, offset=offset), issued_at=datetime(2026, 3, 1, hour)))
+        for hour, offset in ((0, 0.0), (2, 10.0), (1, 5.0))
+    ])
+    db.commit()
+
+    snapshot = latest_snapshot(db, 66.5, 11.5, WeatherSource.YR_NO)
+    assert snapshot.issued_at == datetime(2026, 3, 1, 2)
+    assert snapshot.to_columns().temperature[0] == 11.5
+    assert latest_snapshot(db, 66.5, 11.5, WeatherSource.OPEN_METEO) is None
@@ -0,0 +1,162 @@
+"""
+Stale-while-revalidate: ForecastCache's async refreshes (single flight, background
+de-duplication, retry backoff) and how /weather/current serves stored hours meanwhile.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.api.v1 import weather
+from app.core import utils
+from app.core.cache import ForecastCache
+from app.core.config import settings
+from app.etl.load import WeatherLoader
+from app.models.columns import ForecastColumns
+from app.models.schemas import WeatherSource
+
+def _expiry(minutes: int = 30) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=minutes)
+
+class FakeRefresh:
+    """Refresh coroutine that waits until released, counting its runs."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> datetime:
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return _expiry()
+
+def test_concurrent_callers_share_one_refresh():
+    async def scenario():
+        cache = ForecastCache()
+        refresh = FakeRefresh()
+        callers = [asyncio.ensure_future(cache.get_or_refresh_async("cell", refresh)) for _ in range(3)]
+        await asyncio.sleep(0)
+        refresh.release.set()
+        return cache, refresh, await asyncio.gather(*callers)
+
+    cache, refresh, results = asyncio.run(scenario())
+    assert refresh.calls == 1
+    assert sorted(results) == ["coalesced", "coalesced", "miss"]
+    assert asyncio.run(cache.get_or_refresh_async("cell", FakeRefresh())) == "hit"
+
+def test_cancelled_caller_does_not_cancel_the_shared_refresh():
+    async def scenario():
+        cache = ForecastCache()
+        refresh = FakeRefresh()
+        leader = asyncio.ensure_future(cache.get_or_refresh_async("cell", refresh))
+        follower = asyncio.ensure_future(cache.get_or_refresh_async("cell", refresh))
+        await asyncio.sleep(0)
+        leader.cancel()  # e.g. the client disconnected
+        await asyncio.sleep(0)
+        refresh.release.set()
+        return cache, refresh, leader, await follower
+
+    cache, refresh, leader, result = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result == "coalesced"
+    assert refresh.calls == 1
+    assert cache.expires_at("cell") is not None
+
+def test_background_refresh_runs_once_per_key():
+    async def scenario():
+        cache = ForecastCache()
+        refresh = FakeRefresh()
+        started = [cache.refresh_in_background("cell", refresh) for _ in range(3)]
+        refreshing = cache.is_refreshing("cell")
+        await asyncio.sleep(0)
+        refresh.release.set()
+        while cache.is_refreshing("cell"):
+            await asyncio.sleep(0)
+        return cache, refresh, started, refreshing
+
+    cache, refresh, started, refreshing = asyncio.run(scenario())
+    assert started == [True, False, False]
+    assert refreshing
+    assert refresh.calls == 1
+    assert cache.stats()["background"] == 1
+    assert not cache.is_expired("cell")
+
+def test_failed_background_refresh_backs_off(monkeypatch, capsys):
+    monkeypatch.setattr(settings, "REFRESH_RETRY_SECONDS", 0.2)
+
+    async def scenario():
+        cache = ForecastCache()
+        failing = FakeRefresh(fail=True)
+        failing.release.set()
+        assert cache.refresh_in_background("cell", failing)
+        while cache.is_refreshing("cell"):
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)  # let the done callback report the failure
+        during_backoff = cache.refresh_in_background("cell", FakeRefresh())
+        await asyncio.sleep(0.25)
+        succeeding = FakeRefresh()
+        succeeding.release.set()
+        after_backoff = cache.refresh_in_background("cell", succeeding)
+        while cache.is_refreshing("cell"):
+            await asyncio.sleep(0)
+        return cache, during_backoff, after_backoff
+
+    cache, during_backoff, after_backoff = asyncio.run(scenario())
+    assert (during_backoff, after_backoff) == (False, True)
+    assert cache.expires_at("cell") is not None
+    assert "Background refresh failed: upstream down" in capsys.readouterr().out
+
+def _store_hour(db, lat: float, lon: float, hour: datetime):
+    timestamps = np.array([np.datetime64(hour, "s")])
+    WeatherLoader(db).load_columns([
+        ForecastColumns(source=source, lat=lat, lon=lon, timestamps=timestamps,
+                        temperature=np.array([temperature]), precipitation=np.array([0.0]))
+        for source, temperature in ((WeatherSource.YR_NO, 10.0), (WeatherSource.OPEN_METEO, 12.0))
+    ])
+
+@pytest.fixture
+def swr(monkeypatch):
+    """A fresh forecast cache for the endpoint, recording background refreshes and ETL runs."""
+    cache = ForecastCache()
+    queued, etl_runs = [], []
+
+    async def fake_etl(lat, lon):
+        etl_runs.append((lat, lon))
+        return SimpleNamespace(expires_at=_expiry())
+
+    monkeypatch.setattr(weather, "forecast_cache", cache)
+    monkeypatch.setattr(cache, "refresh_in_background", lambda key, refresh: queued.append(key) or True)
+    monkeypatch.setattr(utils, "run_etl_pipeline_async", fake_etl)
+    return SimpleNamespace(queued=queued, etl_runs=etl_runs)
+
+def test_recent_stored_hour_is_served_stale_and_refreshed_in_background(client, db, swr):
+    lat, lon = -61.35, 151.65
+    hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=settings.STALE_FORECAST_MAX_AGE_HOURS - 1)
+    _store_hour(db, lat, lon, hour)
+
+    response = client.get("/api/v1/weather/current", params={"lat": lat, "lon": lon})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["average_temperature"] == 11.0
+    assert body["freshness"]["stale"] is True
+    assert datetime.fromisoformat(body["freshness"]["forecast_hour"]) == hour
+    assert len(swr.queued) == 1
+    assert swr.etl_runs == []  # nobody waited for ETL
+
+def test_hours_older_than_the_stale_limit_are_not_served(client, db, swr):
+    lat, lon = -62.45, 152.75
+    hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=settings.STALE_FORECAST_MAX_AGE_HOURS + 1)
+    _store_hour(db, lat, lon, hour)
+
+    response = client.get("/api/v1/weather/current", params={"lat": lat, "lon": lon})
+
+    # The request waited for ETL instead (the fake loads nothing, hence the 404)
+    assert response.status_code == 404
+    assert swr.etl_runs == [(lat, lon)]
+    assert swr.queued == []
@@ -0,0 +1,119 @@
+"""Streaming ETL: incremental parsing into bounded batches, and the streamed run end to end."""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.core import utils
+from app.core.config import settings
+from app.core.grid import cell_key
+from app.etl.extract import FetchResult, OpenMeteoFetcher
+from app.etl.load import WeatherLoader
+from app.etl.stream import stream_open_meteo_columns, stream_yr_columns
+from app.models.schemas import WeatherSource
+from app.models.sql_models import WeatherTable
+
+def _yr_payload(first: datetime, hours: int, missing=()) -> dict:
+    return {"properties": {"timeseries": [
+        {
+            "time": (first + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "data": {
+                "instant": {"details": {"air_temperature": None if i in missing else float(i)}},
+                "next_1_hours": {"details": {"precipitation_amount": 0.5}}
+            }
+        } for i in range(hours)
+    ]}}
+
+def _open_meteo_payload(first: datetime, hours: int, missing=()) -> dict:
+    return {"hourly": {
+        "time": [(first + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(hours)],
+        "temperature_2m": [None if i in missing else float(i) for i in range(hours)],
+        "precipitation": [None if i % 2 else 0.25 for i in range(hours)]
+    }}
+
+async def _chunks(payload: dict, size: int = 7):
+    body = json.dumps(payload).encode()
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+async def _collect(batches) -> list:
+    return [batch async for batch in batches]
+
+def _hours(batch) -> list:
+    return [ts.hour for ts in batch.timestamps.astype(datetime)]
+
+def test_yr_rows_are_emitted_in_batches_as_they_are_parsed():
+    payload = _yr_payload(datetime(2026, 5, 1), 8, missing={2})
+    batches = asyncio.run(_collect(stream_yr_columns(_chunks(payload), 60.0, 10.0, batch_rows=3)))
+
+    assert [_hours(b) for b in batches] == [[0, 1, 3], [4, 5, 6], [7]]
+    assert batches[0].temperature.tolist() == [0.0, 1.0, 3.0]
+    assert batches[0].precipitation.tolist() == [0.5, 0.5, 0.5]
+
+def test_open_meteo_batches_drop_hours_without_temperature():
+    payload = _open_meteo_payload(datetime(2026, 5, 1), 5, missing={2})
+    batches = asyncio.run(_collect(stream_open_meteo_columns(_chunks(payload), 60.0, 10.0, batch_rows=2)))
+
+    assert [_hours(b) for b in batches] == [[0, 1], [3], [4]]
+    assert [b.precipitation.tolist() for b in batches] == [[0.25, 0.0], [0.0], [0.25]]
+
+def test_open_meteo_truncated_body_raises():
+    async def truncated():
+        yield json.dumps(_open_meteo_payload(datetime(2026, 5, 1), 3)).encode()[:-5]
+
+    with pytest.raises(Exception):
+        asyncio.run(_collect(stream_open_meteo_columns(truncated(), 60.0, 10.0, batch_rows=2)))
+
+def test_open_meteo_windows_cover_the_horizon(monkeypatch):
+    monkeypatch.setattr(settings, "OPEN_METEO_FORECAST_DAYS", 7)
+    monkeypatch.setattr(settings, "ETL_STREAM_OPEN_METEO_DAYS", 3)
+    assert OpenMeteoFetcher().stream_windows(date(2026, 5, 1)) == [
+        (date(2026, 5, 1), date(2026, 5, 3)), (date(2026, 5, 4), date(2026, 5, 6)), (date(2026, 5, 7), date(2026, 5, 7))
+    ]
+
+class FakeFetcher:
+    def __init__(self, source: WeatherSource, payload, windows):
+        self.source = source
+        self.payload = payload  # payload for a window
+        self.windows = windows
+        self.requested = []
+
+    def stream_windows(self, today=None):
+        return self.windows
+
+    @asynccontextmanager
+    async def stream_async(self, lat, lon, days=None):
+        self.requested.append(days)
+        result = FetchResult(payload=None, expires_at=datetime(2030, 1, 1, tzinfo=timezone.utc), issued_at=datetime(2026, 5, 1))
+        yield result, _chunks(self.payload(days))
+
+def test_streamed_run_loads_every_window_in_bounded_batches(db, monkeypatch):
+    lat, lon = 68.5, 16.5
+    first = datetime(2026, 5, 1)
+    windows = [(date(2026, 5, 1), date(2026, 5, 1)), (date(2026, 5, 2), date(2026, 5, 2))]
+    yr = FakeFetcher(WeatherSource.YR_NO, lambda days: _yr_payload(first, 30), [None])
+    om = FakeFetcher(
+        WeatherSource.OPEN_METEO,
+        lambda days: _open_meteo_payload(datetime.combine(days[0], datetime.min.time()), 24, missing={5}),
+        windows
+    )
+    monkeypatch.setattr(utils, "YrNoFetcher", lambda: yr)
+    monkeypatch.setattr(utils, "OpenMeteoFetcher", lambda: om)
+    monkeypatch.setattr(settings, "ETL_STREAM_BATCH_ROWS", 10)
+    loaded = []
+    load_columns = WeatherLoader.load_columns
+    monkeypatch.setattr(WeatherLoader, "load_columns", lambda self, batch: loaded.append(
+        (batch[0].source, len(batch[0]))) or load_columns(self, batch))
+
+    result = asyncio.run(utils.stream_etl_async(lat, lon, db))
+
+    assert om.requested == windows and yr.requested == [None]
+    assert sorted(n for source, n in loaded if source == WeatherSource.YR_NO) == [10, 10, 10]
+    # Each 24-hour window in batches of 10 hours, less the hour without a temperature
+    assert sorted(n for source, n in loaded if source == WeatherSource.OPEN_METEO) == [4, 4, 9, 9, 10, 10]
+    assert result.rows == 30 + 46
+    stored = db.query(WeatherTable).filter(WeatherTable.grid_cell == cell_key(lat, lon))
+    assert stored.filter(WeatherTable.source == "yr").count() == 30
+    assert stored.filter(WeatherTable.source == "open-meteo").count() == 46